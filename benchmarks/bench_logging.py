@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+bench_logging.py
+
+Measure how much logging costs when parsing at different log levels.
+
+The messages in the hot paths of the parser are formatted lazily and the
+loops check the log level once, so logging should cost close to nothing
+at WARNING. The second part compares the cost of a debug call that is not
+emitted when the message is formatted eagerly, lazily and behind a level
+check.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_logging.py --families 20000
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+import logging
+
+import click
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from ped_parser import FamilyParser
+
+from generate import generate_lines
+
+
+def best_time(function, repeat):
+    """Return the fastest of repeat runs of function in seconds."""
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+@click.command()
+@click.option('-f', '--families',
+                default=20000,
+                help='Number of trios to parse.'
+)
+@click.option('-r', '--repeat',
+                default=3,
+                help='Number of runs, the fastest is reported.'
+)
+def cli(families, repeat):
+    """Time parsing at the log levels WARNING, INFO and DEBUG."""
+    lines = list(generate_lines(3 * families, 'trio'))
+    logger = logging.getLogger('ped_parser')
+    # Records that are emitted are thrown away, so only the cost of
+    # creating them is measured
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    print("Parsing {0} lines".format(len(lines)))
+    for level in ('WARNING', 'INFO', 'DEBUG'):
+        logger.setLevel(level)
+        seconds = best_time(lambda: FamilyParser(iter(lines)), repeat)
+        print("{0:<8}{1:>8.3f} s".format(level, seconds))
+
+    logger.setLevel('WARNING')
+    calls = 100000
+    individual_id = 'child_1'
+    timers = [
+        ('eager', lambda: logger.debug(
+            "Checking individual {0}".format(individual_id))),
+        ('lazy', lambda: logger.debug(
+            "Checking individual %s", individual_id)),
+        ('guarded', lambda: debug and logger.debug(
+            "Checking individual %s", individual_id)),
+    ]
+    debug = logger.isEnabledFor(logging.DEBUG)
+    print("{0} debug calls at WARNING".format(calls))
+    for name, function in timers:
+        seconds = min(timeit.repeat(function, number=calls, repeat=repeat))
+        print("{0:<8}{1:>8.3f} s".format(name, seconds))
+
+
+if __name__ == '__main__':
+    cli()
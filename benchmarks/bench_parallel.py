@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+bench_parallel.py
+
+Measure if checking families and parsing files in a pool of processes
+pays off.
+
+check_families with workers sends the families to the workers as compact
+tuples and merges the results back. The benchmark times a serial check,
+each step of the parallel protocol on its own and a check with a pool, so
+the cost of moving the families can be compared to the work that is done
+in parallel. Parallel checks are only worth turning on where the pool is
+faster than the serial check.
+
+parse_file splits the lines of a file in chunks in the workers and builds
+the individuals from the columns in this process. It is timed against a
+serial parse of the same file, together with the cost of moving the split
+lines back from the workers.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_parallel.py --individuals 300000 --workers 4
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+import pickle
+import tempfile
+
+import click
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from ped_parser import FamilyParser
+from ped_parser.parallel import (check_families, check_packed_families,
+                                 chunk_ranges, merge_family, pack_family,
+                                 parse_file, split_chunk)
+
+from generate import STRUCTURES, generate_lines
+
+
+def timed(function):
+    """Return the result of function and the seconds it took."""
+    start = time.perf_counter()
+    value = function()
+    return value, time.perf_counter() - start
+
+
+def parse_families(lines):
+    """Return the families of the lines without checking them."""
+    family_parser = FamilyParser()
+    for ind_object, models in family_parser.iter_individuals(lines):
+        family_parser.add_individual(ind_object, models)
+    return family_parser.families
+
+
+@click.command()
+@click.option('-n', '--individuals',
+                default=300000,
+                help='Number of individuals in the generated cohort.'
+)
+@click.option('-s', '--structure',
+                type=click.Choice(STRUCTURES),
+                default='trio',
+                help='Structure of the generated families.'
+)
+@click.option('-w', '--workers',
+                default=os.cpu_count() or 2,
+                help='Number of processes, default is the number of CPUs.'
+)
+def cli(individuals, structure, workers):
+    """Time serial and parallel family checks of a generated cohort."""
+    lines = list(generate_lines(individuals, structure))
+    print("{0} individuals, {1} CPUs".format(individuals, os.cpu_count()))
+
+    families = parse_families(lines)
+    _, serial = timed(lambda: check_families(families, 1))
+
+    families = parse_families(lines)
+    data, pack = timed(lambda: pickle.dumps(
+        [pack_family(family) for family in families.values()],
+        pickle.HIGHEST_PROTOCOL))
+    (results, _), check = timed(
+        lambda: check_packed_families(pickle.loads(data)))
+    results, transfer = timed(lambda: pickle.loads(
+        pickle.dumps(results, pickle.HIGHEST_PROTOCOL)))
+    _, merge = timed(lambda: [merge_family(family, result) for family, result
+                              in zip(families.values(), results)])
+
+    families = parse_families(lines)
+    _, pool = timed(lambda: check_families(families, workers))
+
+    for name, seconds in [
+            ('serial', serial),
+            ('pack', pack),
+            ('worker check', check),
+            ('results', transfer),
+            ('merge', merge),
+            ('{0} workers'.format(workers), pool)]:
+        print("{0:<14}{1:>8.3f} s".format(name, seconds))
+    print("Check speedup {0:.2f}x".format(serial / pool))
+
+    handle, path = tempfile.mkstemp(suffix='.ped')
+    try:
+        with os.fdopen(handle, 'w') as outfile:
+            outfile.writelines(lines)
+
+        def serial_parse():
+            with open(path, 'r') as infile:
+                return list(FamilyParser().iter_individuals(infile))
+        _, serial = timed(serial_parse)
+        chunks, split = timed(lambda: [
+            split_chunk(path, start, end) for start, end in chunk_ranges(path)])
+        _, transfer = timed(lambda: pickle.loads(
+            pickle.dumps(chunks, pickle.HIGHEST_PROTOCOL)))
+        _, pool = timed(lambda: list(parse_file(path, workers=workers)))
+    finally:
+        os.remove(path)
+
+    for name, seconds in [
+            ('serial parse', serial),
+            ('split', split),
+            ('split lines', transfer),
+            ('{0} workers'.format(workers), pool)]:
+        print("{0:<14}{1:>8.3f} s".format(name, seconds))
+    print("Parse speedup {0:.2f}x".format(serial / pool))
+
+
+if __name__ == '__main__':
+    cli()
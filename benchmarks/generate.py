@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+generate.py
+
+Generate synthetic pedigree files for benchmarks.
+
+Families are built from these structures:
+
+trio Father, mother and an affected child
+quad Father, mother and two children
+multigen A founder couple with descendants over several generations,
+         every child in a generation marries a new founder
+loops A consanguineous family where two first cousins have children
+mixed Mostly trios and quads with some multigen and loops families
+
+and written in one of the formats:
+
+ped The six ped columns
+alt The ped columns and InheritanceModel, Proband, Consultand and Alive
+cmms Like alt with individual ids in the CMMS format, parse with
+     family_type='cmms' and cmms_check=True
+
+The lines are generated lazily so files with millions of individuals can be
+written without holding them in memory.
+
+    python benchmarks/generate.py -n 1000000 -s mixed -f ped -o big.ped
+"""
+
+from __future__ import print_function
+
+import random
+
+import click
+
+STRUCTURES = ['trio', 'quad', 'multigen', 'loops', 'mixed']
+FORMATS = ['ped', 'alt', 'cmms']
+
+# Share of the families in a mixed cohort
+MIXED_WEIGHTS = [('trio', 50), ('quad', 25), ('multigen', 15), ('loops', 10)]
+
+ALT_COLUMNS = ['InheritanceModel', 'Proband', 'Consultand', 'Alive']
+MODELS = ['AR_hom', 'AR_comp', 'AD', 'X', 'AD_dn']
+ROMAN = ['I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X']
+
+
+class FamilyBuilder(object):
+    """
+    Collect the members of a family.
+
+    Members are tuples (father, mother, sex, phenotype, generation) where
+    father and mother are the positions of the parents, or None.
+    """
+    def __init__(self, rng):
+        super(FamilyBuilder, self).__init__()
+        self.rng = rng
+        self.members = []
+
+    def add(self, father=None, mother=None, sex=None, generation=0):
+        """Add a member and return its position."""
+        if sex is None:
+            sex = self.rng.choice([1, 2])
+        # Founders are healthy, about a third of the children are affected
+        phenotype = 1
+        if father is not None and self.rng.random() < 0.3:
+            phenotype = 2
+        self.members.append((father, mother, sex, phenotype, generation))
+        return len(self.members) - 1
+
+    def update(self, position, sex=None, phenotype=None):
+        """Change the sex or phenotype of a member."""
+        father, mother, old_sex, old_phenotype, generation = \
+            self.members[position]
+        self.members[position] = (father, mother, sex or old_sex,
+                                  phenotype or old_phenotype, generation)
+
+    def couple(self, generation=0):
+        """Add two founders and return (father, mother)."""
+        return (self.add(sex=1, generation=generation),
+                self.add(sex=2, generation=generation))
+
+    def children(self, father, mother, number):
+        """Add children to a couple and return their positions."""
+        generation = max(self.members[father][4], self.members[mother][4]) + 1
+        return [self.add(father, mother, generation=generation)
+                for _ in range(number)]
+
+    def marry(self, individual):
+        """Add a founder spouse to an individual and return (father, mother)."""
+        generation = self.members[individual][4]
+        if self.members[individual][2] == 1:
+            return individual, self.add(sex=2, generation=generation)
+        return self.add(sex=1, generation=generation), individual
+
+
+def build_trio(builder, size):
+    """Father, mother and an affected child."""
+    father, mother = builder.couple()
+    child = builder.children(father, mother, 1)[0]
+    # The child of a trio is always affected
+    builder.update(child, phenotype=2)
+
+
+def build_quad(builder, size):
+    """Father, mother and two children."""
+    father, mother = builder.couple()
+    builder.children(father, mother, 2)
+
+
+def build_multigen(builder, size):
+    """A founder couple and their descendants, up to size members."""
+    generation = [builder.couple()]
+    while generation and len(builder.members) < size:
+        next_generation = []
+        for father, mother in generation:
+            number = builder.rng.randint(1, 3)
+            for child in builder.children(father, mother, number):
+                if len(builder.members) >= size:
+                    return
+                next_generation.append(builder.marry(child))
+        generation = next_generation
+
+
+def build_loops(builder, size):
+    """First cousins that have children together."""
+    # Two siblings that each have a child
+    father, mother = builder.couple()
+    son, daughter = builder.children(father, mother, 2)
+    cousin_1 = builder.children(*builder.marry(son), number=1)[0]
+    cousin_2 = builder.children(*builder.marry(daughter), number=1)[0]
+    builder.update(cousin_1, sex=1)
+    builder.update(cousin_2, sex=2)
+    builder.children(cousin_1, cousin_2, max(1, size - len(builder.members)))
+
+
+BUILDERS = {
+    'trio': build_trio,
+    'quad': build_quad,
+    'multigen': build_multigen,
+    'loops': build_loops,
+}
+
+
+def generate_families(individuals, structure='mixed', seed=0):
+    """
+    Generate families until there are at least a number of individuals.
+
+    Arguments:
+        individuals (int): The number of individuals to generate
+        structure (str): Any of STRUCTURES
+        seed (int): Seed for the random generator
+
+    Yields:
+        members (list): The members of a family, see FamilyBuilder
+    """
+    rng = random.Random(seed)
+    names = [name for name, _ in MIXED_WEIGHTS]
+    weights = [weight for _, weight in MIXED_WEIGHTS]
+    generated = 0
+    while generated < individuals:
+        name = structure
+        if structure == 'mixed':
+            name = rng.choices(names, weights)[0]
+        builder = FamilyBuilder(rng)
+        BUILDERS[name](builder, rng.randint(8, 40))
+        generated += len(builder.members)
+        yield builder.members
+
+
+def member_ids(family_id, members, family_format):
+    """Return the individual ids of the members of a family."""
+    if family_format != 'cmms':
+        return ['{0}_{1}'.format(family_id, position)
+                for position in range(len(members))]
+    # <family>-<generation>-<code><affection status>, males have odd codes
+    ids = []
+    for position, (_, _, sex, phenotype, generation) in enumerate(members):
+        code = 2 * position + (1 if sex == 1 else 2)
+        ids.append('{0}-{1}-{2}{3}'.format(
+            family_id, ROMAN[min(generation, len(ROMAN) - 1)], code,
+            'A' if phenotype == 2 else 'U'))
+    return ids
+
+
+def generate_lines(individuals, structure='mixed', family_format='ped',
+                   seed=0):
+    """
+    Generate the lines of a pedigree file.
+
+    Arguments:
+        individuals (int): The number of individuals to generate
+        structure (str): Any of STRUCTURES
+        family_format (str): Any of FORMATS
+        seed (int): Seed for the random generator
+
+    Yields:
+        line (str): The lines of the file, ending with a newline
+    """
+    header = ['#FamilyID', 'SampleID', 'Father', 'Mother', 'Sex', 'Phenotype']
+    if family_format != 'ped':
+        header += ALT_COLUMNS
+    yield '\t'.join(header) + '\n'
+
+    rng = random.Random(seed + 1)
+    families = generate_families(individuals, structure, seed)
+    for number, members in enumerate(families, 1):
+        family_id = str(number)
+        ids = member_ids(family_id, members, family_format)
+        model = rng.choice(MODELS)
+        for position, (father, mother, sex, phenotype, _) in enumerate(members):
+            row = [
+                family_id,
+                ids[position],
+                '0' if father is None else ids[father],
+                '0' if mother is None else ids[mother],
+                str(sex),
+                str(phenotype),
+            ]
+            if family_format != 'ped':
+                row += [model, 'Yes' if position == len(members) - 1 else 'No',
+                        '.', 'Yes']
+            yield '\t'.join(row) + '\n'
+
+
+@click.command()
+@click.option('-n', '--individuals',
+                default=1000,
+                help='Number of individuals to generate.'
+)
+@click.option('-s', '--structure',
+                type=click.Choice(STRUCTURES),
+                default='mixed',
+                help='Structure of the families.'
+)
+@click.option('-f', '--family_format',
+                type=click.Choice(FORMATS),
+                default='ped',
+                help='Format of the file.'
+)
+@click.option('--seed',
+                default=0,
+                help='Seed for the random generator.'
+)
+@click.option('-o', '--outfile',
+                type=click.File('w'),
+                default='-',
+                help='File to write to, default is stdout.'
+)
+def cli(individuals, structure, family_format, seed, outfile):
+    """Generate a synthetic pedigree file."""
+    outfile.writelines(
+        generate_lines(individuals, structure, family_format, seed))
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+run.py
+
+Run the benchmark suite and compare the results to a baseline.
+
+The suite measures
+
+parse_<format> Individuals parsed per second from a generated file
+family_check_<size> Seconds to check one multi generation family
+family_check_large Seconds to check one family with all the individuals,
+                   made of three generation units
+peak_memory_family_check_large Peak MB allocated by family_check_large
+<method> Seconds for to_ped, to_madeline, to_json and to_ndjson of the
+         parsed ped file
+peak_memory_parse Peak MB allocated by python when parsing the ped file
+
+Each timing is the fastest of a number of runs. The results are printed and
+compared to a baseline, a json file from an earlier run. Results that are
+worse than the baseline by more than the threshold are flagged and the exit
+code is 1. Baselines depend on the machine so they are not committed.
+
+Run from the root of the repository:
+
+    python benchmarks/run.py --save-baseline
+    python benchmarks/run.py
+"""
+
+from __future__ import print_function
+
+import io
+import os
+import sys
+import json
+import random
+import shutil
+import timeit
+import platform
+import tempfile
+import tracemalloc
+
+from datetime import datetime
+
+import click
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from ped_parser import FamilyParser, Family, Individual
+
+from generate import (FORMATS, STRUCTURES, FamilyBuilder, build_multigen,
+                      generate_lines)
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def best_time(function, repeat):
+    """Return the fastest of repeat runs of function in seconds."""
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def result(value, unit, higher_is_better=False):
+    """Return a benchmark result."""
+    return {'value': value, 'unit': unit,
+            'higher_is_better': higher_is_better}
+
+
+def parse_options(family_format):
+    """Return the FamilyParser arguments for a generated format."""
+    if family_format == 'cmms':
+        return {'family_type': 'cmms', 'cmms_check': True}
+    return {'family_type': family_format}
+
+
+def parse_file(path, family_format, workers=1):
+    """Parse a generated file and return the parser."""
+    with open(path, 'r') as handle:
+        return FamilyParser(handle, workers=workers,
+                            **parse_options(family_format))
+
+
+def multigen_family(size, seed=0):
+    """Return one multi generation family with a number of members."""
+    builder = FamilyBuilder(random.Random(seed))
+    build_multigen(builder, size)
+    family = Family('1')
+    ids = ['ind_{0}'.format(position)
+           for position in range(len(builder.members))]
+    for position, (father, mother, sex, phenotype, _) in enumerate(
+            builder.members):
+        family.add_individual(Individual(
+            ids[position], family='1',
+            father='0' if father is None else ids[father],
+            mother='0' if mother is None else ids[mother],
+            sex=str(sex), phenotype=str(phenotype)))
+    return family
+
+
+def large_family(size):
+    """
+    Return one family made of three generation units, up to size members.
+
+    Each unit is a couple with a son and a daughter that each have two
+    children with a spouse, so every member of the third generation has
+    grandparents and cousins.
+    """
+    family = Family('0')
+    def add(individual_id, father='0', mother='0', sex='1'):
+        family.add_individual(Individual(
+            individual_id, family='0', father=father, mother=mother,
+            sex=sex))
+    for unit in range(size // 10):
+        prefix = 'unit_{0}_'.format(unit)
+        add(prefix + 'grandfather')
+        add(prefix + 'grandmother', sex='2')
+        add(prefix + 'son', prefix + 'grandfather', prefix + 'grandmother')
+        add(prefix + 'daughter', prefix + 'grandfather', prefix + 'grandmother',
+            sex='2')
+        add(prefix + 'son_wife', sex='2')
+        add(prefix + 'daughter_husband')
+        for child in range(2):
+            add(prefix + 'son_child_{0}'.format(child), prefix + 'son',
+                prefix + 'son_wife')
+            add(prefix + 'daughter_child_{0}'.format(child),
+                prefix + 'daughter_husband', prefix + 'daughter')
+    return family
+
+
+def run_suite(individuals, structure, formats, sizes, repeat, workers):
+    """
+    Run the benchmarks.
+
+    Arguments:
+        individuals (int): Number of individuals in the generated files
+        structure (str): Structure of the generated families
+        formats (list): The file formats to parse
+        sizes (list): The family sizes for family_check
+        repeat (int): Number of runs of each benchmark
+        workers (int): Number of workers when parsing
+
+    Returns:
+        results (dict): {<name>: <result>}
+    """
+    results = {}
+    tmp_dir = tempfile.mkdtemp(prefix='ped_parser_bench')
+    try:
+        paths = {}
+        for family_format in formats:
+            paths[family_format] = os.path.join(
+                tmp_dir, 'cohort.{0}'.format(family_format))
+            with open(paths[family_format], 'w') as handle:
+                handle.writelines(generate_lines(
+                    individuals, structure, family_format))
+
+            seconds = best_time(
+                lambda: parse_file(paths[family_format], family_format,
+                                   workers), repeat)
+            results['parse_{0}'.format(family_format)] = result(
+                individuals / seconds, 'individuals/s', True)
+
+        for size in sizes:
+            families = [multigen_family(size) for _ in range(repeat)]
+            seconds = min(timeit.timeit(family.family_check, number=1)
+                          for family in families)
+            results['family_check_{0}'.format(size)] = result(seconds, 's')
+
+        family = large_family(individuals)
+        seconds = timeit.timeit(family.family_check, number=1)
+        results['family_check_large'] = result(seconds, 's')
+        family = large_family(individuals)
+        tracemalloc.start()
+        family.family_check()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results['peak_memory_family_check_large'] = result(
+            peak / 1024.0 ** 2, 'MB')
+
+        if 'ped' in paths:
+            family_parser = parse_file(paths['ped'], 'ped')
+            for method in ('to_ped', 'to_madeline', 'to_json'):
+                serializer = getattr(family_parser, method)
+                seconds = best_time(lambda: list(serializer()), repeat)
+                results[method] = result(seconds, 's')
+            seconds = best_time(
+                lambda: family_parser.to_ndjson(io.StringIO()), repeat)
+            results['to_ndjson'] = result(seconds, 's')
+
+            tracemalloc.start()
+            parse_file(paths['ped'], 'ped')
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results['peak_memory_parse'] = result(peak / 1024.0 ** 2, 'MB')
+    finally:
+        shutil.rmtree(tmp_dir)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results to a baseline.
+
+    Arguments:
+        results (dict): {<name>: <result>}
+        baseline (dict): {<name>: <result>} from an earlier run
+        threshold (float): Relative change that counts as a regression
+
+    Returns:
+        (changes, regressions): A dict with the relative change of each
+                                result that is in the baseline and a list
+                                with the names of the regressions
+    """
+    changes = {}
+    regressions = []
+    for name, current in sorted(results.items()):
+        if name not in baseline or not baseline[name]['value']:
+            continue
+        change = (current['value'] - baseline[name]['value']) / \
+            baseline[name]['value']
+        changes[name] = change
+        worse = -change if current['higher_is_better'] else change
+        if worse > threshold:
+            regressions.append(name)
+    return changes, regressions
+
+
+@click.command()
+@click.option('-n', '--individuals',
+                default=100000,
+                help='Number of individuals in the generated files.'
+)
+@click.option('-s', '--structure',
+                type=click.Choice(STRUCTURES),
+                default='mixed',
+                help='Structure of the generated families.'
+)
+@click.option('-f', '--family_format',
+                'formats',
+                type=click.Choice(FORMATS),
+                multiple=True,
+                help='Formats to parse, default is all.'
+)
+@click.option('--size',
+                'sizes',
+                type=int,
+                multiple=True,
+                help='Family sizes for family_check, default is 10, 100 '
+                     'and 1000.'
+)
+@click.option('-r', '--repeat',
+                default=3,
+                help='Number of runs, the fastest is reported.'
+)
+@click.option('-w', '--workers',
+                default=1,
+                help='Number of processes to parse with.'
+)
+@click.option('-b', '--baseline',
+                type=click.Path(),
+                default=BASELINE,
+                help='Baseline to compare to.'
+)
+@click.option('--save-baseline',
+                is_flag=True,
+                help='Save the results as the new baseline.'
+)
+@click.option('-t', '--threshold',
+                default=0.2,
+                help='Relative change that is flagged as a regression.'
+)
+@click.option('-o', '--outfile',
+                type=click.File('w'),
+                help='Write the results as json to a file.'
+)
+def cli(individuals, structure, formats, sizes, repeat, workers, baseline,
+        save_baseline, threshold, outfile):
+    """Run the benchmark suite."""
+    formats = list(formats or FORMATS)
+    sizes = list(sizes or [10, 100, 1000])
+    run = {
+        'date': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'individuals': individuals,
+        'structure': structure,
+        'workers': workers,
+        'results': run_suite(individuals, structure, formats, sizes, repeat,
+                             workers),
+    }
+
+    changes, regressions = {}, []
+    if os.path.isfile(baseline):
+        with open(baseline, 'r') as handle:
+            baseline_run = json.load(handle)
+        changes, regressions = compare(run['results'],
+                                       baseline_run['results'], threshold)
+        if baseline_run.get('individuals') != individuals:
+            print("Baseline is for {0} individuals".format(
+                baseline_run.get('individuals')))
+
+    for name, current in sorted(run['results'].items()):
+        line = "{0:<20}{1:>14.4f} {2:<14}".format(
+            name, current['value'], current['unit'])
+        if name in changes:
+            line += "{0:>+8.1%}".format(changes[name])
+        if name in regressions:
+            line += "  REGRESSION"
+        print(line)
+
+    if outfile:
+        json.dump(run, outfile, indent=2, sort_keys=True)
+    if save_baseline:
+        with open(baseline, 'w') as handle:
+            json.dump(run, handle, indent=2, sort_keys=True)
+        print("Saved baseline {0}".format(baseline))
+
+    if regressions:
+        print("{0} regressions over {1:.0%}".format(len(regressions),
+                                                   threshold))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    cli()
@@ -8,6 +8,14 @@ __version__ = '1.6.3'
 
 from ped_parser.individual import Individual
 from ped_parser.family import Family
-from ped_parser.parser import FamilyParser
+from ped_parser.parser import FamilyParser, iter_families
+from ped_parser.aio import aparse
+from ped_parser.memo import load, cache_info, cache_clear, configure_cache
+from ped_parser.table import PedigreeTable
+from ped_parser.kinship import KinshipMatrix
+from ped_parser.reader import MmapReader
+from ped_parser.compression import open_family_file
+from ped_parser.metrics import ParserMetrics
+from ped_parser.writer import BufferedWriter
 from ped_parser.log import init_log
 
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+aio.py
+
+Parse pedigrees from asyncio streams.
+
+aparse reads the lines of an asyncio StreamReader or any async iterator
+without blocking the event loop. The lines are parsed in small batches as
+they arrive and control is given back to the loop after each batch, while
+family_check runs in an executor, one task per pedigree. This way one event loop can ingest many
+pedigrees at the same time:
+
+    >async def handle_upload(reader, writer):
+        family_parser = await aparse(reader, family_type='alt')
+
+Threads are used by default. family_check is pure python so a
+ProcessPoolExecutor is needed for the checks to run in parallel, the
+results are merged back like in parallel.check_families:
+
+    >with ProcessPoolExecutor() as executor:
+        family_parsers = await asyncio.gather(
+            *[aparse(stream, executor=executor) for stream in streams])
+"""
+
+from __future__ import print_function
+
+import asyncio
+import logging
+
+from ped_parser.parser import FamilyParser
+from ped_parser.parallel import (check_packed_families, merge_family, 
+                                 pack_family)
+
+logger = logging.getLogger(__name__)
+
+# Number of lines that are read and parsed before the event loop gets control
+YIELD_EVERY = 100
+
+
+async def iter_lines(stream, encoding='utf-8'):
+    """
+    Yield the lines of an asyncio stream or an async iterator as they arrive.
+
+    Arguments:
+        stream (StreamReader): A StreamReader or an async iterator with
+                               lines as str or bytes
+        encoding (str): The encoding of lines that are bytes
+
+    Yields:
+        line (str): A line of the stream
+    """
+    async for line in stream:
+        if isinstance(line, bytes):
+            line = line.decode(encoding)
+        yield line
+
+
+def _add_lines(family_parser, lines, header_line=None):
+    """
+    Parse a batch of lines and add the individuals to the parser.
+
+    The header of alternative files is the last commented line, it is put
+    before the lines of each batch that comes after it.
+
+    Arguments:
+        family_parser (FamilyParser): The parser to add the individuals to
+        lines (list): The lines of the batch
+        header_line (str): The last commented line before the batch
+
+    Returns:
+        header_line (str): The last commented line after the batch
+    """
+    family_info = lines
+    if header_line is not None:
+        family_info = [header_line] + lines
+    for ind_object, models in family_parser.iter_individuals(family_info):
+        family_parser.add_individual(ind_object, models)
+    for line in reversed(lines):
+        if line.startswith('#'):
+            return line
+    return header_line
+
+
+async def acheck_families(families, executor=None):
+    """
+    Run family_check for all families in an executor.
+
+    The families are packed into compact tuples and checked in one call to
+    the executor, which keeps the overhead of a process pool low when many
+    pedigrees are parsed at once.
+
+    Arguments:
+        families (dict): A dictionary on the form {<family_id>: <Family>}
+        executor (Executor): Where to run the checks, default is the
+                             default executor of the event loop
+
+    Raises:
+        PedigreeError: The first error in the order of families
+    """
+    loop = asyncio.get_running_loop()
+    family_ids = list(families)
+    results, error = await loop.run_in_executor(
+        executor, check_packed_families,
+        [pack_family(families[family_id]) for family_id in family_ids])
+    for family_id, result in zip(family_ids, results):
+        merge_family(families[family_id], result)
+    if error is not None:
+        raise error
+
+
+async def aparse(stream, family_type='ped', cmms_check=False, executor=None,
+                 encoding='utf-8'):
+    """
+    Parse family info from an asyncio stream or an async iterator.
+
+    Arguments:
+        stream (StreamReader): A StreamReader or an async iterator with
+                               lines as str or bytes
+        family_type (str): Any of [ped, alt, cmms, fam, mip]
+        cmms_check (bool, optional): Perform CMMS validations?
+        executor (Executor): Where to run family_check, default is the
+                             default executor of the event loop
+        encoding (str): The encoding of lines that are bytes
+
+    Returns:
+        family_parser (FamilyParser): A parser with the checked families
+    """
+    family_parser = FamilyParser(family_type=family_type,
+                                 cmms_check=cmms_check)
+    # Only one batch of lines is held, the individuals are parsed as the
+    # lines arrive
+    header_line = None
+    lines = []
+    async for line in iter_lines(stream, encoding):
+        lines.append(line)
+        if len(lines) == YIELD_EVERY:
+            header_line = _add_lines(family_parser, lines, header_line)
+            lines = []
+            await asyncio.sleep(0)
+    _add_lines(family_parser, lines, header_line)
+    logger.debug("Parsed %s individuals", len(family_parser.individuals))
+
+    await acheck_families(family_parser.families, executor)
+    return family_parser
@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+batch.py
+
+Parse, validate and convert many pedigree files in one process pool.
+
+Starting one ped_parser process per file is dominated by the start up of
+python and the imports. run_batch parses each file in a pool of worker
+processes that are started once, writes the converted files to an output
+directory and returns a report of all files:
+
+    >report = run_batch(collect_files(['projects/']), 'checked',
+                        formats=['ped', 'json'], workers=8)
+    >report['summary']['failed']
+
+Each file in the report has
+
+path STR The pedigree file
+status STR 'ok' or 'failed'
+error_type STR Name of the exception if the file failed, like
+               PedigreeError or WrongLineFormat
+error STR The message of the exception
+families INT Number of families
+individuals INT Number of individuals
+outputs LIST The files that were written
+seconds FLOAT Wall clock seconds for the file
+phases DICT Wall seconds of parse, family_check and serialize, see
+            metrics.py
+"""
+
+from __future__ import print_function
+
+import io
+import os
+import glob
+import json
+import time
+import logging
+
+from concurrent.futures import ProcessPoolExecutor
+
+from ped_parser.parser import FamilyParser
+from ped_parser.writer import BufferedWriter
+from ped_parser.compression import open_family_file
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ['ped', 'madeline', 'json']
+
+# File extensions of the outputs
+EXTENSIONS = {'ped': '.ped', 'madeline': '.madeline', 'json': '.ndjson'}
+
+# Files that are collected from directories
+PATTERNS = ['*.ped', '*.fam', '*.ped.gz', '*.fam.gz', '*.ped.bgz',
+            '*.fam.bgz', '*.ped.zst', '*.fam.zst']
+
+# Extensions that are removed from the input to name the outputs
+INPUT_EXTENSIONS = ['.gz', '.bgz', '.zst', '.ped', '.fam', '.txt']
+
+
+def read_manifest(path):
+    """
+    Read the paths in a manifest file.
+
+    A manifest has one path per line, empty lines and lines that start
+    with '#' are skipped. Relative paths are relative to the manifest.
+
+    Arguments:
+        path (str): Path to a manifest
+
+    Returns:
+        paths (list): The paths in the manifest
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    paths = []
+    with io.open(path, 'r', encoding='utf-8') as handle:
+        for line in handle:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                paths.append(os.path.join(directory, line))
+    return paths
+
+
+def collect_files(sources, manifests=(), patterns=PATTERNS):
+    """
+    Collect pedigree files from directories, globs, files and manifests.
+
+    Arguments:
+        sources (list): Directories, glob patterns or paths to files
+        manifests (list): Paths to manifests, see read_manifest
+        patterns (list): Glob patterns of the files collected from
+                         directories
+
+    Returns:
+        paths (list): The files in order without duplicates
+    """
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            found = set()
+            for pattern in patterns:
+                found.update(glob.glob(os.path.join(source, pattern)))
+            paths.extend(sorted(found))
+        elif glob.has_magic(source):
+            paths.extend(sorted(glob.glob(source)))
+        else:
+            paths.append(source)
+    for manifest in manifests:
+        paths.extend(read_manifest(manifest))
+
+    seen = set()
+    unique_paths = []
+    for path in paths:
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            unique_paths.append(path)
+    return unique_paths
+
+
+def output_names(paths):
+    """
+    Return a unique base name for the outputs of each file.
+
+    Arguments:
+        paths (list): The pedigree files
+
+    Returns:
+        names (list): Base names without extension, in the same order
+    """
+    names = []
+    counts = {}
+    for path in paths:
+        name = os.path.basename(path)
+        stripped = True
+        while stripped:
+            stripped = False
+            for extension in INPUT_EXTENSIONS:
+                if name.endswith(extension) and len(name) > len(extension):
+                    name = name[:-len(extension)]
+                    stripped = True
+        counts[name] = counts.get(name, 0) + 1
+        if counts[name] > 1:
+            # Files with the same name in different directories
+            name = '{0}_{1}'.format(name, counts[name])
+        names.append(name)
+    return names
+
+
+def process_file(task):
+    """
+    Parse, validate and convert one pedigree file.
+
+    Errors are recorded in the result instead of raised so one bad file
+    does not stop the batch.
+
+    Arguments:
+        task (tuple): (path, name, outdir, formats, family_type,
+                       cmms_check)
+
+    Returns:
+        result (dict): The result of the file, see the module docstring
+    """
+    path, name, outdir, formats, family_type, cmms_check = task
+    start = time.perf_counter()
+    result = {
+        'path': path,
+        'status': 'ok',
+        'error_type': None,
+        'error': None,
+        'families': 0,
+        'individuals': 0,
+        'outputs': [],
+        'seconds': 0.0,
+        'phases': {},
+    }
+    family_parser = None
+    try:
+        # The files are processed in parallel, so bgzf is read by one thread
+        with open_family_file(path, threads=1) as handle:
+            family_parser = FamilyParser(handle, family_type=family_type,
+                                         cmms_check=cmms_check, metrics=True)
+        result['families'] = len(family_parser.families)
+        result['individuals'] = len(family_parser.individuals)
+        for output_format in formats:
+            outfile = os.path.join(
+                outdir, name + EXTENSIONS[output_format])
+            if os.path.abspath(outfile) == os.path.abspath(path):
+                raise IOError("Output would overwrite {0}".format(path))
+            with BufferedWriter(outfile) as writer:
+                if output_format == 'ped':
+                    writer.write_rows(family_parser.to_ped())
+                elif output_format == 'madeline':
+                    writer.write_rows(family_parser.to_madeline())
+                else:
+                    family_parser.to_ndjson(writer)
+            result['outputs'].append(outfile)
+    except Exception as e:
+        logger.debug("Failed to process %s", path, exc_info=True)
+        result['status'] = 'failed'
+        result['error_type'] = type(e).__name__
+        result['error'] = str(e) or repr(e)
+    if family_parser is not None:
+        result['phases'] = dict(
+            (phase_name, phase['wall']) for phase_name, phase in
+            family_parser.metrics.phases.items() if phase['calls'])
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def summarize(results, seconds):
+    """
+    Summarize the results of a batch.
+
+    Arguments:
+        results (list): Results from process_file
+        seconds (float): Wall clock seconds of the batch
+
+    Returns:
+        summary (dict): Counts of the files, families and individuals, the
+                        number of failures of each error type and timings
+    """
+    errors = {}
+    for result in results:
+        if result['error_type']:
+            errors[result['error_type']] = \
+                errors.get(result['error_type'], 0) + 1
+    failed = sum(errors.values())
+    return {
+        'files': len(results),
+        'succeeded': len(results) - failed,
+        'failed': failed,
+        'errors': errors,
+        'families': sum(result['families'] for result in results),
+        'individuals': sum(result['individuals'] for result in results),
+        'seconds': seconds,
+        'file_seconds': sum(result['seconds'] for result in results),
+    }
+
+
+def run_batch(paths, outdir, formats=('ped',), family_type='ped',
+              cmms_check=False, workers=None):
+    """
+    Parse, validate and convert pedigree files in a process pool.
+
+    Arguments:
+        paths (list): The pedigree files, see collect_files
+        outdir (str): Directory for the converted files, it is created if
+                      it does not exist
+        formats (list): Any of FORMATS, an empty list only validates
+        family_type (str): Any of [ped, alt, cmms, fam, mip]
+        cmms_check (bool, optional): Perform CMMS validations?
+        workers (int): Number of processes, default is the number of CPUs
+
+    Returns:
+        report (dict): {'files': <list with results>,
+                        'summary': <dict from summarize>}
+    """
+    for output_format in formats:
+        if output_format not in FORMATS:
+            raise ValueError("Unknown format {0}, use any of {1}".format(
+                output_format, ', '.join(FORMATS)))
+    if formats and not os.path.isdir(outdir):
+        os.makedirs(outdir)
+    workers = workers or os.cpu_count() or 1
+    tasks = [(path, name, outdir, list(formats), family_type, cmms_check)
+             for path, name in zip(paths, output_names(paths))]
+    logger.info("Processing %s files with %s workers", len(tasks), workers)
+
+    start = time.perf_counter()
+    if workers <= 1 or len(tasks) < 2:
+        results = [process_file(task) for task in tasks]
+    else:
+        # Small files are sent in chunks to keep the overhead low
+        chunksize = max(1, len(tasks) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(process_file, tasks,
+                                        chunksize=chunksize))
+    return {
+        'files': results,
+        'summary': summarize(results, time.perf_counter() - start),
+    }
+
+
+def write_report(report, path):
+    """Write a batch report as json."""
+    with io.open(path, 'w', encoding='utf-8') as handle:
+        handle.write(json.dumps(report, indent=2, sort_keys=True))
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+cache.py
+
+A binary cache of parsed pedigree files.
+
+The families and individuals of a parsed file are pickled to a sidecar file
+next to the pedigree file, <path>.cache. The cache is keyed by the path,
+size, modification time and a sha1 hash of the content of the pedigree file
+together with the options that where used when parsing. If any of these
+differ the cache is ignored and rewritten.
+
+The cache files are pickles, only use caches that you have written yourself.
+"""
+
+from __future__ import print_function
+
+import os
+import hashlib
+import logging
+import pickle
+
+logger = logging.getLogger(__name__)
+
+# Bump this when the layout of the cached objects change
+CACHE_VERSION = 3
+
+
+def cache_path(path):
+    """Return the path to the cache file of a pedigree file."""
+    return path + '.cache'
+
+
+def content_hash(path, block_size=1024 * 1024):
+    """
+    Return the sha1 hex digest of the content of a file.
+
+    Arguments:
+        path (str): Path to a file
+        block_size (int): Number of bytes to read at a time
+
+    Returns:
+        str: The hex digest
+    """
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as handle:
+        block = handle.read(block_size)
+        while block:
+            sha1.update(block)
+            block = handle.read(block_size)
+    return sha1.hexdigest()
+
+
+def fingerprint(path, family_type, cmms_check):
+    """
+    Return the fingerprint of a file without the content hash.
+
+    Arguments:
+        path (str): Path to a file
+        family_type (str): The family type used when parsing
+        cmms_check (bool): If CMMS validations where used
+
+    Returns:
+        dict: The fingerprint
+    """
+    stat = os.stat(path)
+    return {
+        'version': CACHE_VERSION,
+        'path': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'family_type': family_type,
+        'cmms_check': cmms_check,
+    }
+
+
+def load_cache(path, family_type, cmms_check):
+    """
+    Load the parsed families from the cache of a pedigree file.
+
+    Arguments:
+        path (str): Path to the pedigree file
+        family_type (str): The family type used when parsing
+        cmms_check (bool): If CMMS validations where used
+
+    Returns:
+        (families, individuals): The cached dictionaries or None if there
+                                 is no valid cache
+    """
+    cache_file = cache_path(path)
+    if not os.path.isfile(cache_file):
+        return None
+    try:
+        with open(cache_file, 'rb') as handle:
+            key = pickle.load(handle)
+            expected = fingerprint(path, family_type, cmms_check)
+            # Compare the cheap parts before the content hash
+            if any(key.get(name) != expected[name] for name in expected):
+                logger.info("Cache %s is outdated", cache_file)
+                return None
+            if key.get('sha1') != content_hash(path):
+                logger.info("Cache %s is outdated", cache_file)
+                return None
+            families, individuals = pickle.load(handle)
+    except Exception as e:
+        logger.warning("Could not read cache %s: %s", cache_file, e)
+        return None
+
+    logger.info("Using cache %s", cache_file)
+    return families, individuals
+
+
+def write_cache(path, family_type, cmms_check, families, individuals):
+    """
+    Write the parsed families of a pedigree file to its cache.
+
+    The cache is first written to a temporary file that is moved in place.
+    Failing to write the cache is logged but not raised.
+
+    Arguments:
+        path (str): Path to the pedigree file
+        family_type (str): The family type used when parsing
+        cmms_check (bool): If CMMS validations where used
+        families (dict): The families of the parser
+        individuals (dict): The individuals of the parser
+    """
+    cache_file = cache_path(path)
+    tmp_file = '{0}.{1}.tmp'.format(cache_file, os.getpid())
+    key = fingerprint(path, family_type, cmms_check)
+    key['sha1'] = content_hash(path)
+    try:
+        with open(tmp_file, 'wb') as handle:
+            pickle.dump(key, handle, pickle.HIGHEST_PROTOCOL)
+            pickle.dump((families, individuals), handle,
+                        pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except (IOError, OSError) as e:
+        logger.warning("Could not write cache %s: %s", cache_file, e)
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return
+
+    logger.info("Wrote cache %s", cache_file)
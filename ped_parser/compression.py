@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+compression.py
+
+Read compressed pedigree files.
+
+The compression is found from the first bytes of the data, the file
+extension is not used:
+
+gzip Files compressed with gzip, like .ped.gz
+bgzf Blocked gzip from bgzip or htslib, like .fam.bgz. BGZF files are also
+     valid gzip files
+zstd Files compressed with zstandard, like .ped.zst. Requires the
+     zstandard package
+
+BGZF files consist of independent blocks of at most 64 kB. The blocks are
+decompressed by a pool of threads, zlib releases the GIL while it inflates
+so the blocks are decompressed in parallel while the lines of earlier
+blocks are parsed.
+
+open_family_file opens a path or stdin as a text stream:
+
+    >with open_family_file('families.ped.gz') as handle:
+        family_parser = FamilyParser(handle)
+
+FamilyParser and iter_families also decompress open text handles of
+compressed files, like the ones from open() or the command line.
+"""
+
+from __future__ import print_function
+
+import io
+import os
+import sys
+import zlib
+import gzip
+import struct
+import logging
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+COMPRESSIONS = ['gzip', 'bgzf', 'zstd']
+
+# Number of bytes needed to tell gzip from bgzf
+MAGIC_SIZE = 16
+
+# Default number of threads that decompress bgzf blocks
+THREADS = min(4, os.cpu_count() or 1)
+
+
+def sniff_compression(data):
+    """
+    Find the compression of data from its first bytes.
+
+    Arguments:
+        data (bytes): The first MAGIC_SIZE bytes of the data
+
+    Returns:
+        compression (str): Any of COMPRESSIONS or None if uncompressed
+    """
+    if data[:4] == ZSTD_MAGIC:
+        return 'zstd'
+    if data[:2] != GZIP_MAGIC:
+        return None
+    # BGZF sets FEXTRA with a 'BC' subfield that holds the block size
+    if len(data) >= 16 and data[3] & 4 and data[12:14] == b'BC':
+        return 'bgzf'
+    return 'gzip'
+
+
+def detect_compression(path):
+    """
+    Find the compression of a file on disk.
+
+    Arguments:
+        path (str): Path to a file
+
+    Returns:
+        compression (str): Any of COMPRESSIONS or None if uncompressed
+    """
+    with io.open(path, 'rb') as handle:
+        return sniff_compression(handle.read(MAGIC_SIZE))
+
+
+def inflate_block(block, offset):
+    """
+    Decompress a BGZF block and check its CRC and size.
+
+    Arguments:
+        block (bytes): A whole BGZF block
+        offset (int): Byte offset of the block in the file, for errors
+
+    Returns:
+        data (bytes): The decompressed data
+    """
+    extra_length = struct.unpack('<H', block[10:12])[0]
+    crc, size = struct.unpack('<II', block[-8:])
+    data = zlib.decompress(block[12 + extra_length:-8], -15)
+    if len(data) != size or zlib.crc32(data) & 0xffffffff != crc:
+        raise IOError("Corrupt BGZF block at byte {0}".format(offset))
+    return data
+
+
+class BgzfReader(io.RawIOBase):
+    """
+    Read the decompressed data of a BGZF stream.
+
+    Blocks are read in order and decompressed by a pool of threads, a few
+    blocks ahead of the reader.
+    """
+    def __init__(self, fileobj, threads=THREADS, name=None):
+        """
+        Arguments:
+            fileobj (file): A binary stream with BGZF data, it is closed
+                            when the reader is closed
+            threads (int): Number of threads that decompress blocks
+            name (str): The name of the stream, default is fileobj.name
+        """
+        super(BgzfReader, self).__init__()
+        self.fileobj = fileobj
+        self.name = name or getattr(fileobj, 'name', None)
+        self.threads = threads
+        self._offset = 0
+        self._data = memoryview(b'')
+        self._position = 0
+        self._pending = deque()
+        self._executor = None
+        if threads > 1:
+            self._executor = ThreadPoolExecutor(max_workers=threads)
+
+    def readable(self):
+        return True
+
+    def _read_block(self):
+        """Return the next raw block and its offset, None at end of file."""
+        header = self.fileobj.read(12)
+        if not header:
+            return None
+        if len(header) < 12 or header[:2] != GZIP_MAGIC or not header[3] & 4:
+            raise IOError("Not a BGZF block at byte {0}".format(self._offset))
+        extra_length = struct.unpack('<H', header[10:12])[0]
+        extra = self.fileobj.read(extra_length)
+        block_size = None
+        position = 0
+        while position + 4 <= len(extra):
+            subfield_length = struct.unpack(
+                '<H', extra[position + 2:position + 4])[0]
+            if extra[position:position + 2] == b'BC':
+                block_size = struct.unpack(
+                    '<H', extra[position + 4:position + 6])[0] + 1
+                break
+            position += 4 + subfield_length
+        if block_size is None:
+            raise IOError("BGZF block without size at byte {0}".format(
+                self._offset))
+        rest = self.fileobj.read(block_size - 12 - extra_length)
+        block = header + extra + rest
+        if len(block) != block_size:
+            raise IOError("Truncated BGZF block at byte {0}".format(
+                self._offset))
+        offset = self._offset
+        self._offset += block_size
+        return block, offset
+
+    def _next_data(self):
+        """Return the data of the next block, None at end of file."""
+        if self._executor is None:
+            raw_block = self._read_block()
+            return None if raw_block is None else inflate_block(*raw_block)
+        # Keep the pool busy with the blocks after the one that is returned
+        while len(self._pending) < 2 * self.threads:
+            raw_block = self._read_block()
+            if raw_block is None:
+                break
+            self._pending.append(
+                self._executor.submit(inflate_block, *raw_block))
+        if not self._pending:
+            return None
+        return self._pending.popleft().result()
+
+    def readinto(self, buffer):
+        """Read decompressed data into a writable buffer."""
+        while self._position >= len(self._data):
+            data = self._next_data()
+            if data is None:
+                return 0
+            # The last block of a file is empty
+            self._data = memoryview(data)
+            self._position = 0
+        size = min(len(buffer), len(self._data) - self._position)
+        buffer[:size] = self._data[self._position:self._position + size]
+        self._position += size
+        return size
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._executor is not None:
+                for future in self._pending:
+                    future.cancel()
+                self._executor.shutdown(wait=True)
+            self.fileobj.close()
+        finally:
+            super(BgzfReader, self).close()
+
+    def __repr__(self):
+        return "BgzfReader(name={0}, threads={1})".format(self.name,
+                                                          self.threads)
+
+
+def decompress_stream(fileobj, compression, threads=THREADS):
+    """
+    Return a binary stream with the decompressed data of fileobj.
+
+    Arguments:
+        fileobj (file): A binary stream with compressed data
+        compression (str): Any of COMPRESSIONS
+        threads (int): Number of threads that decompress bgzf blocks
+
+    Returns:
+        stream (file): A readable binary stream
+    """
+    if compression == 'bgzf':
+        return io.BufferedReader(BgzfReader(fileobj, threads))
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=fileobj, mode='rb')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("Reading zstd files requires zstandard. Please "\
+                              "install it with 'pip install zstandard'")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(
+            fileobj, read_across_frames=True))
+    raise ValueError("Unknown compression {0}".format(compression))
+
+
+def open_family_file(path, encoding='utf-8', threads=THREADS):
+    """
+    Open a pedigree file that may be compressed as a text stream.
+
+    Arguments:
+        path (str): Path to a file, '-' for stdin
+        encoding (str): The encoding of the decompressed file
+        threads (int): Number of threads that decompress bgzf blocks
+
+    Returns:
+        handle (file): A text stream with the lines of the file
+    """
+    if path == '-':
+        fileobj = sys.stdin.buffer
+    else:
+        fileobj = io.open(path, 'rb')
+    compression = sniff_compression(peek(fileobj))
+    logger.debug("Compression of %s: %s", path, compression)
+    if compression is not None:
+        fileobj = decompress_stream(fileobj, compression, threads)
+    return io.TextIOWrapper(fileobj, encoding=encoding)
+
+
+def peek(fileobj, size=MAGIC_SIZE):
+    """Return the next bytes of a buffered binary stream without reading."""
+    # peek fills the buffer if it is empty and may return more than size
+    return fileobj.peek(size)[:size]
+
+
+def decompress_family_info(family_info, threads=THREADS):
+    """
+    Decompress a text handle to a compressed file.
+
+    Text handles from open() or the command line decode the compressed
+    bytes. If nothing has been read from the handle the first bytes are
+    sniffed and the lines are read through a decompressor instead.
+
+    Arguments:
+        family_info (iterator): An iterator with family info
+        threads (int): Number of threads that decompress bgzf blocks
+
+    Returns:
+        family_info (iterator): A decompressing text stream, or family_info
+                                if it is not a text handle to compressed data
+    """
+    buffer = getattr(family_info, 'buffer', None)
+    if not hasattr(buffer, 'peek'):
+        # Only buffered binary streams can be sniffed without reading
+        return family_info
+    try:
+        if family_info.tell() != 0:
+            return family_info
+    except (IOError, ValueError):
+        # Pipes can not tell, they are sniffed if nothing is buffered
+        pass
+    compression = sniff_compression(peek(buffer))
+    if compression is None:
+        return family_info
+    logger.info("Reading %s compressed family info", compression)
+    stream = decompress_stream(buffer, compression, threads)
+    return io.TextIOWrapper(stream, encoding=family_info.encoding)
@@ -6,7 +6,8 @@ class WrongAffectionStatus(Exception):
             cmms_id (str): A string that describes the id
             valid_statuses (list): A list with the valid affections statuses
         """
-        super(WrongAffectionStatus, self).__init__()
+        super(WrongAffectionStatus, self).__init__(cmms_id, valid_statuses,
+                                                   message)
         self.cmms_id = cmms_id
         self.valid_statuses = valid_statuses
         self.message = message
@@ -24,7 +25,8 @@ class WrongPhenotype(Exception):
             affection_status (str): A str that describes the cmms 
                                     affections status
         """
-        super(WrongPhenotype, self).__init__()
+        super(WrongPhenotype, self).__init__(cmms_id, phenotype, 
+                                             affection_status, message)
         self.cmms_id = cmms_id
         self.phenotype = phenotype
         self.affection_status = affection_status
@@ -43,7 +45,7 @@ class WrongGender(Exception):
             sex_code (str): A str that describes the cmms 
                                     sex
         """
-        super(WrongGender, self).__init__()
+        super(WrongGender, self).__init__(cmms_id, sex, sex_code, message)
         self.cmms_id = cmms_id
         self.sex = sex
         self.sex_code = sex_code
@@ -60,7 +62,7 @@ class PedigreeError(Exception):
             family_id (str): A string that describes the family id
             individual_id (str): A str with the individual id
         """
-        super(PedigreeError, self).__init__()
+        super(PedigreeError, self).__init__(family_id, individual_id, message)
         self.family_id = family_id
         self.individual_id = individual_id
         self.message = message
@@ -76,7 +78,7 @@ class WrongLineFormat(Exception):
             message (str): A string with error message
             ped_line (str): The wrong formatted line
         """
-        super(WrongLineFormat, self).__init__()
+        super(WrongLineFormat, self).__init__(message, ped_line)
         self.message = message
         self.ped_line = ped_line
 
@@ -84,3 +86,19 @@ class WrongLineFormat(Exception):
         return self.message
 
 
+
+class NotIndexedError(KeyError):
+    """Error for lookups of ids that are not in a PedigreeIndex"""
+    def __init__(self, kind, lookup_id, message=""):
+        """
+        Arguments:
+            kind (str): 'sample' or 'family'
+            lookup_id (str): The id that was looked up
+        """
+        super(NotIndexedError, self).__init__(kind, lookup_id, message)
+        self.kind = kind
+        self.lookup_id = lookup_id
+        self.message = message
+
+    def __str__(self):
+        return self.message
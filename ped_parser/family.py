@@ -10,6 +10,7 @@ Holds the meta information of a family and its individuals.
 Attributes:
 
 individuals DICT dictionary with family members on the form {<ind_id>:<Individual_obj>}
+models INT Bitflags with the models of inheritance of the family, see models.py
 variants DICT dictionary with all the variants that exists in the family on the form {<var_id>:<Variant_obj>}
 
 
@@ -25,29 +26,43 @@ import logging
 import click
 
 from ped_parser.exceptions import PedigreeError
+from ped_parser.ids import registry
+from ped_parser.models import model_table, ModelSet
+from ped_parser.graph import FamilyGraph
+from ped_parser.writer import (BufferedWriter, get_ped_header, 
+                               ped_row_formatter)
+
+# Meioses from cousins to their closest common ancestors
+FIRST_COUSIN_MEIOSES = 2
+SECOND_COUSIN_MEIOSES = 3
 
 class Family(object):
     """Base class for the family parsers."""
-    def __init__(self, family_id, individuals = {}, models_of_inheritance=set([]),
+    def __init__(self, family_id, individuals=None, models_of_inheritance=None,
                 logger=None, logfile=None, loglevel=None):
         super(Family, self).__init__()
         self.logger = logging.getLogger(__name__)
         # Each family needs to have a family id
         self.family_id = family_id
-        self.logger.debug("Initiating family with id:{0}".format(self.family_id))
+        self.logger.debug("Initiating family with id:%s", self.family_id)
         
          # This is a dict with individual objects
+        if individuals is None:
+            individuals = {}
         self.individuals = individuals
-        self.logger.debug("Adding individuals:{0}".format(
-            ','.join([ind for ind in self.individuals])
-        ))
+        if self.individuals and self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Adding individuals:%s", 
+                              ','.join(self.individuals))
         
-        # List of models of inheritance that should be prioritized.
-        self.models_of_inheritance = models_of_inheritance 
-        self.logger.debug("Adding models of inheritance:{0}".format(
-            ','.join(self.models_of_inheritance)
-            )
-        )
+        # Models of inheritance that should be prioritized, as bitflags.
+        # models_of_inheritance can be names, a ';'-separated string or flags
+        self.models = 0
+        if models_of_inheritance:
+            self.models = model_table.to_flags(models_of_inheritance)
+        if self.models and self.logger.isEnabledFor(
+                logging.DEBUG):
+            self.logger.debug("Adding models of inheritance:%s", 
+                              ','.join(self.models_of_inheritance))
         
         #Trios are a list of sets with trios.
         self.trios = []
@@ -57,6 +72,52 @@ class Family(object):
         self.no_relations = True
         # Set of affected individual id:s
         self.affected_individuals = set()
+        # Graph index of the parent links, built when first used
+        self._graph = None
+    
+    @property
+    def models_of_inheritance(self):
+        """
+        ModelSet: The names of the models of inheritance of the family.
+        
+        The set is a view of self.models, adding names to it sets their 
+        bits in self.models.
+        """
+        return ModelSet(self)
+    
+    @models_of_inheritance.setter
+    def models_of_inheritance(self, value):
+        self.models = model_table.to_flags(value)
+    
+    def has_models(self, models, match_all=True):
+        """
+        Check if the family has models of inheritance.
+        
+        Arguments:
+            models (int or list): Flags or names of models
+            match_all (bool): If all models are required, otherwise any of
+                              them is enough
+        
+        Returns:
+            bool: True if the family has the models
+        """
+        flags = model_table.to_flags(models, strict=True)
+        if match_all:
+            return self.models & flags == flags
+        return bool(self.models & flags)
+    
+    @property
+    def graph(self):
+        """
+        FamilyGraph: The graph index of the family.
+        
+        The index is built the first time it is used after a member was
+        added, see graph.py. It is only needed for relationship queries,
+        family_check does not build it.
+        """
+        if self._graph is None:
+            self._graph = FamilyGraph(self)
+        return self._graph
     
     def family_check(self):
         """
@@ -68,54 +129,181 @@ class Family(object):
         since GATK can only do phasing of trios and duos.
         """
         #TODO Make some tests for these
-        self.logger.info("Checking family relations for {0}".format(
-            self.family_id)
-        )
+        self.logger.info("Checking family relations for %s", self.family_id)
+        # Check the level once, the loop below runs for every individual
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        # Grandparents and cousins are only searched for in families with 
+        # three generations
+        three_generations = False
+        ids = registry.ids
+        members = self.member_indexes()
+        fathers_children, mothers_children = self.children_by_index()
         for individual_id in self.individuals:
             
-            self.logger.debug("Checking individual {0}".format(individual_id))
+            if debug:
+                self.logger.debug("Checking individual %s", individual_id)
             individual = self.individuals[individual_id]
             
-            self.logger.debug("Checking if individual {0} is affected".format(
-                individual_id))
-            
             if individual.affected:
-                self.logger.debug("Found affected individual {0}".format(
-                    individual_id)
-                )
+                if debug:
+                    self.logger.debug("Found affected individual %s", 
+                                      individual_id)
                 self.affected_individuals.add(individual_id)
             
-            father = individual.father
-            mother = individual.mother
+            # Parent links are registry indexes, 0 if missing
+            father = individual._father
+            mother = individual._mother
             
             if individual.has_parents:
-                self.logger.debug("Individual {0} has parents".format(
-                    individual_id))
+                if debug:
+                    self.logger.debug("Individual %s has parents", 
+                                      individual_id)
                 self.no_relations = False
                 try:
-                    self.check_parent(father, father=True)
-                    self.check_parent(mother, father=False)
+                    for parent, is_father in ((father, True), (mother, False)):
+                        if parent:
+                            self.check_parent_individual(
+                                ids[parent], members.get(parent), is_father)
                 except PedigreeError as e:
                     self.logger.error(e.message)
                     raise e
                 
+                if not three_generations:
+                    three_generations = any(
+                        members[parent].has_parents 
+                        for parent in (father, mother) if parent)
+                
                 # Check if there is a trio
                 if individual.has_both_parents:
-                    self.trios.append(set([individual_id, father, mother]))
-                elif father != '0':
-                    self.duos.append(set([individual_id, father]))
+                    self.trios.append(
+                        set([individual_id, ids[father], ids[mother]]))
+                elif father:
+                    self.duos.append(set([individual_id, ids[father]]))
                 else:
-                    self.duos.append(set([individual_id, mother]))
-                
-                ##TODO self.check_grandparents(individual)
+                    self.duos.append(set([individual_id, ids[mother]]))
             
-            # Annotate siblings:
-            for individual_2_id in self.individuals:
-                if individual_id != individual_2_id:
-                    if self.check_siblings(individual_id, individual_2_id):
-                        individual.siblings.add(individual_2_id)
-                    ##TODO elif self.check_cousins(individual_id, individual_2_id):
-                    #     individual.cousins.add(individual_2_id)
+            # Annotate siblings, that is everyone that share a parent:
+            for parent, children in ((father, fathers_children), 
+                                     (mother, mothers_children)):
+                if parent:
+                    for sibling_id in children[parent]:
+                        if sibling_id != individual_id:
+                            individual.siblings.add(sibling_id)
+        
+        # Annotate grandparents and cousins
+        if three_generations:
+            self.annotate_relatives(members)
+    
+    def annotate_relatives(self, members):
+        """
+        Set the grandparents, first_cousins and second_cousins of members.
+        
+        Relatives are found by following the parent links up from each 
+        individual and the child links down from its ancestors, so the work
+        is bounded by the relatives within six meioses of each individual
+        and no FamilyGraph is built. Like in FamilyGraph.relationships a 
+        relative is classified by its closest common ancestors with the 
+        individual, first cousins are two meioses from them on both sides
+        and second cousins three.
+        
+        Arguments:
+            members (dict): A dictionary on the form {<index>: <Individual>}
+        """
+        ids = registry.ids
+        children = {}
+        for index, individual in members.items():
+            for parent in (individual._father, individual._mother):
+                if parent:
+                    children.setdefault(parent, []).append(index)
+        
+        for index, individual in members.items():
+            # ancestors[m] are the ancestors m meioses from the individual
+            ancestors = [set([index])]
+            for _ in range(2 * SECOND_COUSIN_MEIOSES - 1):
+                ancestors.append(set(
+                    parent for member in ancestors[-1] 
+                    for parent in (members[member]._father, 
+                                   members[member]._mother) if parent))
+            if not ancestors[2]:
+                # No grandparents, so no cousins
+                continue
+            for grandparent in ancestors[2]:
+                individual.grandparents[ids[grandparent]] = ''
+            
+            # below[m][d] are the members d meioses down from ancestors[m]
+            below = [[level] for level in ancestors]
+            assigned = set([index])
+            for total in range(1, 2 * SECOND_COUSIN_MEIOSES + 1):
+                for meioses_1 in range(total + 1):
+                    if meioses_1 > SECOND_COUSIN_MEIOSES and (
+                            total == 2 * SECOND_COUSIN_MEIOSES):
+                        break
+                    levels = below[meioses_1]
+                    if len(levels) == total - meioses_1:
+                        levels.append(set(
+                            child for member in levels[-1] 
+                            for child in children.get(member, ())))
+                    reached = levels[-1] - assigned
+                    if not reached:
+                        continue
+                    assigned |= reached
+                    if meioses_1 != total - meioses_1:
+                        continue
+                    if meioses_1 == FIRST_COUSIN_MEIOSES:
+                        individual.first_cousins.update(
+                            ids[relative] for relative in reached)
+                    elif meioses_1 == SECOND_COUSIN_MEIOSES:
+                        individual.second_cousins.update(
+                            ids[relative] for relative in reached)
+    
+    def member_indexes(self):
+        """
+        Return the members of the family by the registry index of their id.
+        
+        Returns:
+            members (dict): A dictionary on the form {<index>: <Individual>}
+        """
+        return dict((individual._index, individual) 
+                    for individual in self.individuals.values())
+    
+    def children_by_index(self):
+        """
+        Return the children of each father and mother in the family.
+        
+        Parents that are not members of the family are also included.
+        
+        Returns:
+            (fathers_children, mothers_children): Two dictionaries on the 
+                    form {<parent_index>: [<child_id>, ...]} where the 
+                    parents are registry indexes
+        """
+        fathers_children = {}
+        mothers_children = {}
+        for individual_id in self.individuals:
+            individual = self.individuals[individual_id]
+            if individual._father:
+                fathers_children.setdefault(
+                    individual._father, []).append(individual_id)
+            if individual._mother:
+                mothers_children.setdefault(
+                    individual._mother, []).append(individual_id)
+        return fathers_children, mothers_children
+    
+    def get_children(self):
+        """
+        Return the children of each father and mother in the family.
+        
+        Parents that are not members of the family are also included.
+        
+        Returns:
+            (fathers_children, mothers_children): Two dictionaries on the 
+                    form {<parent_id>: [<child_id>, ...]}
+        """
+        ids = registry.ids
+        return tuple(
+            dict((ids[parent], children) for parent, children in 
+                 parents_children.items())
+            for parents_children in self.children_by_index())
     
     def check_parent(self, parent_id, father = False):
         """
@@ -128,21 +316,37 @@ class Family(object):
             The parent id is not present
             The gender of the parent is wrong.
         """
-        self.logger.debug("Checking parent {0}".format(parent_id))
+        self.logger.debug("Checking parent %s", parent_id)
         if parent_id != '0':
-            if parent_id not in self.individuals:
-                raise PedigreeError(self.family_id, parent_id, 
-                                    'Parent is not in family.')
-            if father:
-                if self.individuals[parent_id].sex != 1:
-                    raise PedigreeError(self.family_id, parent_id, 
-                                        'Father is not specified as male.')
-            else:
-                if self.individuals[parent_id].sex != 2:
-                    raise PedigreeError(self.family_id, parent_id, 
-                                        'Mother is not specified as female.')
+            self.check_parent_individual(
+                parent_id, self.individuals.get(parent_id), father)
         return
     
+    def check_parent_individual(self, parent_id, parent, father = False):
+        """
+        Check that a parent is in the family and has the right sex.
+        
+        Arguments:
+            parent_id (str): The id of the parent
+            parent (Individual): The parent, None if it is not in the family
+            father (bool): If the parent is the father
+        
+        Raises:
+            PedigreeError: If the parent is not in the family or has the 
+                           wrong sex
+        """
+        if parent is None:
+            raise PedigreeError(self.family_id, parent_id, 
+                                'Parent is not in family.')
+        if father:
+            if parent.sex != 1:
+                raise PedigreeError(self.family_id, parent_id, 
+                                    'Father is not specified as male.')
+        else:
+            if parent.sex != 2:
+                raise PedigreeError(self.family_id, parent_id, 
+                                    'Mother is not specified as female.')
+    
     def check_siblings(self, individual_1_id, individual_2_id):
         """
         Check if two family members are siblings.
@@ -156,13 +360,13 @@ class Family(object):
                    False if they are not siblings
         """
         
-        self.logger.debug("Checking if {0} and {1} are siblings".format(
-            individual_1_id, individual_2_id
-        ))
+        self.logger.debug("Checking if %s and %s are siblings", 
+                          individual_1_id, individual_2_id)
         ind_1 = self.individuals[individual_1_id]
         ind_2 = self.individuals[individual_2_id]
-        if ((ind_1.father != '0' and ind_1.father == ind_2.father) or 
-            (ind_1.mother != '0' and ind_1.mother == ind_2.mother)):
+        # Parents are compared by registry index, 0 is a missing parent
+        if ((ind_1._father and ind_1._father == ind_2._father) or 
+            (ind_1._mother and ind_1._mother == ind_2._mother)):
             return True
         else:
             return False
@@ -171,7 +375,8 @@ class Family(object):
         """
         Check if two family members are cousins.
         
-        If two individuals share any grandparents they are cousins.
+        If two individuals share any grandparents, but no parents, they are
+        cousins.
         
         Arguments: 
             individual_1_id (str): The id of an individual
@@ -182,12 +387,69 @@ class Family(object):
                    False if they are not cousins
         
         """
-        self.logger.debug("Checking if {0} and {1} are cousins".format(
-            individual_1_id, individual_2_id
-        ))
+        self.logger.debug("Checking if %s and %s are cousins", 
+                          individual_1_id, individual_2_id)
+        
+        if self.check_siblings(individual_1_id, individual_2_id):
+            return False
+        return bool(self.grandparent_indexes(individual_1_id) & 
+                    self.grandparent_indexes(individual_2_id))
+    
+    def grandparent_indexes(self, individual_id):
+        """
+        Return the grandparents of an individual that are in the family.
+        
+        Arguments: 
+            individual_id (str): The id of an individual
+        
+        Returns: 
+            grandparents (set): The registry indexes of the grandparents
+        """
+        ids = registry.ids
+        individual = self.individuals[individual_id]
+        grandparents = set()
+        for parent in (individual._father, individual._mother):
+            parent_object = self.individuals.get(ids[parent]) if parent else None
+            if parent_object is not None:
+                grandparents.update(
+                    grandparent for grandparent in 
+                    (parent_object._father, parent_object._mother)
+                    if grandparent and ids[grandparent] in self.individuals)
+        return grandparents
+    
+    def relationship(self, individual_1_id, individual_2_id):
+        """
+        Return the relationship of individual_2 to individual_1.
+        
+        family.relationship('proband', 'father').name is 'parent'.
+        
+        Arguments: 
+            individual_1_id (str): The id of an individual
+            individual_2_id (str): The id of an individual
+        
+        Returns: 
+            relationship (Relationship): A named tuple with name, degree, 
+                    meioses_1, meioses_2 and full, see graph.py
+        """
+        return self.graph.relationship(individual_1_id, individual_2_id)
+    
+    def relatives(self, individual_id, degree=2):
+        """
+        Return the relatives of an individual up to a degree of relationship.
+        
+        Parents, children and full siblings are of degree 1, grandparents, 
+        half siblings and aunts and uncles are of degree 2 and first cousins
+        are of degree 3.
+        
+        Arguments: 
+            individual_id (str): The id of an individual
+            degree (int): The highest degree of relationship to include
         
-        #TODO check if any of the parents are siblings
-        pass
+        Returns: 
+            relatives (dict): A dictionary on the form 
+                              {<individual_id>: <Relationship>}
+        """
+        return self.graph.relatives(individual_id, degree)
     
     def add_individual(self, individual_object):
         """
@@ -198,17 +460,16 @@ class Family(object):
             
         """
         ind_id = individual_object.individual_id
-        self.logger.info("Adding individual {0}".format(ind_id))
         family_id = individual_object.family
         if family_id != self.family_id:
-            raise PedigreeError(self.family, individual_object.individual_id,
+            raise PedigreeError(self.family_id, individual_object.individual_id,
                 "Family id of individual is not the same as family id for "\
                                     "Family object!")
         else:
             self.individuals[ind_id] = individual_object
-            self.logger.debug("Individual {0} added to family {1}".format(
-                ind_id, family_id
-            ))
+            self._graph = None
+            self.logger.debug("Individual %s added to family %s", 
+                              ind_id, family_id)
         return
     
     def get_phenotype(self, individual_id):
@@ -248,63 +509,45 @@ class Family(object):
         
         return [self.individuals[ind].to_json() for ind in self.individuals]
     
-    def to_ped(self, outfile=None):
+    def to_ped(self, outfile=None, extra_columns=None):
         """
         Print the individuals of the family in ped format
         
         The header will be the original ped header plus all headers found in
         extra info of the individuals
-        """
-        
-        ped_header = [
-            '#FamilyID',
-            'IndividualID',
-            'PaternalID',
-            'MaternalID', 
-            'Sex',
-            'Phenotype',
-        ]
-        
-        extra_headers = [
-            'InheritanceModel',
-            'Proband',
-            'Consultand',
-            'Alive'
-        ]
         
-        for individual_id in self.individuals:
-            individual = self.individuals[individual_id]
-            for info in individual.extra_info:
-                if info in extra_headers:
-                    if info not in ped_header:
-                        ped_header.append(info)
+        Arguments:
+            outfile (str or file): A path, an open stream or None for stdout.
+                                   The rows are written in chunks with a 
+                                   BufferedWriter.
+            extra_columns (list): The extra columns of the individuals, like
+                                  FamilyParser.extra_columns. If None they 
+                                  are collected from the individuals.
+        """
+        if extra_columns is None:
+            extra_columns = []
+            for individual in self.individuals.values():
+                for info in individual._extra_info or ():
+                    if info not in extra_columns:
+                        extra_columns.append(info)
         
-        self.logger.debug("Ped headers found: {0}".format(
-            ', '.join(ped_header)
-        ))
+        ped_header = get_ped_header(extra_columns)
+        self.logger.debug("Ped headers found: %s", ', '.join(ped_header))
         
-        if outfile:
-            outfile.write('\t'.join(ped_header)+'\n')
-        else:
-            print('\t'.join(ped_header))
-        
-        for individual in self.to_json():
-            ped_info = []
-            ped_info.append(individual['family_id'])
-            ped_info.append(individual['id'])
-            ped_info.append(individual['father'])
-            ped_info.append(individual['mother'])
-            ped_info.append(individual['sex'])
-            ped_info.append(individual['phenotype'])
-            
-            if len(ped_header) > 6:
-                for header in ped_header[6:]:
-                    ped_info.append(individual['extra_info'].get(header, '.'))
-            
-            if outfile:
-                outfile.write('\t'.join(ped_info)+'\n')
-            else:
-                print('\t'.join(ped_info))
+        format_row = ped_row_formatter(ped_header)
+        with BufferedWriter(outfile) as writer:
+            writer.write_row('\t'.join(ped_header))
+            writer.write_rows(map(format_row, self.individuals.values()))
+    
+    def __getstate__(self):
+        # The bits of added models are only valid in this process
+        state = self.__dict__.copy()
+        state['models'] = model_table.to_names(self.models)
+        return state
+    
+    def __setstate__(self, state):
+        state['models'] = model_table.to_flags(state['models'])
+        self.__dict__.update(state)
     
     def __repr__(self):
         return "Family(family_id={0}, individuals={1}, " \
@@ -0,0 +1,530 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+graph.py
+
+Precomputed graph index of the parent links in a family.
+
+The members of a family are given dense indexes and the index holds
+
+children LIST The indexes of the children of each member
+order LIST The indexes in topological order, parents before children
+depth LIST The generation of each member, founders have generation 0
+ancestors LIST Bitsets (python ints) with the ancestors of each member
+descendants LIST Bitsets (python ints) with the descendants of each member
+levels LIST Bitsets with the ancestors of each member by number of meioses
+below LIST Bitsets with the descendants of each member by number of meioses
+
+Members are grouped by connected component, the members that are linked
+by parents and children, and the bitsets of a member only cover its
+component. Bit i of a bitset is set if the member with index
+offset + i is in the set, where offset is the index of the first member
+of the component, so ancestor and descendant queries are bit operations
+and a family of many small pedigrees needs little memory.
+The index is built once and then reused, Family.graph builds it the first
+time it is used after a member has been added. family_check does not use
+it, it is built for relationship queries.
+"""
+
+from __future__ import print_function
+
+import logging
+
+from collections import namedtuple
+
+from ped_parser.exceptions import PedigreeError
+
+logger = logging.getLogger(__name__)
+
+ORDINALS = ['first', 'second', 'third', 'fourth', 'fifth', 'sixth',
+            'seventh', 'eighth', 'ninth']
+
+# The relationship of individual_2 to individual_1
+#   name (str): Like 'parent', 'half-sibling' or 'first cousin once removed'
+#   degree (int): Degree of relationship, 1 for parents, children and full
+#                 siblings, 2 for grandparents, half-siblings and avuncular
+#                 and so on. None for unrelated individuals
+#   meioses_1 (int): Meioses from individual_1 to the closest common ancestor
+#   meioses_2 (int): Meioses from individual_2 to the closest common ancestor
+#   full (bool): If the closest common ancestors are a couple
+Relationship = namedtuple('Relationship',
+    ['name', 'degree', 'meioses_1', 'meioses_2', 'full'])
+
+UNRELATED = Relationship('unrelated', None, None, None, False)
+
+# Cache for get_relationship, {(meioses_1, meioses_2, full): Relationship}
+RELATIONSHIPS = {}
+
+
+def topological_order(family, individual_ids=None):
+    """
+    Sort individuals so that parents come before their children.
+
+    Arguments:
+        family (Family): A Family object
+        individual_ids (list): The ids to sort, default is all members
+
+    Returns:
+        order (list): The sorted individual ids
+
+    Raises:
+        PedigreeError: If an individual is its own ancestor
+    """
+    if individual_ids is None:
+        individual_ids = list(family.individuals)
+    members = set(individual_ids)
+    children = dict((individual_id, []) for individual_id in individual_ids)
+    missing_parents = {}
+    for individual_id in individual_ids:
+        individual = family.individuals[individual_id]
+        parents = set(parent_id for parent_id in
+                      (individual.father, individual.mother)
+                      if parent_id in members)
+        missing_parents[individual_id] = len(parents)
+        for parent_id in parents:
+            children[parent_id].append(individual_id)
+
+    order = [individual_id for individual_id in individual_ids
+             if missing_parents[individual_id] == 0]
+    for individual_id in order:
+        for child_id in children[individual_id]:
+            missing_parents[child_id] -= 1
+            if missing_parents[child_id] == 0:
+                order.append(child_id)
+
+    if len(order) != len(individual_ids):
+        individual_id = next(individual_id for individual_id in individual_ids
+                             if missing_parents[individual_id] > 0)
+        raise PedigreeError(family.family_id, individual_id,
+                            'Individual is its own ancestor.')
+    return order
+
+
+def connected_components(family, individual_ids):
+    """
+    Group individuals that are linked by parents and children.
+
+    Arguments:
+        family (Family): A Family object
+        individual_ids (list): The ids of the members
+
+    Returns:
+        components (list): Lists with the ids of each component, in the
+                           order the components are first seen
+    """
+    # Union find over the parent links
+    roots = dict((individual_id, individual_id)
+                 for individual_id in individual_ids)
+
+    def find(individual_id):
+        root = individual_id
+        while roots[root] != root:
+            root = roots[root]
+        while roots[individual_id] != root:
+            roots[individual_id], individual_id = root, roots[individual_id]
+        return root
+
+    for individual_id in individual_ids:
+        individual = family.individuals[individual_id]
+        for parent_id in (individual.father, individual.mother):
+            if parent_id in roots:
+                roots[find(parent_id)] = find(individual_id)
+
+    components = {}
+    for individual_id in individual_ids:
+        components.setdefault(find(individual_id), []).append(individual_id)
+    return list(components.values())
+
+
+def merge_levels(i, other_levels):
+    """
+    Build the levels of member i from the levels of its parents or children.
+
+    Arguments:
+        i (int): The index of the member in its component
+        other_levels (iterator): The levels of the parents or children
+
+    Returns:
+        levels (list): A list with bitsets, see FamilyGraph
+    """
+    levels = [1 << i]
+    for other in other_levels:
+        for distance, bitset in enumerate(other, 1):
+            if distance < len(levels):
+                levels[distance] |= bitset
+            else:
+                levels.append(bitset)
+    return levels
+
+
+def get_relationship(meioses_1, meioses_2, full):
+    """
+    Return the relationship that has the given meioses to the closest common
+    ancestors.
+
+    Relationships are cached since there are few distinct ones.
+
+    Arguments:
+        meioses_1 (int): Meioses from individual_1 to the closest ancestors
+        meioses_2 (int): Meioses from individual_2 to the closest ancestors
+        full (bool): If the closest common ancestors are a couple
+
+    Returns:
+        relationship (Relationship): The relationship of individual_2 to
+                                     individual_1
+    """
+    key = (meioses_1, meioses_2, full)
+    if key in RELATIONSHIPS:
+        return RELATIONSHIPS[key]
+
+    distance = meioses_1 + meioses_2
+    if meioses_1 == 0 or meioses_2 == 0:
+        # Lineal relationships are never half relationships
+        if distance == 0:
+            name = 'self'
+        else:
+            name = 'parent' if meioses_2 == 0 else 'child'
+            if distance > 1:
+                name = 'great-' * (distance - 2) + 'grand' + name
+        relationship = Relationship(name, distance, meioses_1, meioses_2,
+                                    False)
+    else:
+        closest_meioses = min(meioses_1, meioses_2)
+        removed = abs(meioses_1 - meioses_2)
+        if closest_meioses == 1:
+            if removed == 0:
+                name = 'sibling'
+            else:
+                name = 'avuncular' if meioses_2 == 1 else 'niece/nephew'
+                if removed > 1:
+                    name = 'great-' * (removed - 2) + 'grand-' + name
+        else:
+            cousin = closest_meioses - 1
+            if cousin <= len(ORDINALS):
+                name = ORDINALS[cousin - 1] + ' cousin'
+            else:
+                name = '{0}th cousin'.format(cousin)
+            if removed == 1:
+                name += ' once removed'
+            elif removed == 2:
+                name += ' twice removed'
+            elif removed > 2:
+                name += ' {0} times removed'.format(removed)
+        if full:
+            relationship = Relationship(name, distance - 1, meioses_1,
+                                        meioses_2, True)
+        else:
+            relationship = Relationship('half-' + name, distance, meioses_1,
+                                        meioses_2, False)
+
+    RELATIONSHIPS[key] = relationship
+    return relationship
+
+
+class FamilyGraph(object):
+    """Graph index over the members of a family."""
+    def __init__(self, family):
+        """
+        Arguments:
+            family (Family): A Family object
+
+        Raises:
+            PedigreeError: If an individual is its own ancestor
+        """
+        super(FamilyGraph, self).__init__()
+        self.family_id = family.family_id
+        self.members = []
+        # offsets[i] is the index of the first member in the component of i
+        self.offsets = []
+        for component in connected_components(family,
+                                              list(family.individuals)):
+            self.offsets.extend([len(self.members)] * len(component))
+            self.members.extend(component)
+        self.positions = dict(
+            (individual_id, i) for i, individual_id in enumerate(self.members))
+        offsets = self.offsets
+
+        self.fathers = []
+        self.mothers = []
+        self.children = [[] for _ in self.members]
+        for i, individual_id in enumerate(self.members):
+            individual = family.individuals[individual_id]
+            father = self.positions.get(individual.father, -1)
+            mother = self.positions.get(individual.mother, -1)
+            self.fathers.append(father)
+            self.mothers.append(mother)
+            for parent in set([father, mother]):
+                if parent != -1:
+                    self.children[parent].append(i)
+
+        self.order = [self.positions[individual_id] for individual_id in
+                      topological_order(family, self.members)]
+
+        self.depth = [0] * len(self.members)
+        self.ancestors = [0] * len(self.members)
+        for i in self.order:
+            for parent in (self.fathers[i], self.mothers[i]):
+                if parent != -1:
+                    self.ancestors[i] |= ((1 << parent - offsets[i]) |
+                                          self.ancestors[parent])
+                    self.depth[i] = max(self.depth[i], self.depth[parent] + 1)
+
+        self.descendants = [0] * len(self.members)
+        for i in reversed(self.order):
+            for child in self.children[i]:
+                self.descendants[i] |= ((1 << child - offsets[i]) |
+                                        self.descendants[child])
+
+        # levels[i][d] is a bitset with the ancestors that are d meioses
+        # from member i, levels[i][0] is the member itself. An ancestor
+        # that is reached through paths of different lengths is in several
+        # levels. below[i][d] is the same for the descendants of member i.
+        # The closest common ancestors of two members are found by
+        # intersecting their levels.
+        self.levels = [None] * len(self.members)
+        for i in self.order:
+            self.levels[i] = merge_levels(
+                i - offsets[i], (self.levels[parent] for parent in
+                    (self.fathers[i], self.mothers[i]) if parent != -1))
+        self.below = [None] * len(self.members)
+        for i in reversed(self.order):
+            self.below[i] = merge_levels(
+                i - offsets[i], (self.below[child] for child in self.children[i]))
+
+    def to_ids(self, bitset, offset=0):
+        """
+        Return the individual ids of the members in a bitset.
+
+        Arguments:
+            bitset (int): A bitset over the members of a component
+            offset (int): The index of the first member of the component
+
+        Returns:
+            individual_ids (set): The ids of the members
+        """
+        return set(self.members[position] for position in
+                   self.to_positions(bitset, offset))
+
+    def to_bitset(self, individual_ids):
+        """
+        Return a bitset with the given members of one component.
+
+        Arguments:
+            individual_ids (iterator): Ids of members of a component
+
+        Returns:
+            bitset (int): A bitset over the members of the component
+
+        Raises:
+            ValueError: If the members are not in the same component
+        """
+        bitset = 0
+        offset = None
+        for individual_id in individual_ids:
+            position = self.positions[individual_id]
+            if offset is None:
+                offset = self.offsets[position]
+            elif self.offsets[position] != offset:
+                raise ValueError("Members are not in the same component")
+            bitset |= 1 << position - offset
+        return bitset
+
+    def parents(self, individual_id):
+        """Return the ids of the parents of an individual that are members."""
+        i = self.positions[individual_id]
+        return set(self.members[parent] for parent in
+                   (self.fathers[i], self.mothers[i]) if parent != -1)
+
+    def get_children(self, individual_id):
+        """Return the ids of the children of an individual."""
+        return set(self.members[child] for child in
+                   self.children[self.positions[individual_id]])
+
+    def generation(self, individual_id):
+        """Return the generation depth of an individual, founders are 0."""
+        return self.depth[self.positions[individual_id]]
+
+    def get_ancestors(self, individual_id):
+        """Return the ids of all ancestors of an individual."""
+        i = self.positions[individual_id]
+        return self.to_ids(self.ancestors[i], self.offsets[i])
+
+    def get_descendants(self, individual_id):
+        """Return the ids of all descendants of an individual."""
+        i = self.positions[individual_id]
+        return self.to_ids(self.descendants[i], self.offsets[i])
+
+    def is_ancestor(self, ancestor_id, individual_id):
+        """
+        Check if an individual is an ancestor of another individual.
+
+        Arguments:
+            ancestor_id (str): The id of the possible ancestor
+            individual_id (str): The id of an individual
+
+        Returns:
+            bool: True if ancestor_id is an ancestor of individual_id
+        """
+        i = self.positions[individual_id]
+        ancestor = self.positions[ancestor_id]
+        if self.offsets[ancestor] != self.offsets[i]:
+            return False
+        return bool(self.ancestors[i] >> ancestor - self.offsets[i] & 1)
+
+    def grandparents_bitset(self, individual_id):
+        """Return a bitset with the grandparents of an individual."""
+        i = self.positions[individual_id]
+        bitset = 0
+        for parent in (self.fathers[i], self.mothers[i]):
+            if parent != -1:
+                for grandparent in (self.fathers[parent], self.mothers[parent]):
+                    if grandparent != -1:
+                        bitset |= 1 << grandparent - self.offsets[i]
+        return bitset
+
+    def get_grandparents(self, individual_id):
+        """Return the ids of the grandparents of an individual."""
+        return self.to_ids(self.grandparents_bitset(individual_id),
+                           self.offsets[self.positions[individual_id]])
+
+    def closest_common_ancestors(self, individual_1_id, individual_2_id):
+        """
+        Find the closest common ancestors of two members.
+
+        A member counts as its own ancestor. The closest common ancestors
+        are those with the lowest total number of meioses to the members.
+
+        Arguments:
+            individual_1_id (str): The id of an individual
+            individual_2_id (str): The id of an individual
+
+        Returns:
+            (meioses_1, meioses_2, bitset): The meioses from each member and
+                    a bitset with the common ancestors, or None if the
+                    members are unrelated
+        """
+        position_1 = self.positions[individual_1_id]
+        position_2 = self.positions[individual_2_id]
+        if self.offsets[position_1] != self.offsets[position_2]:
+            return None
+        levels_1 = self.levels[position_1]
+        levels_2 = self.levels[position_2]
+        for total in range(len(levels_1) + len(levels_2) - 1):
+            for meioses_1 in range(max(0, total - len(levels_2) + 1),
+                                   min(total, len(levels_1) - 1) + 1):
+                common = levels_1[meioses_1] & levels_2[total - meioses_1]
+                if common:
+                    return meioses_1, total - meioses_1, common
+        return None
+
+    def relationship(self, individual_1_id, individual_2_id):
+        """
+        Return the relationship of individual_2 to individual_1.
+
+        relationship('proband', 'father') is 'parent'.
+
+        Arguments:
+            individual_1_id (str): The id of an individual
+            individual_2_id (str): The id of an individual
+
+        Returns:
+            relationship (Relationship): See Relationship
+        """
+        closest = self.closest_common_ancestors(individual_1_id,
+                                                individual_2_id)
+        if closest is None:
+            return UNRELATED
+        meioses_1, meioses_2, common = closest
+        # Two closest common ancestors are a couple, one is a half relation
+        return get_relationship(meioses_1, meioses_2, common & (common - 1) != 0)
+
+    def related_bitset(self, individual_id):
+        """Return a bitset with all members that share an ancestor with an
+        individual, including the individual itself."""
+        i = self.positions[individual_id]
+        offset = self.offsets[i]
+        related = 0
+        for ancestor in self.to_positions(
+                self.ancestors[i] | (1 << i - offset), offset):
+            related |= self.descendants[ancestor] | (1 << ancestor - offset)
+        return related
+
+    def to_positions(self, bitset, offset=0):
+        """Yield the member indexes in a bitset of a component."""
+        while bitset:
+            lowest = bitset & -bitset
+            yield offset + lowest.bit_length() - 1
+            bitset ^= lowest
+
+    def relationships(self, individual_id, max_meioses=None):
+        """
+        Return the relationships of all relatives of an individual.
+
+        All relatives are found in one pass over the closest common
+        ancestors, from the nearest to the most distant, which is much
+        faster than asking for one relationship at a time.
+
+        Arguments:
+            individual_id (str): The id of an individual
+            max_meioses (int): Only include relatives with at most this many
+                               meioses through the closest common ancestors
+
+        Returns:
+            relationships (dict): A dictionary on the form
+                                  {<individual_id>: <Relationship>}, the
+                                  individual itself is not included
+        """
+        i = self.positions[individual_id]
+        offset = self.offsets[i]
+        levels = self.levels[i]
+        related = self.related_bitset(individual_id)
+        assigned = 1 << i - offset
+        relationships = {}
+        total = 1
+        while assigned != related and (max_meioses is None or
+                                       total <= max_meioses):
+            for meioses_1 in range(min(total, len(levels) - 1) + 1):
+                meioses_2 = total - meioses_1
+                reached = 0
+                # Members that are reached from more than one ancestor
+                reached_twice = 0
+                for ancestor in self.to_positions(levels[meioses_1], offset):
+                    below = self.below[ancestor]
+                    if meioses_2 < len(below):
+                        reached_twice |= reached & below[meioses_2]
+                        reached |= below[meioses_2]
+                reached &= ~assigned
+                if not reached:
+                    continue
+                assigned |= reached
+                half = get_relationship(meioses_1, meioses_2, False)
+                full = get_relationship(meioses_1, meioses_2, True)
+                for position in self.to_positions(reached, offset):
+                    relationships[self.members[position]] = (
+                        full if reached_twice >> position - offset & 1
+                        else half)
+            total += 1
+        return relationships
+
+    def relatives(self, individual_id, degree=2):
+        """
+        Return the relatives of an individual up to a degree of relationship.
+
+        Arguments:
+            individual_id (str): The id of an individual
+            degree (int): The highest degree of relationship to include
+
+        Returns:
+            relatives (dict): A dictionary on the form
+                              {<individual_id>: <Relationship>}
+        """
+        # A relationship of degree d has at most d + 1 meioses
+        return dict(
+            (relative_id, relationship) for relative_id, relationship in
+            self.relationships(individual_id, degree + 1).items()
+            if relationship.degree <= degree
+        )
+
+    def __repr__(self):
+        return "FamilyGraph(family_id={0}, members={1})".format(
+            self.family_id, len(self.members))
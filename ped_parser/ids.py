@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+ids.py
+
+A cohort wide registry of family and sample ids.
+
+Each id is stored once and gets a dense integer index, in the order the ids
+are first seen. Individuals store the indexes of their own id, their family
+and their parents instead of strings, and the strings are looked up when
+they are used:
+
+    >from ped_parser.ids import registry
+    >index = registry.intern('NA12878')
+    >registry[index]
+    'NA12878'
+
+Index 0 is the missing id '0', so a missing parent has index 0.
+
+There is one registry per process and the same id has the same index as
+long as it is in use, so indexes of individuals from different pedigrees
+can be compared. Indexes are not the same in other processes, Individuals
+are pickled with their ids as strings.
+
+The registry counts the references to each id. intern adds a reference and
+release drops one, an Individual releases its ids when it is collected.
+When the last reference to an id is dropped the id is removed and its index
+is reused for the next new id, so the registry only holds the ids of the
+individuals that are alive.
+"""
+
+from __future__ import print_function
+
+import sys
+import threading
+
+# The id of missing parents, it has index 0
+MISSING = '0'
+
+# The estimated bytes of the dict entry and the list slots of an id
+ENTRY_SIZE = 64
+
+
+class IdRegistry(object):
+    """Interns ids, gives each a dense integer index and counts its users."""
+    def __init__(self):
+        super(IdRegistry, self).__init__()
+        # ids[index] is the id with that index, None if the index is free
+        self.ids = [MISSING]
+        self.indexes = {MISSING: 0}
+        # counts[index] is the number of references to the id
+        self.counts = [0]
+        self._free = []
+        # Releases that wait for the lock, an Individual can be collected
+        # while the registry is changed by the same thread
+        self._released = []
+        self._lock = threading.Lock()
+
+    def intern(self, id_string):
+        """
+        Return the index of an id and add a reference to it.
+
+        New ids are added. Every interned id should be released when it is
+        no longer used, the missing id '0' is never removed.
+
+        Arguments:
+            id_string (str): A family or sample id
+
+        Returns:
+            index (int): The index of the id
+        """
+        if id_string == MISSING:
+            return 0
+        with self._lock:
+            index = self.indexes.get(id_string)
+            if index is None:
+                if self._free:
+                    index = self._free.pop()
+                    self.ids[index] = id_string
+                else:
+                    index = len(self.ids)
+                    # Append first so an index that is found is always valid
+                    self.ids.append(id_string)
+                    self.counts.append(0)
+                self.indexes[id_string] = index
+            self.counts[index] += 1
+            if self._released:
+                self._collect()
+        return index
+
+    def release(self, *indexes):
+        """
+        Drop a reference to each of the ids with indexes.
+
+        Ids without references are removed from the registry. If the
+        registry is in use the ids are removed by the next intern or
+        release.
+
+        Arguments:
+            indexes (int): Indexes that were returned by intern
+        """
+        self._released.extend(indexes)
+        if self._lock.acquire(False):
+            try:
+                self._collect()
+            finally:
+                self._lock.release()
+
+    def _collect(self):
+        """Apply the waiting releases, the lock has to be held."""
+        released = self._released
+        counts = self.counts
+        while released:
+            index = released.pop()
+            if index:
+                counts[index] -= 1
+                if not counts[index]:
+                    del self.indexes[self.ids[index]]
+                    self.ids[index] = None
+                    self._free.append(index)
+
+    def index(self, id_string):
+        """
+        Return the index of an id without adding it.
+
+        Raises:
+            KeyError: If the id is not in the registry
+        """
+        return self.indexes[id_string]
+
+    def estimate_size(self, id_string):
+        """
+        Estimate the bytes that an id uses in the registry.
+
+        Arguments:
+            id_string (str): A family or sample id
+
+        Returns:
+            size (int): The size of the string and its entry
+        """
+        return sys.getsizeof(id_string) + ENTRY_SIZE
+
+    def __getitem__(self, index):
+        return self.ids[index]
+
+    def __contains__(self, id_string):
+        return id_string in self.indexes
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __repr__(self):
+        return "IdRegistry(ids={0})".format(len(self.indexes))
+
+
+# The registry that is used by all Individuals
+registry = IdRegistry()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+index.py
+
+Byte offset index of the families in a pedigree file.
+
+The index records where the lines of each family are in the file so that
+one family can be parsed without reading the rest of the file. It is stored
+as json next to the pedigree file, <path>.idx, and looks like
+
+    {
+        'version': 1,
+        'family_type': 'ped',
+        'encoding': 'utf-8',
+        'size': <size of the file>,
+        'mtime': <modification time of the file>,
+        'headers': [[<offset>, <length>], ...],
+        'families': {
+            <family_id>: [[<offset>, <length>, <header number>], ...]
+        }
+    }
+
+Each family has one or more spans of lines. The header number points to
+the header line that is in use for the span, or is -1 if there is none.
+The family ids are decoded with the encoding of the file. The index is
+rebuilt when the size or modification time of the file or the encoding
+change.
+
+Loaded indexes are kept in memory for as long as the file is unchanged, so
+looking up a family only costs a stat and the reads of its lines.
+"""
+
+from __future__ import print_function
+
+import io
+import os
+import json
+import logging
+import threading
+
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Bump this when the layout of the index change
+INDEX_VERSION = 1
+
+# Maximum number of indexes that are kept in memory
+MAX_LOADED = 32
+
+# {(<path>, <family_type>, <encoding>): ((<mtime_ns>, <size>), <index>)},
+# least recently used first
+_loaded = OrderedDict()
+_loaded_lock = threading.Lock()
+
+
+def index_path(path):
+    """Return the path to the index file of a pedigree file."""
+    return path + '.idx'
+
+
+def build_index(path, family_type='ped', encoding='utf-8'):
+    """
+    Build the byte offset index of a pedigree file.
+
+    Arguments:
+        path (str): Path to the pedigree file
+        family_type (str): Any of [ped, alt, cmms, fam, mip]
+        encoding (str): The encoding of the file
+
+    Returns:
+        index (dict): The index, see module docstring
+    """
+    stat = os.stat(path)
+    headers = []
+    families = {}
+    header_number = -1
+    offset = 0
+    is_ped = family_type in ['ped', 'fam']
+    with open(path, 'rb') as handle:
+        for line in handle:
+            length = len(line)
+            stripped = line.rstrip()
+            if stripped.startswith(b'#'):
+                if not is_ped:
+                    headers.append([offset, length])
+                    header_number = len(headers) - 1
+            elif stripped:
+                # Split the same way as the parser to find the family id
+                splitted_line = stripped.split(b'\t')
+                if ((is_ped and len(splitted_line) != 6) or
+                        len(splitted_line) < 6):
+                    splitted_line = stripped.split()
+                family_id = splitted_line[0].decode(encoding)
+                spans = families.setdefault(family_id, [])
+                if (spans and spans[-1][0] + spans[-1][1] == offset and
+                        spans[-1][2] == header_number):
+                    spans[-1][1] += length
+                else:
+                    spans.append([offset, length, header_number])
+            offset += length
+
+    return {
+        'version': INDEX_VERSION,
+        'family_type': family_type,
+        'encoding': encoding,
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'headers': headers,
+        'families': families,
+    }
+
+
+def write_index(path, index):
+    """
+    Write an index next to its pedigree file.
+
+    Failing to write the index is logged but not raised.
+
+    Arguments:
+        path (str): Path to the pedigree file
+        index (dict): The index of the file
+    """
+    index_file = index_path(path)
+    tmp_file = '{0}.{1}.tmp'.format(index_file, os.getpid())
+    try:
+        with open(tmp_file, 'w') as handle:
+            json.dump(index, handle)
+        os.replace(tmp_file, index_file)
+    except (IOError, OSError) as e:
+        logger.warning("Could not write index %s: %s", index_file, e)
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return
+
+    logger.info("Wrote index %s", index_file)
+
+
+def load_index(path, family_type='ped', encoding='utf-8'):
+    """
+    Load the index of a pedigree file if it is up to date.
+
+    Arguments:
+        path (str): Path to the pedigree file
+        family_type (str): Any of [ped, alt, cmms, fam, mip]
+        encoding (str): The encoding of the file
+
+    Returns:
+        index (dict): The index or None if there is no valid index
+    """
+    index_file = index_path(path)
+    if not os.path.isfile(index_file):
+        return None
+    try:
+        with open(index_file, 'r') as handle:
+            index = json.load(handle)
+    except ValueError as e:
+        logger.warning("Could not read index %s: %s", index_file, e)
+        return None
+
+    stat = os.stat(path)
+    if (index.get('version') != INDEX_VERSION or
+            index.get('family_type') != family_type or
+            index.get('encoding') != encoding or
+            index.get('size') != stat.st_size or
+            index.get('mtime') != stat.st_mtime):
+        logger.info("Index %s is outdated", index_file)
+        return None
+
+    return index
+
+
+def get_index(path, family_type='ped', encoding='utf-8'):
+    """
+    Return the index of a pedigree file, build and write it if needed.
+
+    Arguments:
+        path (str): Path to the pedigree file
+        family_type (str): Any of [ped, alt, cmms, fam, mip]
+        encoding (str): The encoding of the file
+
+    Returns:
+        index (dict): The index, see module docstring
+    """
+    key = (os.path.abspath(path), family_type, encoding)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _loaded_lock:
+        loaded = _loaded.get(key)
+        if loaded is not None and loaded[0] == signature:
+            _loaded.move_to_end(key)
+            return loaded[1]
+
+    index = load_index(path, family_type, encoding)
+    if index is None:
+        logger.info("Building index for %s", path)
+        index = build_index(path, family_type, encoding)
+        write_index(path, index)
+
+    with _loaded_lock:
+        _loaded[key] = (signature, index)
+        _loaded.move_to_end(key)
+        while len(_loaded) > MAX_LOADED:
+            _loaded.popitem(last=False)
+    return index
+
+
+def clear_loaded():
+    """Forget the indexes that are kept in memory."""
+    with _loaded_lock:
+        _loaded.clear()
+
+
+def read_family_lines(path, index, family_id, encoding='utf-8'):
+    """
+    Read the lines of one family, with header lines, from a pedigree file.
+
+    Arguments:
+        path (str): Path to the pedigree file
+        index (dict): The index of the file
+        family_id (str): The id of the family
+        encoding (str): The encoding of the file
+
+    Returns:
+        lines (list): The lines of the family or None if the family is not
+                      in the index
+    """
+    spans = index['families'].get(family_id)
+    if spans is None:
+        return None
+
+    lines = []
+    current_header = -1
+    with open(path, 'rb') as handle:
+        for offset, length, header_number in spans:
+            if header_number != current_header:
+                header_offset, header_length = index['headers'][header_number]
+                handle.seek(header_offset)
+                lines.append(handle.read(header_length).decode(encoding))
+                current_header = header_number
+            handle.seek(offset)
+            lines.extend(io.StringIO(handle.read(length).decode(encoding)))
+    return lines
@@ -13,6 +13,7 @@ mother STRING The ind_id of the mother or [0,-9] if info is missing
 father STRING ---------||------ father --------------||---------------
 sex INT 1=male 2=female 0=unknown
 phenotype INT 1=unaffected, 2=affected, missing = [0,-9]
+models INT Bitflags with the models of inheritance of the individual, see models.py
 genotypes DICT Container with genotype information on the form {<variant_id>: <Genotype>}
 phasing BOOL If the genotype information includes phasing for this individual
 
@@ -26,75 +27,207 @@ import sys
 import os
 import logging
 
+from itertools import repeat
+
+from ped_parser.ids import registry
+from ped_parser.models import model_table, ModelSet
+
+logger = logging.getLogger(__name__)
+
+# The ids of the registry, indexed by their index
+IDS = registry.ids
+
+# Used for individuals without extra info
+EMPTY = {}
+
+# The value of each missing extra column, map stops at the last column so
+# the iterator is never used up
+MISSING_VALUES = repeat('.')
 
 class Individual(object):
-    """docstring for Individual"""
+    """
+    Holds the information of an individual.
+    
+    The class uses __slots__ and has no per instance logger. The relationship 
+    containers (siblings, grandparents, first_cousins and second_cousins) 
+    and extra_info are only allocated the first time they are accessed.
+    
+    The ids of the individual, its family and its parents are stored as 
+    indexes into the cohort wide id registry, see ids.py, and 
+    individual_id, family, mother and father look up the strings. Each id 
+    string is stored once, however many children refer to a parent, and 
+    the ids are released from the registry when the individual is 
+    collected.
+    
+    An Individual without relations or extra info uses 184 bytes on 
+    64 bit CPython 3, not counting the ids in the registry. 
+    (The dict based version used about 1 kB.)
+    """
+    __slots__ = (
+        '_index', '_family', '_mother', '_father', 'sex', 'phenotype',
+        'affected', 'healthy', 'proband', 'consultand', 'alive', 
+        'has_parents', 'has_both_parents', 'models', '_extra_info', '_siblings', 
+        '_grandparents', '_first_cousins', '_second_cousins'
+    )
+    
     def __init__(self, ind, family='0', mother='0', father='0',sex='0',phenotype='0',
         genetic_models=None, proband='.', consultand='.', alive='.'):
         
         #TODO write test to throw exceptions if malformed input.
-        self.logger = logging.getLogger(__name__)
-        
-        self.logger.debug("Creating individual")
-        self.individual_id = ind #Individual Id STRING
-        self.logger.debug("Individual id: {0}".format(self.individual_id))
-        
-        self.family = family #Family Id STRING
-        self.logger.debug("Family id: {0}".format(self.family))
-        
-        self.mother = mother #Mother Id STRING
-        self.logger.debug("Mother id: {0}".format(self.mother))
-        
-        self.father = father # Father Id STRING
-        self.logger.debug("Father id: {0}".format(self.father))
+        intern = registry.intern
+        self._index = intern(ind) #Individual Id INDEX
+        self._family = intern(family) #Family Id INDEX
+        self._mother = intern(mother) #Mother Id INDEX, 0 if missing
+        self._father = intern(father) # Father Id INDEX, 0 if missing
         
         self.affected = False
         self.healthy = False
-        self.extra_info = {}
+        self._extra_info = None
         
         # For madeline:
         self.proband = proband
-        self.logger.debug("Proband: {0}".format(self.proband))
-        
         self.consultand = consultand
-        self.logger.debug("Consultand: {0}".format(self.consultand))
-        
         self.alive = alive
-        self.logger.debug("Alive: {0}".format(self.alive))
         
         try:
             self.sex = int(sex) # Sex Integer
-            self.logger.debug("Sex: {0}".format(self.sex))
-            
             self.phenotype = int(phenotype) # Phenotype INTEGER 
-            self.logger.debug("Phenotype: {0}".format(self.phenotype))
-        
         except ValueError:
             raise SyntaxError('Sex and phenotype have to be integers.')
             
         self.has_parents = False
         self.has_both_parents = False
         
-        if self.mother != '0':
+        # Models of inheritance as bitflags, see models.py
+        self.models = 0
+        if genetic_models:
+            self.models = model_table.to_flags(genetic_models)
+        
+        if self._mother:
             self.has_parents = True
-            if self.father != '0':
+            if self._father:
                 self.has_both_parents = True
-        elif self.father != '0':
+        elif self._father:
             self.has_parents = True
         
-        self.logger.debug("Individual has parents: {0}".format(self.has_parents))
         # These features will be added
         #TODO make use of family relations:
-        self.siblings = set()
-        self.grandparents = dict()
-        self.first_cousins = set()
-        self.second_cousins = set()
+        self._siblings = None
+        self._grandparents = None
+        self._first_cousins = None
+        self._second_cousins = None
         
         if self.phenotype == 2:
             self.affected = True
         elif self.phenotype == 1:
             self.healthy = True
-            
+        
+        logger.debug("Individual created: %r", self)
+    
+    @property
+    def individual_id(self):
+        """str: The id of the individual"""
+        return IDS[self._index]
+    
+    @individual_id.setter
+    def individual_id(self, value):
+        index = registry.intern(value)
+        registry.release(self._index)
+        self._index = index
+    
+    @property
+    def family(self):
+        """str: The id of the family"""
+        return IDS[self._family]
+    
+    @family.setter
+    def family(self, value):
+        index = registry.intern(value)
+        registry.release(self._family)
+        self._family = index
+    
+    @property
+    def mother(self):
+        """str: The id of the mother or '0'"""
+        return IDS[self._mother]
+    
+    @mother.setter
+    def mother(self, value):
+        index = registry.intern(value)
+        registry.release(self._mother)
+        self._mother = index
+    
+    @property
+    def father(self):
+        """str: The id of the father or '0'"""
+        return IDS[self._father]
+    
+    @father.setter
+    def father(self, value):
+        index = registry.intern(value)
+        registry.release(self._father)
+        self._father = index
+    
+    @property
+    def models_of_inheritance(self):
+        """ModelSet: The names of the models in self.models"""
+        return ModelSet(self)
+    
+    @property
+    def extra_info(self):
+        """dict: Extra columns for the individual, {<header>: <value>}"""
+        if self._extra_info is None:
+            self._extra_info = {}
+        return self._extra_info
+    
+    @extra_info.setter
+    def extra_info(self, value):
+        self._extra_info = value
+    
+    @property
+    def siblings(self):
+        """set: The ids of the siblings of the individual"""
+        if self._siblings is None:
+            self._siblings = set()
+        return self._siblings
+    
+    @siblings.setter
+    def siblings(self, value):
+        self._siblings = value
+    
+    @property
+    def grandparents(self):
+        """dict: The ids of the grandparents of the individual"""
+        if self._grandparents is None:
+            self._grandparents = dict()
+        return self._grandparents
+    
+    @grandparents.setter
+    def grandparents(self, value):
+        self._grandparents = value
+    
+    @property
+    def first_cousins(self):
+        """set: The ids of the first cousins of the individual"""
+        if self._first_cousins is None:
+            self._first_cousins = set()
+        return self._first_cousins
+    
+    @first_cousins.setter
+    def first_cousins(self, value):
+        self._first_cousins = value
+    
+    @property
+    def second_cousins(self):
+        """set: The ids of the second cousins of the individual"""
+        if self._second_cousins is None:
+            self._second_cousins = set()
+        return self._second_cousins
+    
+    @second_cousins.setter
+    def second_cousins(self, value):
+        self._second_cousins = value
+    
     def check_grandparents(self, mother = None, father = None):
         """
         Check if there are any grand parents.
@@ -107,30 +240,72 @@ class Individual(object):
         
         
         """
-        if mother:
-            if mother.mother != '0':
-                self.grandparents[mother.mother] =  ''
-            elif mother.father != '0':
-                self.grandparents[mother.father] = ''
-        if father:
-            if father.mother != '0':
-                self.grandparents[father.mother] =  ''
-            elif father.father != '0':
-                self.grandparents[father.father] = ''
+        for parent in (mother, father):
+            if parent:
+                for grandparent in (parent._mother, parent._father):
+                    if grandparent:
+                        self.grandparents[IDS[grandparent]] = ''
         return
     
+    def __del__(self, release=registry.release):
+        # Drop the references to the ids in the registry. An Individual 
+        # that failed in __init__ or __setstate__ may not have its indexes
+        try:
+            release(self._index, self._family, self._mother, self._father)
+        except AttributeError:
+            pass
+    
+    def __getstate__(self):
+        # Registry indexes and the bits of added models are only valid in 
+        # this process, pickle the ids and the model names
+        return (IDS[self._index], IDS[self._family], IDS[self._mother], 
+                IDS[self._father], self.sex, self.phenotype, self.affected, 
+                self.healthy, self.proband, self.consultand, self.alive, 
+                self.has_parents, self.has_both_parents, 
+                model_table.to_names(self.models), self._extra_info, 
+                self._siblings, self._grandparents, self._first_cousins, 
+                self._second_cousins)
+    
+    def __setstate__(self, state):
+        (individual_id, family, mother, father, self.sex, self.phenotype, 
+         self.affected, self.healthy, self.proband, self.consultand, 
+         self.alive, self.has_parents, self.has_both_parents, models, 
+         self._extra_info, self._siblings, self._grandparents, 
+         self._first_cousins, self._second_cousins) = state
+        intern = registry.intern
+        self._index = intern(individual_id)
+        self._family = intern(family)
+        self._mother = intern(mother)
+        self._father = intern(father)
+        self.models = model_table.to_flags(models)
+    
+    def ped_row(self, extra_columns=()):
+        """
+        Return the columns of the individual in a ped file.
+        
+        Arguments:
+            extra_columns (tuple): Extra columns that follow the six ped 
+                                   columns, missing values are '.'
+        
+        Returns:
+            row (list): The columns as strings
+        """
+        return [IDS[self._family], IDS[self._index], IDS[self._father], 
+                IDS[self._mother], str(self.sex), str(self.phenotype), 
+                *map((self._extra_info or EMPTY).get, extra_columns, 
+                     MISSING_VALUES)]
+    
     def to_json(self):
         """
         Return the individual info in a dictionary for json.
         """
-        self.logger.debug("Returning json info")
         individual_info = {
-            'family_id': self.family,
-            'id':self.individual_id, 
+            'family_id': IDS[self._family],
+            'id': IDS[self._index], 
             'sex':str(self.sex), 
             'phenotype': str(self.phenotype), 
-            'mother': self.mother, 
-            'father': self.father,
+            'mother': IDS[self._mother], 
+            'father': IDS[self._father],
             'extra_info': self.extra_info
         }
         return individual_info
@@ -140,7 +315,6 @@ class Individual(object):
         Return the individual info in a madeline formated string
         """
         #Convert sex to madeleine type
-        self.logger.debug("Returning madeline info")
         if self.sex == 1:
             madeline_gender = 'M'
         elif self.sex == 2:
@@ -148,15 +322,15 @@ class Individual(object):
         else:
             madeline_gender = '.'
         #Convert father to madeleine type
-        if self.father == '0':
+        if not self._father:
             madeline_father = '.'
         else:
-            madeline_father = self.father
+            madeline_father = IDS[self._father]
         #Convert mother to madeleine type
-        if self.mother == '0':
+        if not self._mother:
             madeline_mother = '.'
         else:
-            madeline_mother = self.mother
+            madeline_mother = IDS[self._mother]
         #Convert phenotype to madeleine type
         if self.phenotype == 1:
             madeline_phenotype = 'U'
@@ -166,7 +340,7 @@ class Individual(object):
             madeline_phenotype = '.'
         
         return "{0}\t{1}\t{2}\t{3}\t{4}\t{5}\t{6}\t{7}\t{8}".format(
-            self.family, self.individual_id, madeline_gender, 
+            IDS[self._family], IDS[self._index], madeline_gender, 
             madeline_father, madeline_mother, madeline_phenotype,
             self.proband, self.consultand, self.alive
         )
@@ -186,7 +360,7 @@ class Individual(object):
                     'sex:', str(self.sex), 
                     'phenotype:', str(self.phenotype),
                     ]
-        if len(self.siblings) > 0:
+        if self._siblings:
             ind_info.append('siblings:')
             ind_info.append(','.join(self.siblings))
         
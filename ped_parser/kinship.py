@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+kinship.py
+
+Kinship and inbreeding coefficients for the individuals of a family.
+
+The kinship coefficient of two individuals is the probability that two
+alleles, one sampled from each of them at the same locus, are identical by
+descent. The inbreeding coefficient of an individual is the kinship
+coefficient of its parents.
+
+The coefficients are computed with the tabular method. The members are put
+in topological order, parents before children, and the rows of the matrix
+are filled in that order:
+
+    K[i, i] = (1 + K[father, mother]) / 2
+    K[i, j] = (K[father, j] + K[mother, j]) / 2   for j before i
+
+where a missing parent contributes 0. Founders are assumed unrelated.
+
+Individuals that are not connected through parent links can not be related,
+so each family is split into connected components and one dense block is
+stored per component. The full matrix of a cohort is the block diagonal of
+these blocks.
+
+NumPy is required for this module, install with 'pip install ped_parser[table]'
+"""
+
+from __future__ import print_function
+
+import logging
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from ped_parser.graph import topological_order
+
+logger = logging.getLogger(__name__)
+
+
+def get_components(family):
+    """
+    Split the members of a family into groups that are connected by parents.
+
+    Arguments:
+        family (Family): A Family object
+
+    Returns:
+        components (list): A list with lists of individual ids
+    """
+    roots = {}
+
+    def find(individual_id):
+        root = individual_id
+        while roots[root] != root:
+            root = roots[root]
+        # Compress the path
+        while roots[individual_id] != root:
+            roots[individual_id], individual_id = root, roots[individual_id]
+        return root
+
+    for individual_id in family.individuals:
+        roots[individual_id] = individual_id
+    for individual_id, individual in family.individuals.items():
+        for parent_id in (individual.father, individual.mother):
+            if parent_id in roots:
+                roots[find(parent_id)] = find(individual_id)
+
+    components = {}
+    for individual_id in family.individuals:
+        components.setdefault(find(individual_id), []).append(individual_id)
+    return list(components.values())
+
+
+def kinship_block(family, individual_ids=None, dtype=None):
+    """
+    Compute the kinship coefficients for individuals in a family.
+
+    Arguments:
+        family (Family): A Family object
+        individual_ids (list): The ids to include, default is all members.
+                               Parents that are not included are treated as
+                               missing.
+        dtype (numpy.dtype): The type of the matrix, default is float64
+
+    Returns:
+        (order, matrix): The individual ids in topological order and a
+                         matrix with the coefficients in that order
+    """
+    if np is None:
+        raise ImportError("Kinship requires numpy. Please install "\
+                          "it with 'pip install numpy'")
+    order = topological_order(family, individual_ids)
+    positions = dict((individual_id, i) for i, individual_id in enumerate(order))
+    matrix = np.zeros((len(order), len(order)), dtype=dtype or np.float64)
+
+    for i, individual_id in enumerate(order):
+        individual = family.individuals[individual_id]
+        father = positions.get(individual.father)
+        mother = positions.get(individual.mother)
+        row = matrix[i, :i]
+        if father is not None:
+            row += matrix[father, :i]
+        if mother is not None:
+            row += matrix[mother, :i]
+        row *= 0.5
+        matrix[:i, i] = row
+        if father is not None and mother is not None:
+            matrix[i, i] = 0.5 * (1 + matrix[father, mother])
+        else:
+            matrix[i, i] = 0.5
+
+    return order, matrix
+
+
+def family_kinship(family, dtype=None):
+    """
+    Compute the kinship matrix of a whole family.
+
+    Arguments:
+        family (Family): A Family object
+        dtype (numpy.dtype): The type of the matrix, default is float64
+
+    Returns:
+        (order, matrix): The individual ids in topological order and a
+                         matrix with the coefficients in that order
+    """
+    return kinship_block(family, dtype=dtype)
+
+
+def inbreeding_coefficients(family):
+    """
+    Compute the inbreeding coefficient of each member of a family.
+
+    Arguments:
+        family (Family): A Family object
+
+    Returns:
+        coefficients (dict): A dictionary on the form {<ind_id>: <float>}
+    """
+    return KinshipMatrix({family.family_id: family}).inbreeding_coefficients(
+        family.family_id)
+
+
+class KinshipMatrix(object):
+    """
+    Block diagonal kinship matrix for a cohort.
+
+    One dense block is stored for each group of connected individuals in
+    each family, individuals in different blocks have kinship 0.
+    """
+    def __init__(self, families, dtype=None):
+        """
+        Arguments:
+            families (dict): A dictionary like FamilyParser.families
+            dtype (numpy.dtype): The type of the blocks, default is float64.
+                                 float32 halves the memory.
+        """
+        super(KinshipMatrix, self).__init__()
+        self.families = families
+        # A list with (family_id, order, matrix) for each block
+        self.blocks = []
+        # {(family_id, individual_id): (block number, position in block)}
+        self.positions = {}
+        for family_id in families:
+            family = families[family_id]
+            for component in get_components(family):
+                order, matrix = kinship_block(family, component, dtype)
+                block_number = len(self.blocks)
+                self.blocks.append((family_id, order, matrix))
+                for position, individual_id in enumerate(order):
+                    self.positions[(family_id, individual_id)] = (
+                        block_number, position)
+        logger.debug("Kinship computed in %s blocks", len(self.blocks))
+
+    def kinship(self, family_id, individual_1_id, individual_2_id):
+        """
+        Return the kinship coefficient of two individuals.
+
+        Arguments:
+            family_id (str): The id of the family
+            individual_1_id (str): The id of an individual
+            individual_2_id (str): The id of an individual
+
+        Returns:
+            float: The kinship coefficient
+        """
+        block_1, position_1 = self.positions[(family_id, individual_1_id)]
+        block_2, position_2 = self.positions[(family_id, individual_2_id)]
+        if block_1 != block_2:
+            return 0.0
+        return float(self.blocks[block_1][2][position_1, position_2])
+
+    def inbreeding(self, family_id, individual_id):
+        """
+        Return the inbreeding coefficient of an individual.
+
+        Arguments:
+            family_id (str): The id of the family
+            individual_id (str): The id of an individual
+
+        Returns:
+            float: The inbreeding coefficient
+        """
+        block_number, position = self.positions[(family_id, individual_id)]
+        return 2 * float(self.blocks[block_number][2][position, position]) - 1
+
+    def inbreeding_coefficients(self, family_id):
+        """
+        Return the inbreeding coefficients of the members of a family.
+
+        Arguments:
+            family_id (str): The id of the family
+
+        Returns:
+            coefficients (dict): A dictionary on the form {<ind_id>: <float>}
+        """
+        return dict(
+            (individual_id, self.inbreeding(family_id, individual_id))
+            for individual_id in self.families[family_id].individuals
+        )
+
+    def family_matrix(self, family_id):
+        """
+        Assemble the dense kinship matrix of a family.
+
+        Arguments:
+            family_id (str): The id of the family
+
+        Returns:
+            (individual_ids, matrix): The ids in the order of the matrix
+        """
+        individual_ids = list(self.families[family_id].individuals)
+        matrix = np.zeros((len(individual_ids), len(individual_ids)))
+        by_block = {}
+        for i, individual_id in enumerate(individual_ids):
+            block_number, position = self.positions[(family_id, individual_id)]
+            by_block.setdefault(block_number, []).append((i, position))
+        for block_number, members in by_block.items():
+            rows = [i for i, _ in members]
+            positions = [position for _, position in members]
+            matrix[np.ix_(rows, rows)] = self.blocks[block_number][2][
+                np.ix_(positions, positions)]
+        return individual_ids, matrix
+
+    def __repr__(self):
+        return "KinshipMatrix(families={0}, blocks={1})".format(
+            len(self.families), len(self.blocks))
@@ -0,0 +1,378 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+memo.py
+
+An in-process LRU cache of parsed pedigrees.
+
+load parses a pedigree file or text once and returns the same parsed
+pedigree for later calls with the same content and options:
+
+    >from ped_parser import load, cache_info
+    >family_parser = load('family.ped')
+    >family_parser is load('family.ped')
+    True
+    >cache_info()
+    CacheInfo(hits=1, misses=1, maxsize=128, currsize=1, memory=..., ...)
+
+The cache is keyed by the sha1 hash of the content together with
+family_type and cmms_check, so a changed file is parsed again and the
+same pedigree at different paths is parsed once. The hash of a file is
+reused as long as its size and modification time are the same.
+
+The parsed pedigrees are shared by all callers, so they are read-only.
+The FamilyParser, its Family and Individual objects and their containers
+are frozen: setting an attribute raises AttributeError and the mappings,
+sets and lists are replaced by read-only mappings, frozensets and tuples.
+
+The least recently used pedigrees are evicted when there are more than
+maxsize pedigrees or when their estimated memory is more than max_memory
+bytes. Use configure_cache to change the limits.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import hashlib
+import logging
+import threading
+
+from collections import OrderedDict, namedtuple
+from types import MappingProxyType
+
+from ped_parser.parser import FamilyParser
+from ped_parser.family import Family
+from ped_parser.individual import Individual
+from ped_parser.ids import registry
+from ped_parser.cache import content_hash
+from ped_parser.compression import open_family_file
+
+logger = logging.getLogger(__name__)
+
+# Default number of pedigrees in the cache
+MAXSIZE = 128
+
+# Number of file hashes that are remembered
+HASH_MEMO_SIZE = 1024
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize',
+                                     'memory', 'max_memory', 'evictions'])
+
+
+def is_text(path_or_text):
+    """Check if the argument to load is pedigree text rather than a path."""
+    if isinstance(path_or_text, bytes):
+        return True
+    return '\n' in path_or_text or '\t' in path_or_text
+
+
+def estimate_size(family_parser):
+    """
+    Estimate the memory used by the families and individuals of a parser.
+
+    Counts the objects, the relation containers and the extra info of the
+    individuals and the family and sample ids that they hold in the id
+    registry. Ids that are shared with other pedigrees are counted for each
+    of them.
+
+    Arguments:
+        family_parser (FamilyParser): A parsed pedigree
+
+    Returns:
+        size (int): The estimated number of bytes
+    """
+    getsizeof = sys.getsizeof
+    size = getsizeof(family_parser.families) + \
+        getsizeof(family_parser.individuals)
+    for family_id, family in family_parser.families.items():
+        size += registry.estimate_size(family_id)
+        # The size of an instance dict depends on the key sharing of its
+        # class, a copy has the same size for the same attributes
+        size += getsizeof(family) + getsizeof(dict(family.__dict__)) + \
+            getsizeof(family.individuals) + getsizeof(family.trios) + \
+            getsizeof(family.duos) + getsizeof(family.affected_individuals)
+        size += sum(getsizeof(group) for group in family.trios)
+        size += sum(getsizeof(group) for group in family.duos)
+    for individual_id, individual in family_parser.individuals.items():
+        size += getsizeof(individual) + registry.estimate_size(individual_id)
+        for container in (individual._extra_info, individual._siblings,
+                          individual._grandparents, individual._first_cousins,
+                          individual._second_cousins):
+            if container is not None:
+                size += getsizeof(container)
+        if individual._extra_info:
+            size += sum(getsizeof(value) for value in
+                        individual._extra_info.values())
+    return size
+
+
+# Used for empty and unused mappings of frozen objects
+EMPTY_MAPPING = MappingProxyType({})
+
+
+class ReadOnly(object):
+    """
+    Rejects setting and deleting attributes, see freeze.
+
+    It is the last base class so that objects can be changed to the
+    frozen class in place.
+    """
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Cached {0} objects are read-only".format(
+            type(self).__bases__[0].__name__))
+
+    def __delattr__(self, name):
+        self.__setattr__(name, None)
+
+
+class FrozenIndividual(Individual, ReadOnly):
+    """An Individual from the cache."""
+    __slots__ = ()
+
+
+class FrozenFamily(Family, ReadOnly):
+    """A Family from the cache."""
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        # The graph index is built when it is first used
+        if name == '_graph':
+            object.__setattr__(self, name, value)
+        else:
+            ReadOnly.__setattr__(self, name, value)
+
+
+class FrozenFamilyParser(FamilyParser, ReadOnly):
+    """A FamilyParser from the cache."""
+    __slots__ = ()
+
+
+def freeze_individual(individual):
+    """Make an Individual and its containers read-only."""
+    if individual._extra_info:
+        individual._extra_info = MappingProxyType(individual._extra_info)
+    else:
+        individual._extra_info = EMPTY_MAPPING
+    if individual._grandparents:
+        individual._grandparents = MappingProxyType(individual._grandparents)
+    else:
+        individual._grandparents = EMPTY_MAPPING
+    individual._siblings = frozenset(individual._siblings or ())
+    individual._first_cousins = frozenset(individual._first_cousins or ())
+    individual._second_cousins = frozenset(individual._second_cousins or ())
+    individual.__class__ = FrozenIndividual
+
+
+def freeze_family(family):
+    """Make a Family and its containers read-only."""
+    family.individuals = MappingProxyType(family.individuals)
+    family.trios = tuple(frozenset(trio) for trio in family.trios)
+    family.duos = tuple(frozenset(duo) for duo in family.duos)
+    family.affected_individuals = frozenset(family.affected_individuals)
+    family.__class__ = FrozenFamily
+
+
+def freeze(family_parser):
+    """
+    Make a parser, its families and individuals read-only.
+
+    Arguments:
+        family_parser (FamilyParser): A parsed pedigree
+
+    Returns:
+        family_parser (FrozenFamilyParser): The same object
+    """
+    for family in family_parser.families.values():
+        for individual in family.individuals.values():
+            freeze_individual(individual)
+        freeze_family(family)
+    # Individuals are also frozen if a later one with the same id replaced
+    # them in their family
+    for individual in family_parser.individuals.values():
+        if not isinstance(individual, FrozenIndividual):
+            freeze_individual(individual)
+    family_parser.families = MappingProxyType(family_parser.families)
+    family_parser.individuals = MappingProxyType(family_parser.individuals)
+    family_parser.extra_columns = tuple(family_parser.extra_columns)
+    family_parser._seen_columns = frozenset(family_parser._seen_columns)
+    family_parser.__class__ = FrozenFamilyParser
+    return family_parser
+
+
+class PedigreeCache(object):
+    """
+    A thread safe LRU cache of parsed pedigrees.
+
+    Pedigrees that fail to parse are not cached, the error is raised.
+    """
+    def __init__(self, maxsize=MAXSIZE, max_memory=None):
+        """
+        Arguments:
+            maxsize (int): Maximum number of pedigrees, None for no limit
+            max_memory (int): Maximum estimated bytes of the pedigrees,
+                              None for no limit
+        """
+        super(PedigreeCache, self).__init__()
+        self.maxsize = maxsize
+        self.max_memory = max_memory
+        self._entries = OrderedDict()
+        self._hashes = OrderedDict()
+        self._memory = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.RLock()
+
+    def _file_hash(self, path):
+        """Return the content hash of a file, reused while it is unchanged."""
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            memo = self._hashes.get(key)
+            if memo is not None and memo[0] == signature:
+                self._hashes.move_to_end(key)
+                return memo[1]
+        digest = content_hash(path)
+        with self._lock:
+            self._hashes[key] = (signature, digest)
+            if len(self._hashes) > HASH_MEMO_SIZE:
+                self._hashes.popitem(last=False)
+        return digest
+
+    def _evict(self):
+        """Evict the least recently used pedigrees until within limits."""
+        while self._entries and (
+                (self.maxsize is not None and
+                 len(self._entries) > self.maxsize) or
+                (self.max_memory is not None and
+                 self._memory > self.max_memory)):
+            _, (_, size) = self._entries.popitem(last=False)
+            self._memory -= size
+            self._evictions += 1
+
+    def load(self, path_or_text, family_type='ped', cmms_check=False):
+        """
+        Return a parsed pedigree from the cache or parse it.
+
+        Arguments:
+            path_or_text (str): A path to a pedigree file, it may be
+                                compressed, or the text of a pedigree.
+                                Strings with a tab or a newline are text.
+            family_type (str): Any of [ped, alt, cmms, fam, mip]
+            cmms_check (bool, optional): Perform CMMS validations?
+
+        Returns:
+            family_parser (FamilyParser): A shared parser with read-only
+                                          families and individuals
+        """
+        text = None
+        if is_text(path_or_text):
+            text = path_or_text
+            if isinstance(text, bytes):
+                text = text.decode('utf-8')
+            digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        else:
+            digest = self._file_hash(path_or_text)
+        key = (digest, family_type, bool(cmms_check))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            self._misses += 1
+
+        # Parse outside of the lock so other pedigrees can be loaded
+        if text is not None:
+            family_parser = FamilyParser(text.splitlines(True),
+                                         family_type=family_type,
+                                         cmms_check=cmms_check)
+        else:
+            with open_family_file(path_or_text) as handle:
+                family_parser = FamilyParser(handle, family_type=family_type,
+                                             cmms_check=cmms_check)
+        size = estimate_size(family_parser)
+        freeze(family_parser)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # Parsed by another thread at the same time
+                self._entries.move_to_end(key)
+                return entry[0]
+            self._entries[key] = (family_parser, size)
+            self._memory += size
+            self._evict()
+        logger.debug("Cached pedigree %s, %s bytes", digest, size)
+        return family_parser
+
+    def configure(self, maxsize=MAXSIZE, max_memory=None):
+        """Change the limits and evict pedigrees that are over them."""
+        with self._lock:
+            self.maxsize = maxsize
+            self.max_memory = max_memory
+            self._evict()
+
+    def cache_info(self):
+        """Return the hits, misses, size and memory of the cache."""
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self.maxsize,
+                             len(self._entries), self._memory,
+                             self.max_memory, self._evictions)
+
+    def cache_clear(self):
+        """Remove all pedigrees and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._hashes.clear()
+            self._memory = 0
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return "PedigreeCache(maxsize={0}, max_memory={1})".format(
+            self.maxsize, self.max_memory)
+
+
+# The cache that is used by load
+_cache = PedigreeCache()
+
+
+def load(path_or_text, family_type='ped', cmms_check=False):
+    """
+    Return a parsed pedigree, parsing it only if it is not in the cache.
+
+    See PedigreeCache.load.
+    """
+    return _cache.load(path_or_text, family_type, cmms_check)
+
+
+def cache_info():
+    """Return the statistics of the cache that is used by load."""
+    return _cache.cache_info()
+
+
+def cache_clear():
+    """Empty the cache that is used by load."""
+    _cache.cache_clear()
+
+
+def configure_cache(maxsize=MAXSIZE, max_memory=None):
+    """
+    Change the limits of the cache that is used by load.
+
+    Arguments:
+        maxsize (int): Maximum number of pedigrees, None for no limit
+        max_memory (int): Maximum estimated bytes of the pedigrees, None
+                          for no limit
+    """
+    _cache.configure(maxsize, max_memory)
@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+metrics.py
+
+Counters and timings for FamilyParser.
+
+Metrics are opt-in, FamilyParser(family_info, metrics=True) records
+
+counters:
+    lines INT Lines read
+    comment_lines INT Lines that start with '#'
+    blank_lines INT Empty lines
+    individuals INT Individuals parsed
+    families INT Families parsed
+    trios INT Trios found by family_check
+    duos INT Duos found by family_check
+
+phases, with wall and cpu seconds and the number of calls:
+    parse Reading the family info and building the families
+    tokenize Reading and splitting lines, part of parse
+    get_individual Validating columns and creating individuals, part of parse
+    family_check Checking the families
+    serialize to_dict, to_json, to_madeline and to_ped
+
+When the family info is parsed in chunks by worker processes the lines are
+not counted and tokenize and get_individual are not timed.
+"""
+
+from __future__ import print_function
+
+import json
+import time
+import logging
+import functools
+import inspect
+
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ['lines', 'comment_lines', 'blank_lines', 'individuals',
+            'families', 'trios', 'duos']
+PHASES = ['parse', 'tokenize', 'get_individual', 'family_check', 'serialize']
+
+
+class ParserMetrics(object):
+    """Counters and per phase timings of a FamilyParser."""
+    def __init__(self):
+        super(ParserMetrics, self).__init__()
+        self.counters = dict((name, 0) for name in COUNTERS)
+        self.phases = dict(
+            (name, {'wall': 0.0, 'cpu': 0.0, 'calls': 0}) for name in PHASES)
+
+    def add_time(self, name, wall, cpu):
+        """
+        Add time to a phase.
+
+        Arguments:
+            name (str): The name of the phase
+            wall (float): Wall clock seconds
+            cpu (float): CPU seconds of the process
+        """
+        phase = self.phases.setdefault(name, {'wall': 0.0, 'cpu': 0.0,
+                                              'calls': 0})
+        phase['wall'] += wall
+        phase['cpu'] += cpu
+        phase['calls'] += 1
+
+    @contextmanager
+    def phase(self, name):
+        """Time the code in a with block as a phase."""
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - wall,
+                          time.process_time() - cpu)
+
+    def timed_iter(self, iterator, name):
+        """
+        Yield from an iterator and time each step as a phase.
+
+        Only the time spent in the iterator is counted, not the time spent
+        by the caller between the steps. The whole iteration is one call.
+
+        Arguments:
+            iterator (iterator): Any iterator
+            name (str): The name of the phase
+        """
+        iterator = iter(iterator)
+        perf_counter = time.perf_counter
+        process_time = time.process_time
+        wall_total = 0.0
+        cpu_total = 0.0
+        try:
+            while True:
+                wall = perf_counter()
+                cpu = process_time()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    wall_total += perf_counter() - wall
+                    cpu_total += process_time() - cpu
+                yield item
+        finally:
+            self.add_time(name, wall_total, cpu_total)
+
+    def timed_call(self, function, name):
+        """
+        Wrap a function so that each call is timed as a phase.
+
+        Each call is counted as one call of the phase.
+
+        Arguments:
+            function (callable): Any function
+            name (str): The name of the phase
+
+        Returns:
+            wrapper (callable): The timed function
+        """
+        perf_counter = time.perf_counter
+        process_time = time.process_time
+        phase = self.phases.setdefault(name, {'wall': 0.0, 'cpu': 0.0,
+                                              'calls': 0})
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            wall = perf_counter()
+            cpu = process_time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                phase['wall'] += perf_counter() - wall
+                phase['cpu'] += process_time() - cpu
+                phase['calls'] += 1
+        return wrapper
+
+    def split_lines(self, family_info, comments=True):
+        """
+        Split the lines of family info on tabs and count them.
+
+        Works like reader.split_lines but also counts the lines.
+
+        Arguments:
+            family_info (iterator): An iterator with family info
+            comments (bool): If commented lines should be yielded
+
+        Yields:
+            (is_comment, splitted_line): See reader.split_lines
+        """
+        counters = self.counters
+        for line in family_info:
+            counters['lines'] += 1
+            line = line.rstrip()
+            if line.startswith('#'):
+                counters['comment_lines'] += 1
+                if comments:
+                    yield True, line[1:].split('\t')
+            elif line:
+                yield False, line.split('\t')
+            else:
+                counters['blank_lines'] += 1
+
+    def count_families(self, families):
+        """
+        Set the individual, family, trio and duo counters.
+
+        Arguments:
+            families (dict): A dictionary like FamilyParser.families
+        """
+        self.counters['families'] = len(families)
+        self.counters['individuals'] = sum(
+            len(family.individuals) for family in families.values())
+        self.counters['trios'] = sum(
+            len(family.trios) for family in families.values())
+        self.counters['duos'] = sum(
+            len(family.duos) for family in families.values())
+
+    def count_family(self, family):
+        """
+        Add a family to the individual, family, trio and duo counters.
+
+        Used when families are streamed and never stored together.
+
+        Arguments:
+            family (Family): A family where family_check has been run
+        """
+        counters = self.counters
+        counters['families'] += 1
+        counters['individuals'] += len(family.individuals)
+        counters['trios'] += len(family.trios)
+        counters['duos'] += len(family.duos)
+
+    def to_dict(self):
+        """
+        Return the metrics as a dictionary.
+
+        Returns:
+            metrics (dict): {'counters': {<name>: <int>},
+                             'phases': {<name>: {'wall': <float>,
+                                                 'cpu': <float>,
+                                                 'calls': <int>}}}
+        """
+        return {
+            'counters': dict(self.counters),
+            'phases': dict(
+                (name, dict(phase)) for name, phase in self.phases.items()),
+        }
+
+    def to_json(self, indent=None):
+        """Return the metrics as a json string."""
+        return json.dumps(self.to_dict(), indent=indent, sort_keys=True)
+
+    def __repr__(self):
+        return "ParserMetrics(counters={0})".format(self.counters)
+
+
+@contextmanager
+def phase(metrics, name):
+    """
+    Time the code in a with block if metrics is not None.
+
+    Arguments:
+        metrics (ParserMetrics): The metrics or None
+        name (str): The name of the phase
+    """
+    if metrics is None:
+        yield
+    else:
+        with metrics.phase(name):
+            yield
+
+
+def timed_phase(name):
+    """
+    Decorator that times a method of an object with a metrics attribute.
+
+    Generator methods are timed with ParserMetrics.timed_iter. Nothing is
+    timed when the metrics attribute is None.
+
+    Arguments:
+        name (str): The name of the phase
+    """
+    def decorator(method):
+        is_generator = inspect.isgeneratorfunction(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.metrics is None:
+                return method(self, *args, **kwargs)
+            if is_generator:
+                return self.metrics.timed_iter(
+                    method(self, *args, **kwargs), name)
+            with self.metrics.phase(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+models.py
+
+Models of inheritance as integer bitflags.
+
+Each model of inheritance has one bit and the models of a family or an
+individual are stored as an int, so filters on many families are bit
+operations:
+
+AR_HOM 1 Autosomal recessive homozygous
+AR_HOM_DN 2 Autosomal recessive homozygous de novo
+AR_COMP 4 Autosomal recessive compound heterozygous
+AD_DN 8 Autosomal dominant
+X 16 X linked
+NA 32 Not applicable
+
+All names that are accepted in the InheritanceModel column are compiled
+into one table that maps a name to the bit of its model:
+
+    >from ped_parser.models import model_table, AR_COMP, X
+    >model_table.parse('AR_compound;X_dn') == AR_COMP | X
+    True
+    >model_table.to_names(AR_COMP | X)
+    {'AR_comp', 'X'}
+
+The table can be extended with more names for a model and with new models,
+new models get the next free bit:
+
+    >model_table.add_alias('ARC', 'AR_comp')
+    >model_table.add_model('MT', aliases=['mito'])
+    64
+
+The bits of added models are only known in the process that added them,
+so models are pickled as names. Add models before worker processes are
+started so the workers know the same names, unknown names are ignored.
+"""
+
+from __future__ import print_function
+
+import logging
+import threading
+
+try:
+    from collections.abc import MutableSet
+except ImportError:
+    from collections import MutableSet
+
+logger = logging.getLogger(__name__)
+
+############### Names of genetic models ###############
+# The accepted names of each model, the first name is the name the model
+# is reported as. These are compiled into model_table when the module is
+# imported, use model_table.add_alias to accept more names.
+
+AR_HOM_NAMES = ['AR', 'AR_hom']
+AR_HOM_DN_NAMES = ['AR_denovo', 'AR_hom_denovo', 'AR_hom_dn', 'AR_dn']
+COMPOUND_NAMES = ['AR_compound', 'AR_comp']
+AD_NAMES = ['AD', 'AD_dn', 'AD_denovo']
+X_NAMES = ['X', 'X_dn', 'X_denovo']
+NA_NAMES = ['NA', 'Na', 'na', '.']
+
+# The models in bit order as (name, accepted names)
+MODELS = [
+    ('AR_hom', AR_HOM_NAMES),
+    ('AR_hom_dn', AR_HOM_DN_NAMES),
+    ('AR_comp', COMPOUND_NAMES),
+    ('AD_dn', AD_NAMES),
+    ('X', X_NAMES),
+    ('NA', NA_NAMES),
+]
+
+AR_HOM = 1 << 0
+AR_HOM_DN = 1 << 1
+AR_COMP = 1 << 2
+AD_DN = 1 << 3
+X = 1 << 4
+NA = 1 << 5
+
+
+class ModelTable(object):
+    """Maps names of models of inheritance to bitflags."""
+    def __init__(self, models=MODELS):
+        """
+        Arguments:
+            models (list): Models as (name, accepted names), in bit order
+        """
+        super(ModelTable, self).__init__()
+        # names[i] is the name of the model with bit i
+        self.names = []
+        # {<model name>: <flag>}
+        self.flags = {}
+        # {<accepted name>: <flag>}, the model names are included
+        self.aliases = {}
+        self._lock = threading.Lock()
+        for name, aliases in models:
+            self.add_model(name, aliases)
+
+    def add_model(self, name, aliases=()):
+        """
+        Add a model, or more accepted names for a model that exists.
+
+        Arguments:
+            name (str): The name the model is reported as
+            aliases (list): Other accepted names of the model
+
+        Returns:
+            flag (int): The bit of the model
+        """
+        with self._lock:
+            flag = self.flags.get(name)
+            if flag is None:
+                flag = 1 << len(self.names)
+                self.names.append(name)
+                self.flags[name] = flag
+            self.aliases[name] = flag
+            for alias in aliases:
+                self.aliases[alias] = flag
+        return flag
+
+    def add_alias(self, alias, name):
+        """
+        Accept another name for a model.
+
+        Arguments:
+            alias (str): The new name
+            name (str): The name of the model
+
+        Raises:
+            KeyError: If there is no model with the name
+        """
+        self.aliases[alias] = self.flags[name]
+
+    def parse(self, genetic_models):
+        """
+        Return the flags of the models in a InheritanceModel column.
+
+        Names that are not accepted are logged and ignored.
+
+        Arguments:
+            genetic_models (str): A ';'-separated string with model names
+
+        Returns:
+            flags (int): The bits of the models
+        """
+        return self.to_flags(genetic_models.split(';'))
+
+    def to_flags(self, models, strict=False):
+        """
+        Return the flags of models given as flags, a string or names.
+
+        Names that are not accepted are logged and ignored, models are
+        only added with add_model.
+
+        Arguments:
+            models (int, str or iterable): Flags, a ';'-separated string
+                                           or model names
+            strict (bool): Raise KeyError for names that are not accepted
+
+        Returns:
+            flags (int): The bits of the models
+        """
+        if isinstance(models, int):
+            return models
+        if isinstance(models, ModelSet):
+            return models.owner.models
+        if isinstance(models, str):
+            models = models.split(';')
+        flags = 0
+        aliases = self.aliases
+        for name in models:
+            flag = aliases.get(name)
+            if flag is None:
+                if strict:
+                    raise KeyError(name)
+                logger.warning("Incorrect model name: %s. Ignoring model.",
+                               name)
+            else:
+                flags |= flag
+        return flags
+
+    def to_names(self, flags):
+        """
+        Return the names of the models in flags.
+
+        Arguments:
+            flags (int): The bits of models
+
+        Returns:
+            names (list): The model names in bit order
+        """
+        names = []
+        bit = 0
+        while flags:
+            if flags & 1:
+                names.append(self.names[bit])
+            flags >>= 1
+            bit += 1
+        return names
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return "ModelTable(models={0})".format(self.names)
+
+
+class ModelSet(MutableSet):
+    """
+    The models of a Family or Individual as a set of names.
+
+    The set is a view of the models attribute of its owner, changes to the
+    set change the flags of the owner. Any accepted name of a model can be
+    used, names that are not accepted are logged and ignored.
+    """
+    def __init__(self, owner, table=None):
+        """
+        Arguments:
+            owner (Family or Individual): An object with models as flags
+            table (ModelTable): The model names, default is model_table
+        """
+        self.owner = owner
+        self.table = table or model_table
+
+    def __contains__(self, name):
+        return bool(self.owner.models & self.table.aliases.get(name, 0))
+
+    def __iter__(self):
+        return iter(self.table.to_names(self.owner.models))
+
+    def __len__(self):
+        return bin(self.owner.models).count('1')
+
+    def add(self, name):
+        self.owner.models |= self.table.to_flags([name])
+
+    def discard(self, name):
+        self.owner.models &= ~self.table.aliases.get(name, 0)
+
+    def update(self, *others):
+        """Add the models of other sets, names or flags."""
+        for models in others:
+            self.owner.models |= self.table.to_flags(models)
+
+    def __repr__(self):
+        return repr(set(self))
+
+
+# The table that is used by the parsers
+model_table = ModelTable()
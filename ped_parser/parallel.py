@@ -0,0 +1,356 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+parallel.py
+
+Run the work of the parser in a pool of processes.
+
+Families are independent of each other so family_check can be run for
+several families at the same time. The results are merged back into the
+original Family objects in the same order as a serial run, and the first
+exception in that order is raised.
+
+Files on disk can also be split in chunks. The file is split into byte
+ranges on line boundaries and the lines of each range are split into
+columns in a worker. The individuals are built from the columns in file
+order so families that straddle two chunks are stitched together when
+they are added to the parser.
+"""
+
+from __future__ import print_function
+
+import io
+import os
+import logging
+
+from concurrent.futures import ProcessPoolExecutor
+
+from ped_parser.compression import detect_compression
+from ped_parser.reader import split_lines
+
+logger = logging.getLogger(__name__)
+
+# Default number of bytes in each chunk when parsing files in parallel
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# The relation containers of Individual that are set by family_check
+RELATIONS = ('siblings', 'grandparents', 'first_cousins', 'second_cousins')
+
+
+def check_families(families, workers=1):
+    """
+    Run family_check for all families.
+
+    If workers is more than one the checks are done in a process pool. The
+    families are sent to the workers as compact tuples in batches, see
+    pack_family, and the results are merged back into the Family objects.
+    Starting the pool and moving the families costs about as much as a 
+    serial check of trios, so workers only pay off for large families.
+
+    Arguments:
+        families (dict): A dictionary on the form {<family_id>: <Family>}
+        workers (int): The number of processes to use
+
+    Raises:
+        PedigreeError: The first error in the order of families
+    """
+    family_ids = list(families)
+    if workers <= 1 or len(family_ids) < 2:
+        for family_id in family_ids:
+            families[family_id].family_check()
+        return
+
+    logger.info("Checking %s families with %s workers", len(family_ids), 
+                workers)
+    batch_size = max(1, len(family_ids) // (workers * 4))
+    batches = [
+        [pack_family(families[family_id]) for family_id in 
+         family_ids[start:start + batch_size]]
+        for start in range(0, len(family_ids), batch_size)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        position = 0
+        for results, error in executor.map(check_packed_families, batches):
+            for result in results:
+                merge_family(families[family_ids[position]], result)
+                position += 1
+            # All families before the error are merged like in a serial run
+            if error is not None:
+                raise error
+
+
+def pack_family(family):
+    """
+    Return the members of a family as a compact tuple for a worker.
+
+    Only what family_check needs is included, this is much cheaper to
+    pickle than a Family with its Individual objects.
+
+    Arguments:
+        family (Family): A Family object
+
+    Returns:
+        packed (tuple): (family_id, ((individual_id, father, mother, sex, 
+                        phenotype), ...)) with the members in family order
+    """
+    return (family.family_id, tuple(
+        (individual.individual_id, individual.father, individual.mother,
+         individual.sex, individual.phenotype)
+        for individual in family.individuals.values()))
+
+
+def unpack_family(packed):
+    """
+    Build a Family from the tuple of pack_family.
+
+    Arguments:
+        packed (tuple): A family from pack_family
+
+    Returns:
+        family (Family): A Family with the members in the same order
+    """
+    from ped_parser.family import Family
+    from ped_parser.individual import Individual
+
+    family_id, members = packed
+    family = Family(family_id)
+    for individual_id, father, mother, sex, phenotype in members:
+        family.add_individual(Individual(
+            individual_id, family_id, mother, father, sex, phenotype))
+    return family
+
+
+def check_packed_families(batch):
+    """
+    Run family_check for a batch of packed families in a worker.
+
+    Arguments:
+        batch (list): Families from pack_family
+
+    Returns:
+        (results, error): The results of check_family in order and the
+                exception of the first family that failed, or None. The
+                families after a failed family are not checked.
+    """
+    results = []
+    for packed in batch:
+        try:
+            results.append(check_family(unpack_family(packed)))
+        except Exception as e:
+            return results, e
+    return results, None
+
+
+def check_family(family):
+    """
+    Run family_check and return the results.
+
+    Used in workers of a process pool, where changes to the family are lost,
+    the results are merged back into the original with merge_family.
+    Members are referred to by their position in the family, so the 
+    results are small to pickle.
+
+    Arguments:
+        family (Family): A Family object
+
+    Returns:
+        result (tuple): (trios, duos, no_relations, affected, relations)
+                where trios and duos are tuples of positions, affected the
+                positions of the affected individuals and relations a list
+                with (position, relation, positions) for the relation 
+                containers that are not empty
+    """
+    family.family_check()
+    positions = dict(
+        (individual_id, position) for position, individual_id in 
+        enumerate(family.individuals))
+    relations = []
+    for position, individual in enumerate(family.individuals.values()):
+        for relation, name in enumerate(RELATIONS):
+            relatives = getattr(individual, '_' + name)
+            if relatives:
+                relations.append((position, relation, tuple(
+                    positions[relative_id] for relative_id in relatives)))
+    return (
+        [tuple(positions[member] for member in trio) 
+         for trio in family.trios],
+        [tuple(positions[member] for member in duo) 
+         for duo in family.duos],
+        family.no_relations,
+        tuple(positions[individual_id] for individual_id in 
+              family.affected_individuals),
+        relations,
+    )
+
+
+def merge_family(family, result):
+    """
+    Merge the results from check_family into a Family object.
+
+    Arguments:
+        family (Family): The original Family object, with the members in
+                         the same order as the checked family
+        result (tuple): The results from the worker
+    """
+    trios, duos, no_relations, affected, relations = result
+    members = list(family.individuals)
+    family.trios = [set(members[position] for position in trio) 
+                    for trio in trios]
+    family.duos = [set(members[position] for position in duo) 
+                   for duo in duos]
+    family.no_relations = no_relations
+    family.affected_individuals = set(
+        members[position] for position in affected)
+    for position, relation, relatives in relations:
+        name = RELATIONS[relation]
+        relative_ids = [members[relative] for relative in relatives]
+        if name == 'grandparents':
+            value = dict.fromkeys(relative_ids, '')
+        else:
+            value = set(relative_ids)
+        setattr(family.individuals[members[position]], name, value)
+
+
+def is_seekable_file(family_info):
+    """
+    Check if family info is a file on disk that has not been read from.
+    
+    Arguments:
+        family_info (iterator): An iterator with family info
+    
+    Returns:
+        bool: True if the file can be parsed in chunks
+    """
+    path = getattr(family_info, 'name', None)
+    if not isinstance(path, str) or not os.path.isfile(path):
+        return False
+    if detect_compression(path) is not None:
+        # Byte ranges of compressed files can not be parsed on their own
+        return False
+    try:
+        return family_info.seekable() and family_info.tell() == 0
+    except (AttributeError, IOError, ValueError):
+        return False
+
+
+def chunk_ranges(path, chunk_size=CHUNK_SIZE):
+    """
+    Split a file into byte ranges that start and end on line boundaries.
+    
+    Arguments:
+        path (str): Path to a file
+        chunk_size (int): The approximate number of bytes in each range
+    
+    Returns:
+        ranges (list): A list with (start, end) tuples
+    """
+    size = os.path.getsize(path)
+    ranges = []
+    start = 0
+    with open(path, 'rb') as handle:
+        while start < size:
+            handle.seek(min(start + chunk_size, size))
+            handle.readline()
+            end = min(handle.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+class SplitChunks(object):
+    """
+    The split lines of a file from the chunk workers of parse_file.
+
+    Can be given to FamilyParser.iter_individuals like a MmapReader, the
+    lines are split in the workers and the individuals are built from the
+    columns in the parent.
+    """
+    def __init__(self, chunks):
+        """
+        Arguments:
+            chunks (iterator): Lists with the split lines of each chunk, 
+                               see split_chunk
+        """
+        super(SplitChunks, self).__init__()
+        self.chunks = chunks
+
+    def split_lines(self, comments=True):
+        """
+        Yield the split lines of the chunks in order.
+
+        Arguments:
+            comments (bool): If commented lines should be yielded
+
+        Yields:
+            (is_comment, splitted_line): See reader.split_lines
+        """
+        for chunk in self.chunks:
+            for is_comment, splitted_line in chunk:
+                if comments or not is_comment:
+                    yield is_comment, splitted_line
+
+
+def parse_file(path, family_type='ped', cmms_check=False, workers=2,
+               encoding=None, chunk_size=CHUNK_SIZE):
+    """
+    Parse a file with the lines split in chunks by a pool of processes.
+    
+    The workers only read and split the lines of their chunk, the columns
+    are sent back and the individuals are built in this process in file
+    order, so header lines of alternative files are followed like in a
+    serial parse. Building the individuals is most of the work of a parse,
+    so this is rarely faster than a serial parse, see 
+    benchmarks/bench_parallel.py.
+    
+    Arguments:
+        path (str): Path to a file
+        family_type (str): Any of [ped, alt, cmms, fam, mip]
+        cmms_check (bool, optional): Perform CMMS validations?
+        workers (int): The number of processes to use
+        encoding (str): The encoding of the file
+        chunk_size (int): The approximate number of bytes in each chunk
+    
+    Yields:
+        (ind_object, models): The individuals in file order, like 
+                              FamilyParser.iter_individuals
+    """
+    from ped_parser.parser import FamilyParser
+    
+    ranges = chunk_ranges(path, chunk_size)
+    logger.info("Parsing %s in %s chunks with %s workers", path, len(ranges),
+                workers)
+    
+    family_parser = FamilyParser(family_type=family_type, 
+                                 cmms_check=cmms_check)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunks = executor.map(
+            _split_chunk_arguments, 
+            [(path, start, end, encoding) for start, end in ranges])
+        for individual in family_parser.iter_individuals(SplitChunks(chunks)):
+            yield individual
+
+
+def _split_chunk_arguments(arguments):
+    """Call split_chunk with a tuple of arguments."""
+    return split_chunk(*arguments)
+
+
+def split_chunk(path, start, end, encoding=None):
+    """
+    Split the lines in a byte range of a file.
+    
+    Arguments:
+        path (str): Path to a file
+        start (int): The first byte of the chunk
+        end (int): The byte after the last byte of the chunk
+        encoding (str): The encoding of the file
+    
+    Returns:
+        split_lines (list): The (is_comment, splitted_line) of each line, 
+                            see reader.split_lines
+    """
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        data = handle.read(end - start)
+    return list(split_lines(io.TextIOWrapper(io.BytesIO(data), 
+                                             encoding=encoding)))
@@ -45,27 +45,27 @@ Copyright (c) 2013 __MoonsoInc__. All rights reserved.
 
 from __future__ import print_function
 
+import os
 import json
 import logging
 import click
 
-from string import whitespace
 from ped_parser import (Individual, Family)
 from ped_parser.log import init_log
+from ped_parser.reader import MmapReader, split_lines
+from ped_parser.cache import load_cache, write_cache
+from ped_parser.index import get_index, read_family_lines
+from ped_parser.metrics import ParserMetrics, phase, timed_phase
+from ped_parser.compression import (decompress_family_info, 
+                                    detect_compression, open_family_file)
+from ped_parser.writer import (get_ped_header, ped_row_formatter, write_ndjson,
+                               PED_EXTRA_HEADERS)
+from ped_parser.parallel import check_families, SplitChunks
 from ped_parser.exceptions import (WrongAffectionStatus, WrongPhenotype,
                                     WrongGender, PedigreeError, WrongLineFormat)
-
-
-############### Names of genetic models ###############
-# These are stored as global variables and can be altered is the user
-# prefer other model names or want to add names
-
-AR_HOM_NAMES = ['AR', 'AR_hom']
-AR_HOM_DN_NAMES = ['AR_denovo', 'AR_hom_denovo', 'AR_hom_dn', 'AR_dn']
-COMPOUND_NAMES = ['AR_compound', 'AR_comp']
-AD_NAMES = ['AD', 'AD_dn', 'AD_denovo']
-X_NAMES = ['X', 'X_dn', 'X_denovo']
-NA_NAMES = ['NA', 'Na', 'na', '.']
+# The names of genetic models are compiled into model_table, see models.py
+from ped_parser.models import (model_table, AR_HOM_NAMES, AR_HOM_DN_NAMES, 
+                               COMPOUND_NAMES, AD_NAMES, X_NAMES, NA_NAMES)
 
 
 
@@ -74,13 +74,26 @@ class FamilyParser(object):
     Parses a iterator with family info and creates a family object with 
     individuals.
     """
-    def __init__(self, family_info, family_type = 'ped', cmms_check=False):
+    def __init__(self, family_info=None, family_type = 'ped', cmms_check=False,
+                 workers=1, cache=False, metrics=False):
         """
         
         Arguments:
-            family_info (iterator)
+            family_info (iterator): If None nothing is parsed, use 
+                                    iter_families to stream the families.
+                                    Handles to gzip, bgzf and zstd files 
+                                    are decompressed, see compression.py
             family_type (str): Any of [ped, alt, cmms, fam, mip]
             cmms_check (bool, optional): Perform CMMS validations?
+            workers (int, optional): Number of processes used to check 
+                                     the families. Default is 1, a pool
+                                     only pays off with several CPUs and
+                                     large families, see 
+                                     benchmarks/bench_parallel.py
+            cache (bool, optional): Read and write a cache of the parsed 
+                                    families next to the file, see cache.py
+            metrics (bool, optional): Record counters and timings in 
+                                      self.metrics, see metrics.py
         
         """
         super(FamilyParser, self).__init__()
@@ -94,35 +107,98 @@ class FamilyParser(object):
         
         self.cmms_check = cmms_check
         self.family_type = family_type
-        self.logger.info("Family type:{0}".format(family_type))
+        self.workers = workers
+        self.logger.info("Family type:%s", family_type)
         self.families = {}
         self.individuals = {}
-        self.legal_ar_hom_names = AR_HOM_NAMES
-        self.logger.debug("Legal AR hom names:{0}".format(AR_HOM_NAMES))
-        self.legal_ar_hom_dn_names = AR_HOM_DN_NAMES
-        self.logger.debug("Legal AR dn names:{0}".format(AR_HOM_DN_NAMES))
-        self.legal_compound_names = COMPOUND_NAMES
-        self.logger.debug("Legal AR compound names:{0}".format(COMPOUND_NAMES))
-        self.legal_ad_names = AD_NAMES
-        self.logger.debug("Legal AD compound names:{0}".format(AD_NAMES))
-        self.legal_x_names = X_NAMES
-        self.logger.debug("Legal X hom names:{0}".format(X_NAMES))
-        self.legal_na_names = NA_NAMES
-        self.logger.debug("Legal NA names:{0}".format(NA_NAMES))
+        # The extra columns of the individuals in the order they are seen
+        self.extra_columns = []
+        self._seen_columns = set()
+        self.metrics = ParserMetrics() if metrics else None
+        self.logger.debug("Legal models:%s", model_table)
         
         self.header = ['family_id', 'sample_id', 'father_id', 
                        'mother_id', 'sex', 'phenotype']
         
-        if self.family_type in ['ped', 'fam']:
-            self.ped_parser(family_info)
-        elif self.family_type == 'alt':
-            self.alternative_parser(family_info)
-        elif self.family_type in ['cmms', 'mip']:
-            self.alternative_parser(family_info)
-        # elif family_type == 'broad':
-        #     self.broad_parser(individual_line, line_count)
-        for fam in self.families:
-            self.families[fam].family_check()
+        if family_info is not None:
+            # Text handles to compressed files are read through a decompressor
+            family_info = decompress_family_info(family_info)
+        
+        cache_file = None
+        if cache:
+            cache_file = getattr(family_info, 'name', None)
+            if not isinstance(cache_file, str) or not os.path.isfile(cache_file):
+                self.logger.warning("Can only cache files on disk")
+                cache_file = None
+        cached = None
+        if cache_file:
+            cached = load_cache(cache_file, family_type, cmms_check)
+        
+        if cached:
+            self.families, self.individuals = cached
+            for ind_object in self.individuals.values():
+                self.add_extra_columns(ind_object)
+        elif family_info is not None:
+            with phase(self.metrics, 'parse'):
+                if self.family_type in ['ped', 'fam']:
+                    self.ped_parser(family_info)
+                elif self.family_type == 'alt':
+                    self.alternative_parser(family_info)
+                elif self.family_type in ['cmms', 'mip']:
+                    self.alternative_parser(family_info)
+                # elif family_type == 'broad':
+                #     self.broad_parser(individual_line, line_count)
+            with phase(self.metrics, 'family_check'):
+                check_families(self.families, workers)
+            if cache_file:
+                write_cache(cache_file, family_type, cmms_check, 
+                            self.families, self.individuals)
+        
+        if self.metrics is not None:
+            self.metrics.count_families(self.families)
+    
+    @classmethod
+    def load_family(cls, path, family_id, family_type='ped', cmms_check=False,
+                    encoding='utf-8'):
+        """
+        Parse one family from a pedigree file on disk.
+        
+        A byte offset index of the families is stored next to the file the
+        first time it is used, see index.py. Only the lines of the family 
+        are read and parsed. Compressed files can not be indexed, they are
+        parsed as a whole.
+        
+        Arguments:
+            path (str): Path to the pedigree file
+            family_id (str): The id of the family
+            family_type (str): Any of [ped, alt, cmms, fam, mip]
+            cmms_check (bool, optional): Perform CMMS validations?
+            encoding (str): The encoding of the file
+        
+        Returns:
+            family (Family): A Family object where family_check has been run
+        
+        Raises:
+            PedigreeError: If the family is not in the file
+        """
+        if detect_compression(path):
+            with open_family_file(path, encoding) as handle:
+                family_parser = cls(handle, family_type=family_type, 
+                                    cmms_check=cmms_check)
+            if family_id not in family_parser.families:
+                raise PedigreeError(family_id, None, 
+                    "Family {0} is not in {1}".format(family_id, path))
+            return family_parser.families[family_id]
+        
+        index = get_index(path, family_type, encoding)
+        family_lines = read_family_lines(path, index, family_id, encoding)
+        if family_lines is None:
+            raise PedigreeError(family_id, None, 
+                "Family {0} is not in {1}".format(family_id, path))
+        
+        family_parser = cls(family_lines, family_type=family_type, 
+                            cmms_check=cmms_check)
+        return family_parser.families[family_id]
     
     def get_individual(self, family_id, sample_id, father_id, mother_id, sex, phenotype,
             genetic_models = None, proband='.', consultand='.', alive='.'):
@@ -137,7 +213,7 @@ class FamilyParser(object):
             sex (str): The id for the sex of this sample
             phenotype (str): The id for the phenotype of this sample
             genetic_models (str): A ';'-separated string with the expected 
-            models of inheritance for this sample
+            models of inheritance for this sample, see models.py
             proband (str): 'Yes', 'No' or '.'
             consultand (str): 'Yes', 'No' or '.' if the individual is sequenced
             alive (str): 'Yes', 'No' or '.'
@@ -153,9 +229,6 @@ class FamilyParser(object):
             mother_id = '0'
         if father_id == '.':
             father_id = '0'
-        if genetic_models:
-            genetic_models = genetic_models.split(';')
-        
         if proband == 'Yes':
             proband = 'Y'
         elif proband == 'No':
@@ -212,31 +285,8 @@ class FamilyParser(object):
             family_info (iterator): An iterator with family info
         
         """
-        
-        for line in family_info:
-            # Check if commented line or empty line:
-            if not line.startswith('#') and not all(c in whitespace for c in line.rstrip()):
-                splitted_line = line.rstrip().split('\t')
-                if len(splitted_line) != 6:
-                    # Try to split the line on another symbol:
-                    splitted_line = line.rstrip().split()
-                try:
-                    self.check_line_length(splitted_line, 6)
-                except WrongLineFormat as e:
-                    self.logger.error(e)
-                    self.logger.info("Ped line: {0}".format(e.ped_line))
-                    raise e
-                
-                sample_dict = dict(zip(self.header, splitted_line))
-                family_id = sample_dict['family_id']
-                
-                if sample_dict['family_id'] not in self.families:
-                    self.families[family_id] = Family(family_id, {})
-                
-                ind_object = self.get_individual(**sample_dict)
-                self.individuals[ind_object.individual_id] = ind_object
-                self.families[ind_object.family].add_individual(ind_object)
-        
+        for ind_object, models in self.ped_individuals(family_info):
+            self.add_individual(ind_object, models)
 
     def alternative_parser(self, family_file):
         """
@@ -250,99 +300,317 @@ class FamilyParser(object):
         Arguments:
             family_info (iterator): An iterator with family info
         """
+        for ind_object, models in self.alternative_individuals(family_file):
+            self.add_individual(ind_object, models)
+    
+    def add_individual(self, ind_object, models=None):
+        """
+        Add an individual to the parser and to its family.
+        
+        Arguments:
+            ind_object (Individual): The individual to add
+            models (int or set): Models of inheritance for the family of 
+                                 the individual, as flags or names
+        """
+        family_id = ind_object.family
+        if family_id not in self.families:
+            self.families[family_id] = Family(family_id, {})
+        
+        self.individuals[ind_object.individual_id] = ind_object
+        self.families[family_id].add_individual(ind_object)
+        if models:
+            self.families[family_id].models |= model_table.to_flags(models)
+        if ind_object._extra_info:
+            self.add_extra_columns(ind_object)
+    
+    def add_extra_columns(self, ind_object):
+        """
+        Record the extra columns of an individual in self.extra_columns.
+        
+        Arguments:
+            ind_object (Individual): An individual
+        """
+        for column in ind_object._extra_info or ():
+            if column not in self._seen_columns:
+                self._seen_columns.add(column)
+                self.extra_columns.append(column)
+    
+    def get_extra_columns(self, wanted=None):
+        """
+        Return the extra columns of the individuals.
+        
+        The columns that were seen when parsing come first. Columns that 
+        were added to extra_info after parsing are found with a pass over 
+        the individuals, which is skipped when all wanted columns were 
+        seen when parsing.
+        
+        Arguments:
+            wanted (list): The columns that are used by the caller, None 
+                           if all are used
+        
+        Returns:
+            extra_columns (list): The extra columns in the order they are 
+                                  seen
+        """
+        extra_columns = list(self.extra_columns)
+        seen = set(extra_columns)
+        if wanted is not None and seen.issuperset(wanted):
+            return extra_columns
+        for individual in self.individuals.values():
+            for column in individual._extra_info or ():
+                if column not in seen:
+                    seen.add(column)
+                    extra_columns.append(column)
+        return extra_columns
+    
+    def iter_individuals(self, family_info):
+        """
+        Yield the individuals found in family info.
+        
+        The format is decided by the family type of the parser.
+        
+        Arguments:
+            family_info (iterator): An iterator with family info
+        
+        Yields:
+            (ind_object, models): A Individual object and the flags of the
+                                  models of inheritance found on its line
+        """
+        if self.family_type in ['ped', 'fam']:
+            return self.ped_individuals(family_info)
+        elif self.family_type in ['alt', 'cmms', 'mip']:
+            return self.alternative_individuals(family_info)
+        return iter([])
+    
+    def iter_families(self, family_info):
+        """
+        Yield checked families from family info one at a time.
+        
+        A family is yielded as soon as its block of lines ends so only one
+        family at a time is held in memory. Nothing is stored on the parser, 
+        self.families and self.individuals are left untouched.
+        The lines of a family have to be grouped in the input.
+        
+        Arguments:
+            family_info (iterator): An iterator with family info
+        
+        Yields:
+            family (Family): A Family object where family_check has been run
+        
+        Raises:
+            PedigreeError: If the lines of a family are not grouped
+        """
+        family = None
+        seen_families = set()
+        for ind_object, models in self.iter_individuals(family_info):
+            family_id = ind_object.family
+            if family is None or family_id != family.family_id:
+                if family is not None:
+                    self._check_streamed_family(family)
+                    yield family
+                
+                if family_id in seen_families:
+                    raise PedigreeError(family_id, ind_object.individual_id,
+                        "Family {0} is not grouped in the input.".format(
+                            family_id))
+                seen_families.add(family_id)
+                family = Family(family_id, {})
+            
+            family.add_individual(ind_object)
+            if models:
+                family.models |= model_table.to_flags(models)
+        
+        if family is not None:
+            self._check_streamed_family(family)
+            yield family
+    
+    def _check_streamed_family(self, family):
+        """Run family_check on a streamed family and count it."""
+        with phase(self.metrics, 'family_check'):
+            family.family_check()
+        if self.metrics is not None:
+            self.metrics.count_family(family)
+    
+    def split_lines(self, family_info, comments=True):
+        """
+        Split the lines of family info on tabs.
+        
+        Family info can be any iterator with lines, a MmapReader or lines
+        that were split by parallel.parse_file.
+        
+        Arguments:
+            family_info (iterator): An iterator with family info
+            comments (bool): If commented lines should be yielded
+        
+        Yields:
+            (is_comment, splitted_line): See reader.split_lines
+        """
+        if isinstance(family_info, SplitChunks):
+            return family_info.split_lines(comments)
+        if self.metrics is not None:
+            # A MmapReader yields lines when iterated
+            return self.metrics.timed_iter(
+                self.metrics.split_lines(family_info, comments), 'tokenize')
+        if isinstance(family_info, MmapReader):
+            return family_info.split_lines(comments)
+        return split_lines(family_info, comments)
+    
+    def ped_rows(self, family_info):
+        """
+        Yield the splitted lines from .ped formatted family info.
+        
+        Commented and empty lines are skipped.
+        
+        Arguments:
+            family_info (iterator): An iterator with family info
+        
+        Yields:
+            splitted_line (list): A list with the six ped columns
+        """
+        # Commented lines and empty lines are skipped by the splitter
+        for _, splitted_line in self.split_lines(family_info, comments=False):
+            if len(splitted_line) != 6:
+                # Try to split the line on another symbol:
+                splitted_line = ' '.join(splitted_line).split()
+            try:
+                self.check_line_length(splitted_line, 6)
+            except WrongLineFormat as e:
+                self.logger.error(e)
+                self.logger.info("Ped line: %s", e.ped_line)
+                raise e
+            
+            yield splitted_line
+    
+    def ped_individuals(self, family_info):
+        """
+        Yield the individuals from .ped formatted family info.
+        
+        Arguments:
+            family_info (iterator): An iterator with family info
+        
+        Yields:
+            (ind_object, models): A Individual object and 0 since ped 
+                                  files have no models of inheritance
+        """
+        get_individual = self.get_individual
+        if self.metrics is not None:
+            get_individual = self.metrics.timed_call(get_individual, 
+                                                     'get_individual')
+        for splitted_line in self.ped_rows(family_info):
+            sample_dict = dict(zip(self.header, splitted_line))
+            
+            yield get_individual(**sample_dict), 0
+    
+    def alternative_rows(self, family_file):
+        """
+        Yield the splitted lines from alternative formatted family info.
+        
+        Arguments:
+            family_info (iterator): An iterator with family info
+        
+        Yields:
+            (alternative_header, splitted_line): The header that is valid for
+                    the line and a list with the columns of the line
+        """
         
         alternative_header = None
         
-        for line in family_file:
-            if line.startswith('#'):
-                alternative_header = line[1:].rstrip().split('\t')
-                self.logger.info("Alternative header found: {0}".format(line))
-            elif line.strip():
+        for is_comment, splitted_line in self.split_lines(family_file):
+            if is_comment:
+                alternative_header = splitted_line
+                self.logger.info("Alternative header found: %s", 
+                                 '\t'.join(alternative_header))
+            else:
                 if not alternative_header:
                     raise WrongLineFormat(message="Alternative ped files must have "\
                                         "headers! Please add a header line.")
                 
-                splitted_line = line.rstrip().split('\t')
                 if len(splitted_line) < 6:
                     # Try to split the line on another symbol:
-                    splitted_line = line.rstrip().split()
+                    splitted_line = ' '.join(splitted_line).split()
                 try:
                     self.check_line_length(splitted_line, len(alternative_header))
-                except SyntaxError as e:
+                except WrongLineFormat as e:
                     self.logger.error('Number of entrys differ from header.')
-                    self.logger.error("Header:\n{0}".format('\t'.join(alternative_header)))
-                    self.logger.error("Ped Line:\n{0}".format('\t'.join(splitted_line)))
-                    self.logger.error("Length of Header: {0}. Length of "\
-                                      "Ped line: {1}".format(
-                                          len(alternative_header), 
-                                          len(splitted_line))
-                                    )
+                    self.logger.error("Header:\n%s", '\t'.join(alternative_header))
+                    self.logger.error("Ped Line:\n%s", '\t'.join(splitted_line))
+                    self.logger.error("Length of Header: %s. Length of "\
+                                      "Ped line: %s", len(alternative_header), 
+                                      len(splitted_line))
                     raise e
                 
-                if len(line) > 1:
-                    
-                    sample_dict = dict(zip(self.header, splitted_line[:6]))
-                    
-                    family_id = sample_dict['family_id']
-                    
-                    all_info = dict(zip(alternative_header, splitted_line))
-                    
-                    if sample_dict['family_id'] not in self.families:
-                        self.families[family_id] = Family(family_id, {})
+                yield alternative_header, splitted_line
+    
+    def alternative_individuals(self, family_file):
+        """
+        Yield the individuals from alternative formatted family info.
+        
+        See alternative_parser for a description of the format.
+        
+        Arguments:
+            family_info (iterator): An iterator with family info
+        
+        Yields:
+            (ind_object, models): A Individual object and the flags of the
+                                  models of inheritance found on its line
+        """
+        get_individual = self.get_individual
+        if self.metrics is not None:
+            get_individual = self.metrics.timed_call(get_individual, 
+                                                     'get_individual')
+        for alternative_header, splitted_line in self.alternative_rows(family_file):
+            sample_dict = dict(zip(self.header, splitted_line[:6]))
+            
+            all_info = dict(zip(alternative_header, splitted_line))
+            
+            sample_dict['genetic_models'] = all_info.get('InheritanceModel', None)
+            # Try other header naming:
+            if not sample_dict['genetic_models']:
+                sample_dict['genetic_models'] = all_info.get('Inheritance_model', None)
+                
+            sample_dict['proband'] = all_info.get('Proband', '.')
+            sample_dict['consultand'] = all_info.get('Consultand', '.')
+            sample_dict['alive'] = all_info.get('Alive', '.')
+            
+            ind_object = get_individual(**sample_dict)
+            models = ind_object.models
+            
+            # If requested, we try is it is an id in the CMMS format:
+            sample_id_parts = ind_object.individual_id.split('-')
+            if self.cmms_check and (len(sample_id_parts) == 3):
+                # If the id follow the CMMS convention we can
+                # do a sanity check
+                if self.check_cmms_id(ind_object.individual_id):
+                    self.logger.debug("Id follows CMMS convention: %s", 
+                                      ind_object.individual_id)
+                    self.logger.debug("Checking CMMS id affections status")
+                    try:
+                        self.check_cmms_affection_status(ind_object)
+                    except WrongAffectionStatus as e:
+                        self.logger.error("Wrong affection status for"\
+                        " %s. Affection status can be in"\
+                        " %s", e.cmms_id, e.valid_statuses)
+                        raise e
+                    except WrongPhenotype as e:
+                        self.logger.error("Affection status for %s "\
+                        "(%s) disagrees with phenotype (%s)",
+                            e.cmms_id, e.phenotype, e.affection_status
+                        )
+                        raise e
                     
-                    sample_dict['genetic_models'] = all_info.get('InheritanceModel', None)
-                    # Try other header naming:
-                    if not sample_dict['genetic_models']:
-                        sample_dict['genetic_models'] = all_info.get('Inheritance_model', None)
+                    try:
+                        self.check_cmms_gender(ind_object)
+                    except WrongGender as e:
+                        self.logger.error("Gender code for id %s"\
+                        "(%s) disagrees with sex:%s",
+                            e.cmms_id, e.sex_code, e.sex
+                        )
+                        raise e
                         
-                    sample_dict['proband'] = all_info.get('Proband', '.')
-                    sample_dict['consultand'] = all_info.get('Consultand', '.')
-                    sample_dict['alive'] = all_info.get('Alive', '.')
-                    
-                    ind_object = self.get_individual(**sample_dict)
-                    
-                    self.individuals[ind_object.individual_id] = ind_object
-                    self.families[ind_object.family].add_individual(ind_object)
-                    
-                    if sample_dict['genetic_models']:
-                        for model in self.get_models(sample_dict['genetic_models']):
-                            self.families[ind_object.family].models_of_inheritance.add(model)
-                    
-                    # If requested, we try is it is an id in the CMMS format:
-                    sample_id_parts = ind_object.individual_id.split('-')
-                    if self.cmms_check and (len(sample_id_parts) == 3):
-                        # If the id follow the CMMS convention we can
-                        # do a sanity check
-                        if self.check_cmms_id(ind_object.individual_id):
-                            self.logger.debug("Id follows CMMS convention: {0}".format(
-                                ind_object.individual_id
-                            ))
-                            self.logger.debug("Checking CMMS id affections status")
-                            try:
-                                self.check_cmms_affection_status(ind_object)
-                            except WrongAffectionStatus as e:
-                                self.logger.error("Wrong affection status for"\
-                                " {0}. Affection status can be in"\
-                                " {1}".format(e.cmms_id, e.valid_statuses))
-                                raise e
-                            except WrongPhenotype as e:
-                                self.logger.error("Affection status for {0} "\
-                                "({1}) disagrees with phenotype ({2})".format(
-                                    e.cmms_id, e.phenotype, e.affection_status
-                                ))
-                                raise e
-                            
-                            try:
-                                self.check_cmms_gender(ind_object)
-                            except WrongGender as e:
-                                self.logger.error("Gender code for id {0}"\
-                                "({1}) disagrees with sex:{2}".format(
-                                    e.cmms_id, e.sex_code, e.sex
-                                ))
-                                raise e
-                                
-                    for i in range(6, len(splitted_line)):
-                        ind_object.extra_info[alternative_header[i]] = splitted_line[i]
+            for i in range(6, len(splitted_line)):
+                ind_object.extra_info[alternative_header[i]] = splitted_line[i]
+            
+            yield ind_object, models
     
     def check_cmms_id(self, ind_id):
         """
@@ -423,35 +691,38 @@ class FamilyParser(object):
         """
         Check what genetic models that are found and return them as a set.
         
+        Names that are not accepted are logged and ignored, see models.py
+        
         Args:
             genetic_models  : A string with genetic models
         
-        Yields:
+        Returns:
              correct_model_names  : A set with the correct model names
         """
-        correct_model_names = set()
-        genetic_models = genetic_models.split(';')
-        correct_model_names = set()
-        for model in genetic_models:
-            # We need to allow typos
-            if model in self.legal_ar_hom_names:
-                model = 'AR_hom'
-            elif model in self.legal_ar_hom_dn_names:
-                model = 'AR_hom_dn'
-            elif model in self.legal_ad_names:
-                model = 'AD_dn'
-            elif model in self.legal_compound_names:
-                model = 'AR_comp'
-            elif model in self.legal_x_names:
-                model = 'X'
-            elif model in self.legal_na_names:
-                model = 'NA'
-            else:
-                self.logger.warning("Incorrect model name: {0}."\
-                                    " Ignoring model.".format(model))
-            correct_model_names.add(model)
-        return correct_model_names
+        return set(model_table.to_names(model_table.parse(genetic_models)))
+    
+    def families_with_models(self, models, match_all=True):
+        """
+        Return the families that have models of inheritance.
+        
+        Arguments:
+            models (int or list): Flags or names of models, like 
+                                  models.AR_COMP | models.X or 
+                                  ['AR_comp', 'X']
+            match_all (bool): If all models are required, otherwise any of 
+                              them is enough
+        
+        Returns:
+            families (list): The Family objects in parse order
+        """
+        flags = model_table.to_flags(models, strict=True)
+        if match_all:
+            return [family for family in self.families.values() 
+                    if family.models & flags == flags]
+        return [family for family in self.families.values() 
+                if family.models & flags]
     
+    @timed_phase('serialize')
     def to_dict(self):
         """
         Return the information from the pedigree file as a dictionary.
@@ -463,21 +734,25 @@ class FamilyParser(object):
         """
         
         self.logger.debug("Return the information as a dictionary")
+        # Check the level once, the loop below runs for every individual
+        debug = self.logger.isEnabledFor(logging.DEBUG)
         families = {}
         for family_id in self.families:
             family = []
             for individual_id in self.families[family_id].individuals:
                 individual = self.families[family_id].individuals[individual_id]
                 family.append(individual.to_json())
-                self.logger.debug("Adding individual {0} to family {1}".format(
-                    individual_id, family_id
-                ))
-            self.logger.debug("Adding family {0}".format(family_id))
+                if debug:
+                    self.logger.debug("Adding individual %s to family %s", 
+                                      individual_id, family_id)
+            if debug:
+                self.logger.debug("Adding family %s", family_id)
             families[family_id] = family
         
         return families
             
         
+    @timed_phase('serialize')
     def to_json(self):
         """
         Yield the information from the pedigree file as a json object.
@@ -512,6 +787,27 @@ class FamilyParser(object):
             yield self.families[family_id].to_json()
         #return json.dumps(json_families)
     
+    @timed_phase('serialize')
+    def to_ndjson(self, outfile, per_individual=False, backend=None):
+        """
+        Write the families as newline delimited json, see writer.py.
+        
+        Each line is a family in the format of to_json, or an individual 
+        if per_individual is True.
+        
+        Arguments:
+            outfile (file): A path, a stream or a BufferedWriter, see
+                            writer.write_ndjson
+            per_individual (bool): Write one line per individual
+            backend (str): 'orjson' or 'json', default is orjson if installed
+        
+        Returns:
+            lines (int): The number of lines written
+        """
+        return write_ndjson(self.families.values(), outfile, per_individual,
+                            backend)
+    
+    @timed_phase('serialize')
     def to_madeline(self):
         """
         Return a generator with the info in madeline format.
@@ -540,62 +836,49 @@ class FamilyParser(object):
                 
                 yield individual.to_madeline()
     
+    @timed_phase('serialize')
     def to_ped(self):
         """
         Return a generator with the info in ped format.
         
+        The header is the ped header plus the extra columns of the 
+        individuals, see get_extra_columns.
+        
         Yields:
             An iterator with the family info in ped format
         """
-        
-        ped_header = [
-            '#FamilyID',
-            'IndividualID',
-            'PaternalID',
-            'MaternalID', 
-            'Sex',
-            'Phenotype',
-        ]
-        
-        extra_headers = [
-            'InheritanceModel',
-            'Proband',
-            'Consultand',
-            'Alive'
-        ]
-        
-        for individual_id in self.individuals:
-            individual = self.individuals[individual_id]
-            for info in individual.extra_info:
-                if info in extra_headers:
-                    if info not in ped_header:
-                        ped_header.append(info)
-        
-        self.logger.debug("Ped headers found: {0}".format(
-            ', '.join(ped_header)
-        ))
-        
-        
+        ped_header = get_ped_header(self.get_extra_columns(PED_EXTRA_HEADERS))
+        self.logger.debug("Ped headers found: %s", ', '.join(ped_header))
         
         yield '\t'.join(ped_header)
         
-        for family_id in self.families:
-            for individual_id in self.families[family_id].individuals:
-                individual = self.families[family_id].individuals[individual_id].to_json()
-                ped_info = []
-                ped_info.append(individual['family_id'])
-                ped_info.append(individual['id'])
-                ped_info.append(individual['father'])
-                ped_info.append(individual['mother'])
-                ped_info.append(individual['sex'])
-                ped_info.append(individual['phenotype'])
-            
-                if len(ped_header) > 6:
-                    for header in ped_header[6:]:
-                        ped_info.append(individual['extra_info'].get(header, '.'))
-            
-                yield '\t'.join(ped_info)
+        format_row = ped_row_formatter(ped_header)
+        for family in self.families.values():
+            for individual in family.individuals.values():
+                yield format_row(individual)
+    
+
+def iter_families(family_info, family_type='ped', cmms_check=False):
+    """
+    Yield checked families from a iterator with family info.
+    
+    This is the streaming alternative to FamilyParser, peak memory is 
+    bounded by the largest family instead of the whole file.
+    The lines of each family have to be grouped in the input.
+    
+    Arguments:
+        family_info (iterator): An iterator with family info
+        family_type (str): Any of [ped, alt, cmms, fam, mip]
+        cmms_check (bool, optional): Perform CMMS validations?
     
+    Yields:
+        family (Family): A Family object where family_check has been run
+    """
+    family_parser = FamilyParser(family_type=family_type, cmms_check=cmms_check)
+    family_info = decompress_family_info(family_info)
+    for family in family_parser.iter_families(family_info):
+        yield family
+
 
 @click.command()
 @click.argument('family_file', 
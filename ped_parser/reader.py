@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+reader.py
+
+Readers that turn pedigree files into splitted lines for the parser.
+
+split_lines works on any iterator with lines, like a file handle or a list
+of strings. MmapReader memory maps a file on disk and reads the lines
+directly from the page cache instead of copying them through a file buffer.
+Blocks of whole lines are decoded at a time, which is faster than decoding
+each line or field on its own, and each line is splitted once.
+
+Both yield tuples (is_comment, splitted_line) for all non blank lines, the
+'#' of commented lines is removed. Lines are splitted on tabs.
+"""
+
+from __future__ import print_function
+
+import io
+import mmap
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Number of bytes that are decoded at a time by MmapReader
+BLOCK_SIZE = 1024 * 1024
+
+
+def split_lines(family_info, comments=True):
+    """
+    Split the lines of family info on tabs.
+
+    Arguments:
+        family_info (iterator): An iterator with family info
+        comments (bool): If commented lines should be yielded
+
+    Yields:
+        (is_comment, splitted_line): If the line was a comment and a list
+                                     with the columns of the line
+    """
+    for line in family_info:
+        line = line.rstrip()
+        if line.startswith('#'):
+            if comments:
+                yield True, line[1:].split('\t')
+        elif line:
+            yield False, line.split('\t')
+
+
+class MmapReader(object):
+    """
+    Read a pedigree file on disk through a memory map.
+
+    A MmapReader can be given to FamilyParser, iter_families and
+    PedigreeTable.from_lines instead of a file handle. Lines have to end
+    with '\\n' or '\\r\\n'.
+    """
+    def __init__(self, path, encoding='utf-8', start=0, end=None):
+        """
+        Arguments:
+            path (str): Path to a file
+            encoding (str): The encoding of the file
+            start (int): The byte to start reading from
+            end (int): The byte to stop reading at, default is end of file
+        """
+        super(MmapReader, self).__init__()
+        self.name = path
+        self.encoding = encoding
+        self.start = start
+        self.end = end
+
+    def _blocks(self):
+        """Yield decoded blocks of whole lines from the memory map."""
+        with io.open(self.name, 'rb') as handle:
+            try:
+                data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files can not be mapped
+                return
+            try:
+                end = len(data) if self.end is None else min(self.end, len(data))
+                position = self.start
+                while position < end:
+                    block_end = end
+                    if position + BLOCK_SIZE < end:
+                        block_end = data.rfind(b'\n', position, 
+                                               position + BLOCK_SIZE)
+                        if block_end == -1:
+                            block_end = data.find(b'\n', position + BLOCK_SIZE,
+                                                  end)
+                        if block_end == -1:
+                            block_end = end
+                    elif data[end - 1:end] == b'\n':
+                        # Skip the newline that ends the last line
+                        block_end = end - 1
+                    yield data[position:block_end].decode(self.encoding)
+                    position = block_end + 1
+            finally:
+                data.close()
+
+    def split_lines(self, comments=True):
+        """
+        Split the lines of the file on tabs.
+
+        Arguments:
+            comments (bool): If commented lines should be yielded
+
+        Yields:
+            (is_comment, splitted_line): If the line was a comment and a list
+                                         with the columns of the line
+        """
+        for block in self._blocks():
+            for line in block.split('\n'):
+                line = line.rstrip()
+                if not line:
+                    continue
+                if line[0] == '#':
+                    if comments:
+                        yield True, line[1:].split('\t')
+                else:
+                    yield False, line.split('\t')
+
+    def __iter__(self):
+        """Yield the lines of the file as strings ending with '\\n'."""
+        for block in self._blocks():
+            for line in block.split('\n'):
+                if line.endswith('\r'):
+                    line = line[:-1]
+                yield line + '\n'
+
+    def __repr__(self):
+        return "MmapReader(path={0}, encoding={1})".format(
+            self.name, self.encoding)
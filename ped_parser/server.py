@@ -0,0 +1,416 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+server.py
+
+Answer pedigree lookups from an index that is kept in memory.
+
+PedigreeIndex parses one or more pedigree files once and keeps the answers
+to the lookups as dictionaries that are ready to be encoded. The files are
+parsed again when they change on disk and the new index replaces the old
+one in one assignment, so lookups are never blocked or see half a reload.
+If a changed file can not be parsed the old index is kept.
+
+serve answers lookups over HTTP on localhost or on a Unix socket with
+keep alive connections:
+
+GET /samples/<sample_id> The family, parents, sex, phenotype and affection
+                         status of a sample
+GET /families/<family_id> The members, trios, duos and affected
+                          individuals of a family
+GET /affected The affected individuals of all families, or of one family
+              with ?family=<family_id>
+POST /batch A json list of lookups like {"op": "sample", "id": "<id>"},
+            op is one of sample, family and affected. The answers are
+            returned as a list in the same order
+GET /health The files, the number of families and samples and when the
+            index was loaded
+
+Lookups of ids that do not exist return 404, in a batch the answer is
+{"error": <message>}.
+
+    ped_parser serve cohort.ped --socket /tmp/pedigrees.sock
+    curl --unix-socket /tmp/pedigrees.sock http://localhost/samples/NA12878
+"""
+
+from __future__ import print_function
+
+import os
+import json
+import stat
+import time
+import socket
+import logging
+import threading
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from ped_parser.parser import FamilyParser
+from ped_parser.writer import get_encoder
+from ped_parser.compression import open_family_file
+from ped_parser.exceptions import NotIndexedError
+
+logger = logging.getLogger(__name__)
+
+# Seconds between the checks for changed files
+RELOAD_INTERVAL = 2.0
+
+OPERATIONS = ['sample', 'family', 'affected']
+
+
+def sample_record(individual):
+    """Return the answer to a sample lookup."""
+    return {
+        'sample': individual.individual_id,
+        'family': individual.family,
+        'father': individual.father,
+        'mother': individual.mother,
+        'sex': individual.sex,
+        'phenotype': individual.phenotype,
+        'affected': individual.affected,
+    }
+
+
+def family_record(family):
+    """Return the answer to a family lookup."""
+    trios = []
+    for trio in family.trios:
+        for individual_id in trio:
+            child = family.individuals[individual_id]
+            if set([child.father, child.mother]) <= trio and \
+                    individual_id not in (child.father, child.mother):
+                trios.append({'child': individual_id, 'father': child.father,
+                              'mother': child.mother})
+                break
+    return {
+        'family': family.family_id,
+        'members': list(family.individuals),
+        'trios': trios,
+        'duos': [sorted(duo) for duo in family.duos],
+        'affected': sorted(family.affected_individuals),
+        'models_of_inheritance': sorted(family.models_of_inheritance),
+    }
+
+
+class IndexState(object):
+    """The answers of a PedigreeIndex for one version of the files."""
+    def __init__(self, samples, families, stats, loaded_at):
+        super(IndexState, self).__init__()
+        self.samples = samples
+        self.families = families
+        self.stats = stats
+        self.loaded_at = loaded_at
+
+
+class PedigreeIndex(object):
+    """
+    Lookups of samples and families in pedigree files.
+
+    Families and samples from later files replace those with the same id in
+    earlier files.
+    """
+    def __init__(self, paths, family_type='ped', cmms_check=False):
+        """
+        Arguments:
+            paths (list): Paths to pedigree files, they can be compressed
+            family_type (str): Any of [ped, alt, cmms, fam, mip]
+            cmms_check (bool, optional): Perform CMMS validations?
+        """
+        super(PedigreeIndex, self).__init__()
+        self.paths = list(paths)
+        self.family_type = family_type
+        self.cmms_check = cmms_check
+        self._lock = threading.Lock()
+        self._failed_stats = None
+        self._state = self._load()
+
+    def _stats(self):
+        """Return the modification time and size of the files."""
+        stats = {}
+        for path in self.paths:
+            file_stat = os.stat(path)
+            stats[path] = (file_stat.st_mtime_ns, file_stat.st_size)
+        return stats
+
+    def _load(self):
+        """Parse the files and return a new IndexState."""
+        stats = self._stats()
+        samples = {}
+        families = {}
+        for path in self.paths:
+            with open_family_file(path) as handle:
+                family_parser = FamilyParser(handle,
+                                             family_type=self.family_type,
+                                             cmms_check=self.cmms_check)
+            for family_id, family in family_parser.families.items():
+                if family_id in families:
+                    logger.warning("Family %s in %s replaces an earlier "
+                                   "family", family_id, path)
+                families[family_id] = family_record(family)
+                for individual in family.individuals.values():
+                    samples[individual.individual_id] = \
+                        sample_record(individual)
+        logger.info("Indexed %s families and %s samples", len(families),
+                    len(samples))
+        return IndexState(samples, families, stats, time.time())
+
+    def reload_if_changed(self):
+        """
+        Parse the files again if any of them changed.
+
+        Returns:
+            reloaded (bool): True if the index was replaced
+        """
+        with self._lock:
+            stats = None
+            try:
+                stats = self._stats()
+                if stats in (self._state.stats, self._failed_stats):
+                    return False
+                logger.info("Pedigree files changed, reloading")
+                self._state = self._load()
+            except Exception:
+                # A file may be half written, it is loaded when it changes
+                logger.exception("Reload failed, keeping the old index")
+                self._failed_stats = stats
+                return False
+        return True
+
+    def sample(self, sample_id):
+        """Return the family, parents and status of a sample."""
+        try:
+            return self._state.samples[sample_id]
+        except KeyError:
+            raise NotIndexedError('sample', sample_id,
+                "Sample {0} is not in the index".format(sample_id))
+
+    def family(self, family_id):
+        """Return the members, trios and affected of a family."""
+        try:
+            return self._state.families[family_id]
+        except KeyError:
+            raise NotIndexedError('family', family_id,
+                "Family {0} is not in the index".format(family_id))
+
+    def affected(self, family_id=None):
+        """Return the ids of the affected individuals, of one family or all."""
+        if family_id is not None:
+            return self.family(family_id)['affected']
+        return [sample_id for family in self._state.families.values()
+                for sample_id in family['affected']]
+
+    def lookup(self, request):
+        """
+        Answer one lookup of a batch.
+
+        Arguments:
+            request (dict): {'op': <any of OPERATIONS>, 'id': <id>}, 'id' is
+                            optional for affected
+
+        Returns:
+            answer: The answer of the lookup or {'error': <message>}
+        """
+        if not isinstance(request, dict) or \
+                request.get('op') not in OPERATIONS:
+            return {'error': "Lookups need an op, one of {0}".format(
+                ', '.join(OPERATIONS))}
+        try:
+            return getattr(self, request['op'])(request.get('id'))
+        except NotIndexedError as e:
+            return {'error': str(e)}
+
+    def batch(self, requests):
+        """Answer a list of lookups in order, see lookup."""
+        return [self.lookup(request) for request in requests]
+
+    def health(self):
+        """Return the files and size of the index."""
+        state = self._state
+        return {
+            'files': self.paths,
+            'families': len(state.families),
+            'samples': len(state.samples),
+            'loaded_at': state.loaded_at,
+        }
+
+    def __repr__(self):
+        return "PedigreeIndex(paths={0}, family_type={1})".format(
+            self.paths, self.family_type)
+
+
+class PedigreeRequestHandler(BaseHTTPRequestHandler):
+    """Answer the HTTP lookups of a PedigreeIndex."""
+    # Keep connections open for many lookups
+    protocol_version = 'HTTP/1.1'
+    # Send the headers and the body of a response with one write, separate
+    # writes are delayed by the Nagle algorithm on keep alive connections
+    wbufsize = -1
+    encode = staticmethod(get_encoder())
+
+    def address_string(self):
+        # Unix sockets have no client address
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+    def send_json(self, answer, status=200):
+        body = self.encode(answer).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, message, status):
+        self.send_json({'error': message}, status)
+
+    def do_GET(self):
+        index = self.server.index
+        url = urlsplit(self.path)
+        parts = [unquote(part) for part in url.path.split('/') if part]
+        try:
+            if len(parts) == 2 and parts[0] == 'samples':
+                self.send_json(index.sample(parts[1]))
+            elif len(parts) == 2 and parts[0] == 'families':
+                self.send_json(index.family(parts[1]))
+            elif parts == ['affected']:
+                family_id = parse_qs(url.query).get('family', [None])[0]
+                self.send_json(index.affected(family_id))
+            elif parts == ['health']:
+                self.send_json(index.health())
+            else:
+                self.send_error_json("Unknown path {0}".format(url.path), 404)
+        except NotIndexedError as e:
+            self.send_error_json(str(e), 404)
+
+    def do_POST(self):
+        if urlsplit(self.path).path.rstrip('/') != '/batch':
+            self.send_error_json("Unknown path {0}".format(self.path), 404)
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            requests = json.loads(self.rfile.read(length).decode('utf-8'))
+        except ValueError as e:
+            self.send_error_json("Invalid json: {0}".format(e), 400)
+            return
+        if not isinstance(requests, list):
+            self.send_error_json("A batch is a list of lookups", 400)
+            return
+        self.send_json(self.server.index.batch(requests))
+
+
+class PedigreeHTTPServer(ThreadingMixIn, HTTPServer):
+    """Answer lookups on a TCP port, one thread per connection."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, index):
+        self.index = index
+        HTTPServer.__init__(self, address, PedigreeRequestHandler)
+
+
+class PedigreeUnixServer(ThreadingMixIn, UnixStreamServer):
+    """Answer lookups on a Unix socket, one thread per connection."""
+    daemon_threads = True
+
+    def __init__(self, path, index):
+        self.index = index
+        UnixStreamServer.__init__(self, path, PedigreeRequestHandler)
+
+    def server_bind(self):
+        UnixStreamServer.server_bind(self)
+        # Used by BaseHTTPRequestHandler
+        self.server_name = socket.gethostname()
+        self.server_port = 0
+
+
+def watch(index, stop, interval=RELOAD_INTERVAL):
+    """
+    Reload an index when its files change, until stop is set.
+
+    Arguments:
+        index (PedigreeIndex): The index to reload
+        stop (threading.Event): Set to stop watching
+        interval (float): Seconds between the checks
+    """
+    while not stop.wait(interval):
+        index.reload_if_changed()
+
+
+def remove_socket(socket_path):
+    """
+    Remove a Unix socket file, if there is one at the path.
+
+    Arguments:
+        socket_path (str): The path of the socket
+
+    Raises:
+        FileExistsError: If the path is something else than a socket
+    """
+    try:
+        mode = os.stat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(
+            "{0} exists and is not a socket, it is not removed".format(
+                socket_path))
+    os.remove(socket_path)
+
+
+def make_server(index, host='127.0.0.1', port=8000, socket_path=None):
+    """
+    Create a server for an index.
+
+    Arguments:
+        index (PedigreeIndex): The index to answer lookups from
+        host (str): The host of the HTTP server
+        port (int): The port of the HTTP server, 0 for any free port
+        socket_path (str): Serve on a Unix socket instead of a port
+
+    Returns:
+        server: A PedigreeUnixServer or PedigreeHTTPServer
+    """
+    if socket_path:
+        # Left by a server that was not shut down
+        remove_socket(socket_path)
+        return PedigreeUnixServer(socket_path, index)
+    return PedigreeHTTPServer((host, port), index)
+
+
+def serve(index, host='127.0.0.1', port=8000, socket_path=None,
+          reload_interval=RELOAD_INTERVAL):
+    """
+    Answer lookups until interrupted.
+
+    Arguments:
+        index (PedigreeIndex): The index to answer lookups from
+        host (str): The host of the HTTP server
+        port (int): The port of the HTTP server
+        socket_path (str): Serve on a Unix socket instead of a port
+        reload_interval (float): Seconds between the checks for changed
+                                 files, 0 to never reload
+    """
+    server = make_server(index, host, port, socket_path)
+    stop = threading.Event()
+    if reload_interval:
+        watcher = threading.Thread(target=watch, name='PedigreeWatcher',
+                                   args=(index, stop, reload_interval))
+        watcher.daemon = True
+        watcher.start()
+    logger.info("Serving %r on %s", index, socket_path or
+                "http://{0}:{1}".format(*server.server_address[:2]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        if socket_path:
+            remove_socket(socket_path)
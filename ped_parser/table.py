@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+table.py
+
+A columnar representation of a pedigree for cohort scale data.
+
+Instead of one Individual object per sample the information is stored in
+NumPy arrays with one row per sample:
+
+family INT32 Index into family_ids
+sex INT8 1=male 2=female 0=unknown
+phenotype INT8 1=unaffected, 2=affected, 0=missing
+father INT32 Row of the father or -1 if missing
+mother INT32 Row of the mother or -1 if missing
+
+Sample ids are kept in the list sample_ids and family ids in family_ids.
+Extra columns and models of inheritance are not stored in the table.
+
+NumPy is required for this module, install with 'pip install ped_parser[table]'
+"""
+
+from __future__ import print_function
+
+import logging
+
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from ped_parser.individual import Individual
+from ped_parser.family import Family
+from ped_parser.exceptions import PedigreeError
+
+logger = logging.getLogger(__name__)
+
+
+class PedigreeTable(object):
+    """Array backed table with one row per individual."""
+    def __init__(self, family_ids, sample_ids, family, sex, phenotype,
+                 father, mother):
+        """
+        Arguments:
+            family_ids (list): The family ids, indexed by family code
+            sample_ids (list): The sample id of each row
+            family (array): The family code of each row
+            sex (array): The sex of each row
+            phenotype (array): The phenotype of each row
+            father (array): The row of the father or -1
+            mother (array): The row of the mother or -1
+        """
+        super(PedigreeTable, self).__init__()
+        if np is None:
+            raise ImportError("PedigreeTable requires numpy. Please install "\
+                              "it with 'pip install numpy'")
+        self.family_ids = family_ids
+        self.sample_ids = sample_ids
+        self.family = np.asarray(family, dtype=np.int32)
+        self.sex = np.asarray(sex, dtype=np.int8)
+        self.phenotype = np.asarray(phenotype, dtype=np.int8)
+        self.father = np.asarray(father, dtype=np.int32)
+        self.mother = np.asarray(mother, dtype=np.int32)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Build a table from rows with the six ped columns.
+
+        Sex and phenotype are normalized in the same way as in
+        FamilyParser.get_individual. Parents are looked up within the family
+        of each row.
+
+        Arguments:
+            rows (iterator): An iterator with lists like [family_id,
+                             sample_id, father_id, mother_id, sex, phenotype]
+
+        Returns:
+            table (PedigreeTable)
+
+        Raises:
+            PedigreeError: If a parent is not in the family or have wrong sex
+        """
+        codes = {'1': 1, '2': 2}
+        family_codes = {}
+        family_ids = []
+        sample_ids = []
+        parent_ids = []
+        family = array('i')
+        sex = array('b')
+        phenotype = array('b')
+
+        for row in rows:
+            family_id = row[0]
+            family_code = family_codes.get(family_id)
+            if family_code is None:
+                family_code = family_codes[family_id] = len(family_ids)
+                family_ids.append(family_id)
+            family.append(family_code)
+            sample_ids.append(row[1])
+            parent_ids.append((row[2], row[3]))
+            sex.append(codes.get(row[4], 0))
+            phenotype.append(codes.get(row[5], 0))
+
+        rows_by_id = {}
+        for row_number, sample_id in enumerate(sample_ids):
+            rows_by_id[(family[row_number], sample_id)] = row_number
+
+        father = array('i', [-1]) * len(sample_ids)
+        mother = array('i', [-1]) * len(sample_ids)
+        for row_number, (father_id, mother_id) in enumerate(parent_ids):
+            family_code = family[row_number]
+            for parent_id, parents in ((father_id, father), (mother_id, mother)):
+                if parent_id not in ('0', '.'):
+                    try:
+                        parents[row_number] = rows_by_id[(family_code, parent_id)]
+                    except KeyError:
+                        raise PedigreeError(family_ids[family_code], parent_id,
+                                            'Parent is not in family.')
+
+        table = cls(family_ids, sample_ids,
+                    np.frombuffer(family, dtype=np.int32),
+                    np.frombuffer(sex, dtype=np.int8),
+                    np.frombuffer(phenotype, dtype=np.int8),
+                    np.frombuffer(father, dtype=np.int32),
+                    np.frombuffer(mother, dtype=np.int32))
+        table.check_parents()
+        return table
+
+    @classmethod
+    def from_lines(cls, family_info, family_type='ped'):
+        """
+        Build a table directly from family info, no Individuals are created.
+
+        Arguments:
+            family_info (iterator): An iterator with family info
+            family_type (str): Any of [ped, alt, cmms, fam, mip]
+
+        Returns:
+            table (PedigreeTable)
+        """
+        from ped_parser.parser import FamilyParser
+        family_parser = FamilyParser(family_type=family_type)
+        if family_type in ['ped', 'fam']:
+            rows = family_parser.ped_rows(family_info)
+        else:
+            rows = (splitted_line[:6] for _, splitted_line in
+                    family_parser.alternative_rows(family_info))
+        return cls.from_rows(rows)
+
+    @classmethod
+    def from_families(cls, families):
+        """
+        Build a table from Family objects.
+
+        Arguments:
+            families (dict): A dictionary like FamilyParser.families
+
+        Returns:
+            table (PedigreeTable)
+        """
+        def get_rows():
+            for family_id in families:
+                for individual in families[family_id].individuals.values():
+                    yield [individual.family, individual.individual_id,
+                           individual.father, individual.mother,
+                           str(individual.sex), str(individual.phenotype)]
+        return cls.from_rows(get_rows())
+
+    def to_families(self):
+        """
+        Return the table as Family objects where family_check has been run.
+
+        Returns:
+            families (dict): A dictionary on the form {<family_id>: <Family>}
+        """
+        families = {}
+        for family_id in self.family_ids:
+            families[family_id] = Family(family_id, {})
+
+        for row_number, sample_id in enumerate(self.sample_ids):
+            father = self.father[row_number]
+            mother = self.mother[row_number]
+            family_id = self.family_ids[self.family[row_number]]
+            families[family_id].add_individual(Individual(
+                sample_id,
+                family=family_id,
+                father=self.sample_ids[father] if father >= 0 else '0',
+                mother=self.sample_ids[mother] if mother >= 0 else '0',
+                sex=self.sex[row_number],
+                phenotype=self.phenotype[row_number]
+            ))
+
+        for family_id in families:
+            families[family_id].family_check()
+
+        return families
+
+    def check_parents(self):
+        """
+        Check that all fathers are males and all mothers are females.
+
+        Raises:
+            PedigreeError: For the first parent with the wrong sex
+        """
+        for parents, sex, message in (
+                (self.father, 1, 'Father is not specified as male.'),
+                (self.mother, 2, 'Mother is not specified as female.')):
+            children = np.flatnonzero(parents >= 0)
+            wrong = children[self.sex[parents[children]] != sex]
+            if len(wrong) > 0:
+                row_number = wrong[0]
+                raise PedigreeError(
+                    self.family_ids[self.family[row_number]],
+                    self.sample_ids[parents[row_number]],
+                    message
+                )
+
+    def affected(self):
+        """Return the rows of all affected individuals."""
+        return np.flatnonzero(self.phenotype == 2)
+
+    def affected_counts(self):
+        """Return the number of affected individuals per family code."""
+        return np.bincount(self.family[self.phenotype == 2],
+                           minlength=len(self.family_ids))
+
+    def founders(self):
+        """Return the rows of all individuals without parents."""
+        return np.flatnonzero((self.father < 0) & (self.mother < 0))
+
+    def trios(self):
+        """
+        Return all trios.
+
+        Returns:
+            trios (numpy.ndarray): A (n, 3) array with the rows of child,
+                                   father and mother
+        """
+        children = np.flatnonzero((self.father >= 0) & (self.mother >= 0))
+        return np.column_stack(
+            (children, self.father[children], self.mother[children])
+        )
+
+    def duos(self):
+        """
+        Return all duos.
+
+        Returns:
+            duos (numpy.ndarray): A (n, 2) array with the rows of child and
+                                  the known parent
+        """
+        only_father = (self.father >= 0) & (self.mother < 0)
+        only_mother = (self.mother >= 0) & (self.father < 0)
+        children = np.flatnonzero(only_father | only_mother)
+        parents = np.where(only_father[children], self.father[children],
+                           self.mother[children])
+        return np.column_stack((children, parents))
+
+    def __len__(self):
+        return len(self.sample_ids)
+
+    def __repr__(self):
+        return "PedigreeTable(individuals={0}, families={1})".format(
+            len(self.sample_ids), len(self.family_ids)
+        )
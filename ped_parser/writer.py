@@ -0,0 +1,391 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+writer.py
+
+Buffered output and streaming json output of families.
+
+BufferedWriter collects rows in memory and writes them in large chunks to a
+file, stdout or a gzip stream. This is much faster than one write per row,
+especially on network filesystems. The chunks can be joined, encoded and
+written by a background thread while the rows of the next chunk are
+produced:
+
+    >with BufferedWriter('families.ped.gz', threaded=True) as writer:
+        writer.write_rows(family_parser.to_ped())
+    >writer.rows_written, writer.bytes_written
+
+Families are written as newline delimited json (NDJSON), one family per line
+as a list with the individuals, or one individual per line. Each line is
+encoded as soon as its family is produced and the lines are written in
+chunks, so memory is bounded by the largest family and the size of a chunk.
+Together with iter_families a cohort can be converted without holding it in
+memory:
+
+    >with open('cohort.fam') as handle:
+        write_ndjson(iter_families(handle), sys.stdout)
+
+orjson is used for encoding if it is installed, otherwise the json module
+of the standard library.
+"""
+
+from __future__ import print_function
+
+import io
+import sys
+import gzip
+import json
+import logging
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Number of characters that are collected before a chunk is written
+BUFFER_SIZE = 1024 * 1024
+
+# Number of chunks that can wait for the background thread
+QUEUE_SIZE = 4
+
+BACKENDS = ['orjson', 'json']
+
+PED_HEADER = ['#FamilyID', 'IndividualID', 'PaternalID', 'MaternalID', 'Sex',
+              'Phenotype']
+# Extra columns that are exported to ped files
+PED_EXTRA_HEADERS = ['InheritanceModel', 'Proband', 'Consultand', 'Alive']
+
+
+def is_binary(stream):
+    """Check if a stream takes bytes rather than str."""
+    if isinstance(stream, (io.RawIOBase, io.BufferedIOBase)):
+        return True
+    if isinstance(stream, io.TextIOBase):
+        return False
+    return 'b' in str(getattr(stream, 'mode', ''))
+
+
+class BufferedWriter(object):
+    """
+    Write rows to a file, stdout or a gzip stream in large chunks.
+
+    Files that are opened by the writer are closed when the writer is
+    closed, streams that are given to the writer are only flushed.
+    """
+    def __init__(self, outfile=None, buffer_size=BUFFER_SIZE, compress=None,
+                 threaded=False, encoding='utf-8', mode='w'):
+        """
+        Arguments:
+            outfile (str or file): A path, an open text or binary stream or
+                                   None for stdout
+            buffer_size (int): Number of characters to collect before a
+                               chunk is written
+            compress (str): 'gzip' to compress a path, default is to
+                            compress paths that end with '.gz'
+            threaded (bool): Join, encode and write the chunks in a
+                             background thread
+            encoding (str): The encoding of binary output
+            mode (str): 'w' to truncate or 'a' to append to a path
+        """
+        super(BufferedWriter, self).__init__()
+        self.buffer_size = buffer_size
+        self.encoding = encoding
+        self.bytes_written = 0
+        self._rows_flushed = 0
+        self.closed = False
+
+        self._owned = False
+        if outfile is None or outfile == '-':
+            outfile = sys.stdout
+        elif isinstance(outfile, str):
+            if compress is None and outfile.endswith('.gz'):
+                compress = 'gzip'
+            if compress == 'gzip':
+                outfile = gzip.open(outfile, mode + 'b')
+            elif compress is None:
+                outfile = io.open(outfile, mode + 'b')
+            else:
+                raise ValueError("Unknown compression {0}".format(compress))
+            self._owned = True
+        self.outfile = outfile
+        self._binary = is_binary(outfile)
+
+        self._chunk = []
+        self._chunk_size = 0
+
+        self._queue = None
+        self._thread = None
+        self._error = None
+        if threaded:
+            self._queue = queue.Queue(QUEUE_SIZE)
+            self._thread = threading.Thread(target=self._write_chunks,
+                                            name='BufferedWriter')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _write_chunk(self, chunk):
+        """Join, encode and write a chunk of rows."""
+        text = '\n'.join(chunk) + '\n'
+        data = text.encode(self.encoding)
+        self.outfile.write(data if self._binary else text)
+        self.bytes_written += len(data)
+
+    def _write_chunks(self):
+        """Write the chunks from the queue until None is received."""
+        while True:
+            chunk = self._queue.get()
+            try:
+                if chunk is None:
+                    return
+                if self._error is None:
+                    self._write_chunk(chunk)
+            except Exception as e:
+                # Raised in the thread that uses the writer
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _check_error(self):
+        """Raise the error from the background thread if there is one."""
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _flush_chunk(self):
+        """Hand over the collected rows to be written."""
+        if not self._chunk:
+            return
+        chunk = self._chunk
+        self._rows_flushed += len(chunk)
+        self._chunk = []
+        self._chunk_size = 0
+        if self._queue is not None:
+            self._check_error()
+            self._queue.put(chunk)
+        else:
+            self._write_chunk(chunk)
+
+    @property
+    def rows_written(self):
+        """int: The number of rows that have been given to the writer"""
+        return self._rows_flushed + len(self._chunk)
+
+    def write_row(self, row):
+        """
+        Write a row, a newline is added.
+
+        Arguments:
+            row (str): A row without newline
+        """
+        self._chunk.append(row)
+        self._chunk_size += len(row) + 1
+        if self._chunk_size >= self.buffer_size:
+            self._flush_chunk()
+
+    def write_rows(self, rows):
+        """
+        Write rows, a newline is added to each row.
+
+        Arguments:
+            rows (iterator): An iterator with rows without newlines
+        """
+        # Same as write_row without a method call for each row
+        append = self._chunk.append
+        size = self._chunk_size
+        buffer_size = self.buffer_size
+        for row in rows:
+            append(row)
+            size += len(row) + 1
+            if size >= buffer_size:
+                self._chunk_size = size
+                self._flush_chunk()
+                append = self._chunk.append
+                size = 0
+        self._chunk_size = size
+
+    def flush(self):
+        """Write the collected rows and flush the output."""
+        self._flush_chunk()
+        if self._queue is not None:
+            # Wait for the background thread to write the queued chunks
+            self._queue.join()
+            self._check_error()
+        self.outfile.flush()
+
+    def close(self):
+        """Write the collected rows and close files opened by the writer."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            try:
+                self._flush_chunk()
+            finally:
+                if self._queue is not None:
+                    # Stop the background thread
+                    self._queue.put(None)
+                    self._thread.join()
+            self._check_error()
+            self.outfile.flush()
+        finally:
+            if self._owned:
+                self.outfile.close()
+        logger.debug("Wrote %s rows and %s bytes", self.rows_written,
+                     self.bytes_written)
+
+    def stats(self):
+        """Return a dictionary with the rows and bytes written."""
+        return {'rows_written': self.rows_written,
+                'bytes_written': self.bytes_written}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return "BufferedWriter(outfile={0}, rows_written={1})".format(
+            getattr(self.outfile, 'name', self.outfile), self.rows_written)
+
+
+def get_ped_header(extra_columns=()):
+    """
+    Return the header of a ped file.
+
+    Arguments:
+        extra_columns (iterator): The extra columns of the individuals, only
+                                  those in PED_EXTRA_HEADERS are exported
+
+    Returns:
+        header (list): The ped columns and the extra columns to export
+    """
+    return PED_HEADER + [column for column in extra_columns
+                         if column in PED_EXTRA_HEADERS]
+
+
+def ped_row_formatter(header):
+    """
+    Return a function that formats an individual as a row of a ped file.
+
+    Each row is built with one join of Individual.ped_row, without
+    creating a dictionary for the individual. Missing extra columns are
+    written as '.'.
+
+    Arguments:
+        header (list): A header from get_ped_header
+
+    Returns:
+        format_row (callable): Takes an Individual and returns a str
+    """
+    extra_columns = tuple(header[len(PED_HEADER):])
+    join = '\t'.join
+
+    def format_row(individual):
+        return join(individual.ped_row(extra_columns))
+    return format_row
+
+
+def get_encoder(backend=None):
+    """
+    Return a function that encodes an object as a compact json string.
+
+    Arguments:
+        backend (str): Any of BACKENDS, default is orjson if installed
+
+    Returns:
+        encode (callable): Takes an object and returns a str
+    """
+    if backend is None:
+        backend = 'orjson' if orjson is not None else 'json'
+    if backend == 'orjson':
+        if orjson is None:
+            raise ImportError("The orjson backend requires orjson. Please "\
+                              "install it with 'pip install orjson'")
+        dumps = orjson.dumps
+
+        def encode(obj):
+            return dumps(obj).decode('utf-8')
+        return encode
+    if backend == 'json':
+        # Without indent and circular checks the C encoder is used as is
+        return json.JSONEncoder(separators=(',', ':'), ensure_ascii=False,
+                                check_circular=False).encode
+    raise ValueError("Unknown json backend {0}, use one of {1}".format(
+        backend, ', '.join(BACKENDS)))
+
+
+def json_rows(families, per_individual=False, backend=None):
+    """
+    Yield the families as json rows without newlines.
+
+    Arguments:
+        families (iterator): An iterator with Family objects
+        per_individual (bool): Yield one row per individual
+        backend (str): Any of BACKENDS, default is orjson if installed
+
+    Yields:
+        row (str): A family or an individual encoded as json
+    """
+    encode = get_encoder(backend)
+    for family in families:
+        if per_individual:
+            for individual in family.individuals.values():
+                yield encode(individual.to_json())
+        else:
+            yield encode(family.to_json())
+
+
+def iter_ndjson(families, per_individual=False, backend=None):
+    """
+    Yield the families as json lines.
+
+    Arguments:
+        families (iterator): An iterator with Family objects, like
+                             FamilyParser.families.values() or
+                             iter_families
+        per_individual (bool): Yield one line per individual instead of one
+                               per family
+        backend (str): Any of BACKENDS, default is orjson if installed
+
+    Yields:
+        line (str): A json line ending with a newline
+    """
+    for row in json_rows(families, per_individual, backend):
+        yield row + '\n'
+
+
+def write_ndjson(families, outfile, per_individual=False, backend=None,
+                 buffer_size=BUFFER_SIZE):
+    """
+    Write the families as json lines.
+
+    Arguments:
+        families (iterator): An iterator with Family objects
+        outfile (str or file): A path, an open stream or None for stdout,
+                               see BufferedWriter. Can also be a
+                               BufferedWriter, it is not closed.
+        per_individual (bool): Write one line per individual instead of one
+                               per family
+        backend (str): Any of BACKENDS, default is orjson if installed
+        buffer_size (int): Number of characters to collect before writing
+
+    Returns:
+        lines (int): The number of lines written
+    """
+    rows = json_rows(families, per_individual, backend)
+    if isinstance(outfile, BufferedWriter):
+        rows_written = outfile.rows_written
+        outfile.write_rows(rows)
+        return outfile.rows_written - rows_written
+    with BufferedWriter(outfile, buffer_size) as writer:
+        writer.write_rows(rows)
+    return writer.rows_written
@@ -21,6 +21,11 @@ setup(
         'pytest',
         'click'
     ],
+    extras_require={
+        'table': ['numpy'],
+        'json': ['orjson'],
+        'zstd': ['zstandard'],
+    },
     packages=[
         'ped_parser'
     ],
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from ped_parser import FamilyParser, aio, aparse
+from ped_parser.exceptions import PedigreeError
+
+ALT_LINES = [
+    '#FamilyID\tSampleID\tFather\tMother\tSex\tPhenotype\tInheritanceModel\n',
+    '1\tproband\tfather\tmother\t1\t2\tAR_hom\n',
+    '1\tmother\t0\t0\t2\t1\tAR_hom\n',
+    '1\tfather\t0\t0\t1\t1\tAR_hom\n',
+    '2\tproband_2\tfather_2\tmother_2\t2\t2\tAD\n',
+    '2\tmother_2\t0\t0\t2\t1\tAD\n',
+    '2\tfather_2\t0\t0\t1\t1\tAD\n',
+]
+
+
+async def async_lines(lines):
+    for line in lines:
+        await asyncio.sleep(0)
+        yield line
+
+
+def stream_reader(lines):
+    """Return a StreamReader with the lines as bytes, needs a running loop."""
+    reader = asyncio.StreamReader()
+    reader.feed_data(''.join(lines).encode('utf-8'))
+    reader.feed_eof()
+    return reader
+
+
+def test_aparse_async_iterator():
+    """Test that aparse gives the same families as FamilyParser."""
+    family_parser = asyncio.run(aparse(async_lines(ALT_LINES), 
+                                       family_type='alt'))
+    expected = FamilyParser(ALT_LINES, family_type='alt')
+    assert list(family_parser.families) == list(expected.families)
+    for family_id, family in family_parser.families.items():
+        assert family.trios == expected.families[family_id].trios
+        assert (family.models_of_inheritance == 
+                expected.families[family_id].models_of_inheritance)
+
+
+def test_aparse_many_streams():
+    """Test parsing stream readers concurrently with a process pool."""
+    async def parse_all(executor):
+        return await asyncio.gather(
+            *[aparse(stream_reader(ALT_LINES), family_type='alt', 
+                     executor=executor) for _ in range(5)])
+    
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        family_parsers = asyncio.run(parse_all(executor))
+    assert len(family_parsers) == 5
+    for family_parser in family_parsers:
+        assert len(family_parser.families['1'].trios) == 1
+        proband = family_parser.individuals['proband']
+        assert proband.extra_info['InheritanceModel'] == 'AR_hom'
+
+
+def test_aparse_error():
+    """Test that the error of the first family in order is raised."""
+    family_lines = [
+        '1\tproband\tfather\t0\t1\t2\n',
+        '2\tproband_2\t0\tmother_2\t1\t2\n',
+        '2\tmother_2\t0\t0\t1\t1\n',
+    ]
+    async def parse():
+        return await aparse(stream_reader(family_lines))
+    
+    with pytest.raises(PedigreeError) as excinfo:
+        asyncio.run(parse())
+    assert excinfo.value.family_id == '1'
+
+
+def test_aparse_in_batches(monkeypatch):
+    """Test that lines are parsed in batches with the alternative header."""
+    batches = []
+    add_lines = aio._add_lines
+    def record_batch(family_parser, lines, header_line=None):
+        batches.append(len(lines))
+        return add_lines(family_parser, lines, header_line)
+    monkeypatch.setattr(aio, 'YIELD_EVERY', 2)
+    monkeypatch.setattr(aio, '_add_lines', record_batch)
+    
+    family_parser = asyncio.run(aparse(async_lines(ALT_LINES), 
+                                       family_type='alt'))
+    assert batches == [2, 2, 2, 1]
+    assert list(family_parser.individuals) == [
+        line.split('\t')[1] for line in ALT_LINES[1:]]
+    assert family_parser.families['2'].models_of_inheritance == set(['AD_dn'])
+    assert family_parser.individuals['father_2'].extra_info == {
+        'InheritanceModel': 'AD'}
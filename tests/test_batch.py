@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import shutil
+
+from ped_parser.batch import (collect_files, output_names, run_batch, 
+                              write_report)
+
+PED_PATH = 'examples/multi_family.ped'
+
+
+def make_files(tmpdir):
+    """Write two good files and one bad file to a directory."""
+    directory = tmpdir.mkdir('pedigrees')
+    shutil.copy(PED_PATH, str(directory.join('a.ped')))
+    shutil.copy(PED_PATH, str(directory.join('b.fam')))
+    directory.join('bad.ped').write('1\tproband\tfather\n')
+    directory.join('notes.txt').write('Not a pedigree\n')
+    return directory
+
+
+def test_collect_files(tmpdir):
+    """Test collecting files from directories, globs and manifests."""
+    directory = make_files(tmpdir)
+    paths = collect_files([str(directory)])
+    assert [os.path.basename(path) for path in paths] == [
+        'a.ped', 'b.fam', 'bad.ped']
+    
+    paths = collect_files([str(directory.join('*.ped'))])
+    assert [os.path.basename(path) for path in paths] == ['a.ped', 'bad.ped']
+    
+    manifest = tmpdir.join('manifest.txt')
+    manifest.write('# Nightly\npedigrees/a.ped\n\npedigrees/b.fam\n')
+    paths = collect_files([str(directory.join('a.ped'))], [str(manifest)])
+    assert [os.path.basename(path) for path in paths] == ['a.ped', 'b.fam']
+
+
+def test_output_names():
+    """Test that outputs of files with the same name do not collide."""
+    assert output_names(['x/a.ped.gz', 'y/a.ped', 'b.fam']) == [
+        'a', 'a_2', 'b']
+
+
+def test_run_batch(tmpdir):
+    """Test that failures are reported and the other files converted."""
+    directory = make_files(tmpdir)
+    outdir = str(tmpdir.join('out'))
+    report = run_batch(collect_files([str(directory)]), outdir, 
+                       formats=['ped', 'json'], workers=2)
+    
+    summary = report['summary']
+    assert summary['files'] == 3
+    assert summary['succeeded'] == 2
+    assert summary['errors'] == {'WrongLineFormat': 1}
+    assert summary['families'] == 4
+    
+    results = dict((os.path.basename(result['path']), result) 
+                   for result in report['files'])
+    assert results['bad.ped']['status'] == 'failed'
+    assert results['a.ped']['outputs'] == [
+        os.path.join(outdir, 'a.ped'), os.path.join(outdir, 'a.ndjson')]
+    assert 'family_check' in results['a.ped']['phases']
+    with open(os.path.join(outdir, 'b.ndjson')) as handle:
+        assert len(handle.readlines()) == 2
+    
+    report_path = str(tmpdir.join('report.json'))
+    write_report(report, report_path)
+    with open(report_path) as handle:
+        assert json.load(handle)['summary'] == summary
+
+
+def test_run_batch_pedigree_error(tmpdir):
+    """Test that a PedigreeError fails only its file."""
+    path = tmpdir.join('missing_father.ped')
+    path.write('1\tproband\tfather\t0\t1\t2\n')
+    report = run_batch([str(path)], str(tmpdir.join('out')), formats=[])
+    assert report['files'][0]['error_type'] == 'PedigreeError'
+    assert not os.path.exists(str(tmpdir.join('out')))
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import os
+
+from ped_parser import FamilyParser
+from ped_parser.cache import cache_path
+
+
+def test_parse_cache(tmpdir, monkeypatch):
+    """Test writing, reusing and invalidating the parse cache."""
+    family_file = tmpdir.join('family.ped')
+    family_file.write(
+        '#FamilyID\tSampleID\tFather\tMother\tSex\tPhenotype\tInheritanceModel\n'
+        '1\tproband\tfather\tmother\t1\t2\tAR\n'
+        '1\tmother\t0\t0\t2\t1\tAR\n'
+        '1\tfather\t0\t0\t1\t1\tAR\n'
+    )
+    path = str(family_file)
+    
+    with open(path, 'r') as handle:
+        family_parser = FamilyParser(handle, family_type='alt', cache=True)
+    assert os.path.exists(cache_path(path))
+    
+    def fail(*args, **kwargs):
+        raise AssertionError("The file should not be parsed")
+    monkeypatch.setattr(FamilyParser, 'alternative_parser', fail)
+    
+    with open(path, 'r') as handle:
+        cached_parser = FamilyParser(handle, family_type='alt', cache=True)
+    family = cached_parser.families['1']
+    assert set(cached_parser.individuals) == set(family_parser.individuals)
+    assert family.trios == family_parser.families['1'].trios
+    assert family.models_of_inheritance == set(['AR_hom'])
+    assert family.individuals['proband'] is cached_parser.individuals['proband']
+    
+    monkeypatch.undo()
+    family_file.write('1\tproband\t0\t0\t1\t2\tAD\n', mode='a')
+    
+    with open(path, 'r') as handle:
+        changed_parser = FamilyParser(handle, family_type='alt', cache=True)
+    assert changed_parser.families['1'].models_of_inheritance == set(
+        ['AR_hom', 'AD_dn'])
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import json
+import importlib.util
+
+from importlib.machinery import SourceFileLoader
+
+from click.testing import CliRunner
+
+# The command line script has no .py suffix
+loader = SourceFileLoader('ped_parser_script', 'scripts/ped_parser')
+spec = importlib.util.spec_from_loader(loader.name, loader)
+script = importlib.util.module_from_spec(spec)
+loader.exec_module(script)
+
+# Family 1 is split by family 2
+INTERLEAVED_LINES = [
+    '1\tproband\tfather\tmother\t1\t2\n',
+    '2\tproband_2\t0\t0\t1\t2\n',
+    '1\tfather\t0\t0\t1\t1\n',
+    '1\tmother\t0\t0\t2\t1\n',
+]
+
+
+def parse_to_json(tmpdir, *options, lines=INTERLEAVED_LINES):
+    """Run the parse command on family lines and read the output."""
+    family_file = tmpdir.join('family.ped')
+    family_file.write(''.join(lines))
+    outfile = tmpdir.join('families.json')
+    if outfile.check():
+        outfile.remove()
+    result = CliRunner().invoke(script.cli, [
+        'parse', str(family_file), '--to_json', '-o', str(outfile)] + 
+        list(options))
+    lines = []
+    if outfile.check():
+        lines = outfile.read().splitlines()
+    return result, lines
+
+
+def test_to_json_interleaved_families(tmpdir):
+    """Test that families that are not grouped are converted."""
+    result, lines = parse_to_json(tmpdir)
+    assert result.exit_code == 0
+    families = [json.loads(line) for line in lines]
+    assert [family[0]['family_id'] for family in families] == ['1', '2']
+    assert len(families[0]) == 3
+
+
+def test_to_json_stream(tmpdir):
+    """Test that --stream writes the same lines for grouped families."""
+    lines = [INTERLEAVED_LINES[0]] + INTERLEAVED_LINES[2:] + [
+        INTERLEAVED_LINES[1]]
+    result, streamed = parse_to_json(tmpdir, '--stream', lines=lines)
+    assert result.exit_code == 0
+    assert len(streamed) == 2
+    assert streamed == parse_to_json(tmpdir, lines=lines)[1]
+    
+    # Families that are not grouped can not be streamed
+    result, streamed = parse_to_json(tmpdir, '--stream')
+    assert result.exit_code == 1
+    assert isinstance(result.exception, SystemExit)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import io
+import gzip
+import zlib
+import struct
+
+import pytest
+
+from ped_parser import FamilyParser, iter_families
+from ped_parser.compression import (sniff_compression, detect_compression,
+                                    open_family_file, BgzfReader)
+from ped_parser.parallel import is_seekable_file
+
+PED_PATH = 'examples/multi_family.ped'
+
+
+def bgzf_block(data):
+    """Compress data as one BGZF block."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    deflated = compressor.compress(data) + compressor.flush()
+    header = struct.pack('<4BI2BH2BHH', 31, 139, 8, 4, 0, 0, 255, 6,
+                         66, 67, 2, len(deflated) + 25)
+    trailer = struct.pack('<II', zlib.crc32(data) & 0xffffffff, len(data))
+    return header + deflated + trailer
+
+
+def bgzf_compress(data, block_size=100):
+    """Compress data as BGZF blocks with an empty block at the end."""
+    blocks = [bgzf_block(data[start:start + block_size])
+              for start in range(0, len(data), block_size)]
+    return b''.join(blocks) + bgzf_block(b'')
+
+
+@pytest.fixture
+def content():
+    with open(PED_PATH, 'rb') as handle:
+        return handle.read()
+
+
+@pytest.fixture(params=['gzip', 'bgzf'])
+def compressed_path(request, tmpdir, content):
+    """A path to the multi family file, compressed with gzip or bgzf."""
+    if request.param == 'gzip':
+        path = str(tmpdir.join('multi_family.ped.gz'))
+        with gzip.open(path, 'wb') as handle:
+            handle.write(content)
+    else:
+        path = str(tmpdir.join('multi_family.ped.bgz'))
+        with open(path, 'wb') as handle:
+            handle.write(bgzf_compress(content))
+    return path
+
+
+def test_sniff_compression(content):
+    """Test finding the compression from the first bytes."""
+    assert sniff_compression(content[:16]) is None
+    assert sniff_compression(gzip.compress(content)[:16]) == 'gzip'
+    assert sniff_compression(bgzf_compress(content)[:16]) == 'bgzf'
+    assert sniff_compression(b'\x28\xb5\x2f\xfd' + b'\x00' * 12) == 'zstd'
+
+
+@pytest.mark.parametrize('threads', [1, 4])
+def test_bgzf_reader(content, threads):
+    """Test that all blocks are decompressed in order."""
+    reader = BgzfReader(io.BytesIO(bgzf_compress(content, 10)), threads)
+    with io.BufferedReader(reader) as handle:
+        assert handle.read() == content
+
+
+def test_bgzf_reader_corrupt_block(content):
+    """Test that a block with the wrong CRC raises an error."""
+    data = bytearray(bgzf_compress(content))
+    data[-36] ^= 1
+    with pytest.raises(IOError):
+        io.BufferedReader(BgzfReader(io.BytesIO(bytes(data)), 2)).read()
+
+
+def test_open_family_file(compressed_path):
+    """Test reading the lines of a compressed file."""
+    with open_family_file(compressed_path) as handle:
+        assert handle.read() == open(PED_PATH, 'r').read()
+
+
+def test_parse_compressed_handle(compressed_path):
+    """Test that FamilyParser decompresses a text handle to a file."""
+    expected = FamilyParser(open(PED_PATH, 'r'))
+    with open(compressed_path, 'r') as handle:
+        family_parser = FamilyParser(handle)
+    assert list(family_parser.individuals) == list(expected.individuals)
+    with open(compressed_path, 'r') as handle:
+        families = list(iter_families(handle))
+    assert [family.family_id for family in families] == \
+        list(expected.families)
+
+
+def test_compressed_file_is_not_chunked(compressed_path):
+    """Test that compressed files are not parsed in byte ranges."""
+    with open(compressed_path, 'r') as handle:
+        assert not is_seekable_file(handle)
+    with open(compressed_path, 'r') as handle:
+        family_parser = FamilyParser(handle, workers=2)
+    assert len(family_parser.families) == 2
+
+
+def test_load_family_compressed(compressed_path):
+    """Test parsing one family of a compressed file."""
+    family = FamilyParser.load_family(compressed_path, '1')
+    assert family.family_id == '1'
+    assert detect_compression(compressed_path) in ('gzip', 'bgzf')
+
+
+def test_zstd(tmpdir, content):
+    """Test reading a zstd compressed file."""
+    zstandard = pytest.importorskip('zstandard')
+    path = str(tmpdir.join('multi_family.ped.zst'))
+    with open(path, 'wb') as handle:
+        handle.write(zstandard.ZstdCompressor().compress(content))
+    assert detect_compression(path) == 'zstd'
+    with open_family_file(path) as handle:
+        assert handle.read() == open(PED_PATH, 'r').read()
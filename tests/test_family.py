@@ -11,7 +11,12 @@ Copyright (c) 2013 __MyCompanyName__. All rights reserved.
 
 import sys
 import os
+import tracemalloc
+
+import pytest
+
 from ped_parser import family, individual
+from ped_parser.exceptions import PedigreeError
 
 
 
@@ -81,6 +86,104 @@ class TestFamily(object):
         assert not self.father.individual_id in self.mother.siblings
 
 
+def test_half_siblings():
+    """Test that siblings are annotated the same way as check_siblings"""
+    half_family = family.Family(family_id='1')
+    for ind, mother, father, sex in [
+            ('father', '0', '0', 1),
+            ('mother_1', '0', '0', 2),
+            ('mother_2', '0', '0', 2),
+            ('child_1', 'mother_1', 'father', 1),
+            ('child_2', 'mother_1', 'father', 2),
+            ('child_3', 'mother_2', 'father', 2),
+            ('child_4', 'mother_2', '0', 2),
+            ('child_5', '0', '0', 1)]:
+        half_family.add_individual(individual.Individual(
+            ind=ind, family='1', mother=mother, father=father, sex=sex))
+    half_family.family_check()
+    
+    assert half_family.individuals['child_1'].siblings == set(
+        ['child_2', 'child_3'])
+    assert half_family.individuals['child_4'].siblings == set(['child_3'])
+    assert half_family.individuals['child_5'].siblings == set()
+    for ind_1 in half_family.individuals:
+        for ind_2 in half_family.individuals:
+            if ind_1 != ind_2:
+                assert (half_family.check_siblings(ind_1, ind_2) == 
+                        (ind_2 in half_family.individuals[ind_1].siblings))
+
+
+def test_two_generations():
+    """Test that two generations are checked without grandparents or cousins"""
+    two_generations = family.Family(family_id='2')
+    for ind, mother, father, sex in [
+            ('father_2', '0', '0', 1),
+            ('mother_2', '0', '0', 2),
+            ('child_1', 'mother_2', 'father_2', 1),
+            ('child_2', 'mother_2', 'father_2', 2)]:
+        two_generations.add_individual(individual.Individual(
+            ind=ind, family='2', mother=mother, father=father, sex=sex))
+    two_generations.family_check()
+    
+    assert len(two_generations.trios) == 2
+    assert two_generations.individuals['child_1'].siblings == set(['child_2'])
+    for member in two_generations.individuals.values():
+        assert not member.grandparents
+        assert not member.first_cousins
+        assert not member.second_cousins
+    # The family graph is only built for three generations
+    assert two_generations._graph is None
+
+
+def test_add_individual_wrong_family():
+    """Test that the error of an individual from another family has the id"""
+    wrong_family = family.Family(family_id='3')
+    with pytest.raises(PedigreeError) as excinfo:
+        wrong_family.add_individual(individual.Individual(ind='4', family='4'))
+    assert excinfo.value.family_id == '3'
+    assert excinfo.value.individual_id == '4'
+
+
+def unit_family(units):
+    """Return one family of units with grandparents, parents and cousins"""
+    large_family = family.Family(family_id='large')
+    for unit in range(units):
+        prefix = 'unit_{0}_'.format(unit)
+        for ind, father, mother, sex in [
+                ('grandfather', '0', '0', 1),
+                ('grandmother', '0', '0', 2),
+                ('father', 'grandfather', 'grandmother', 1),
+                ('aunt', 'grandfather', 'grandmother', 2),
+                ('mother', '0', '0', 2),
+                ('uncle', '0', '0', 1),
+                ('proband', 'father', 'mother', 1),
+                ('cousin', 'uncle', 'aunt', 2)]:
+            large_family.add_individual(individual.Individual(
+                ind=prefix + ind, family='large', 
+                father=prefix + father if father != '0' else '0',
+                mother=prefix + mother if mother != '0' else '0', sex=sex))
+    return large_family
+
+
+def test_large_family_scales_linearly():
+    """Test that the memory of family_check grows linearly with the family"""
+    peaks = []
+    for units in (400, 800):
+        large_family = unit_family(units)
+        tracemalloc.start()
+        large_family.family_check()
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        # Relationship queries are not needed to annotate the cousins
+        assert large_family._graph is None
+        proband = large_family.individuals['unit_7_proband']
+        assert proband.first_cousins == set(['unit_7_cousin'])
+        assert set(proband.grandparents) == set(
+            ['unit_7_grandfather', 'unit_7_grandmother'])
+    # A quadratic index would need four times the memory
+    assert peaks[1] < 2.5 * peaks[0]
+
+
 def main():
     pass
 
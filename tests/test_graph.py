@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+import random
+
+from ped_parser import Family, Individual
+
+
+class TestFamilyGraph(object):
+    """Test the graph index on a three generation family."""
+    
+    def setup_class(self):
+        """Setup grandparents with two children that have children."""
+        self.family = Family(family_id='1')
+        for ind, father, mother, sex in [
+                ('grandfather', '0', '0', '1'),
+                ('grandmother', '0', '0', '2'),
+                ('father', 'grandfather', 'grandmother', '1'),
+                ('aunt', 'grandfather', 'grandmother', '2'),
+                ('mother', '0', '0', '2'),
+                ('uncle', '0', '0', '1'),
+                ('proband', 'father', 'mother', '1'),
+                ('sister', 'father', 'mother', '2'),
+                ('cousin', 'uncle', 'aunt', '1')]:
+            self.family.add_individual(Individual(
+                ind=ind, family='1', father=father, mother=mother, sex=sex))
+        self.family.family_check()
+        self.graph = self.family.graph
+    
+    def test_generations(self):
+        """Test the generation depths."""
+        assert self.graph.generation('grandfather') == 0
+        assert self.graph.generation('mother') == 0
+        assert self.graph.generation('father') == 1
+        assert self.graph.generation('proband') == 2
+    
+    def test_ancestors(self):
+        """Test ancestor and descendant queries."""
+        assert self.graph.get_ancestors('proband') == set(
+            ['father', 'mother', 'grandfather', 'grandmother'])
+        assert self.graph.get_descendants('grandmother') == set(
+            ['father', 'aunt', 'proband', 'sister', 'cousin'])
+        assert self.graph.is_ancestor('grandfather', 'cousin')
+        assert not self.graph.is_ancestor('cousin', 'grandfather')
+        assert not self.graph.is_ancestor('uncle', 'proband')
+        assert self.graph.get_children('father') == set(['proband', 'sister'])
+    
+    def test_grandparents(self):
+        """Test grandparents and cousins."""
+        assert self.graph.get_grandparents('proband') == set(
+            ['grandfather', 'grandmother'])
+        assert self.family.check_cousins('proband', 'cousin')
+        assert not self.family.check_cousins('proband', 'sister')
+        assert not self.family.check_cousins('proband', 'aunt')
+        
+        proband = self.family.individuals['proband']
+        proband.check_grandparents(
+            mother=self.family.individuals['mother'],
+            father=self.family.individuals['father'])
+        assert set(proband.grandparents) == set(['grandfather', 'grandmother'])
+    
+    def test_graph_is_rebuilt(self):
+        """Test that the graph is rebuilt when a member is added."""
+        family = Family(family_id='2')
+        family.add_individual(Individual(ind='father', family='2', sex='1'))
+        assert len(family.graph.members) == 1
+        family.add_individual(Individual(
+            ind='child', family='2', father='father'))
+        assert family.graph.get_ancestors('child') == set(['father'])
+
+
+class TestRelationships(object):
+    """Test relationship queries on a four generation family."""
+    
+    def setup_class(self):
+        """Setup two founders with descendants down to second cousins."""
+        self.family = Family(family_id='1')
+        for ind, father, mother, sex in [
+                ('gg_father', '0', '0', '1'),
+                ('gg_mother', '0', '0', '2'),
+                ('g_father_1', 'gg_father', 'gg_mother', '1'),
+                ('g_mother_1', '0', '0', '2'),
+                ('g_father_2', '0', '0', '1'),
+                ('g_mother_2', 'gg_father', 'gg_mother', '2'),
+                ('father', 'g_father_1', 'g_mother_1', '1'),
+                ('mother', '0', '0', '2'),
+                ('aunt', 'g_father_1', 'g_mother_1', '2'),
+                ('other_father', '0', '0', '1'),
+                ('father_2', 'g_father_2', 'g_mother_2', '1'),
+                ('proband', 'father', 'mother', '1'),
+                ('sister', 'father', 'mother', '2'),
+                ('half_brother', 'father', '0', '1'),
+                ('cousin', 'other_father', 'aunt', '1'),
+                ('second_cousin', 'father_2', '0', '2'),
+                ('stranger', '0', '0', '1')]:
+            self.family.add_individual(Individual(
+                ind=ind, family='1', father=father, mother=mother, sex=sex))
+        self.family.family_check()
+    
+    def test_relationship(self):
+        """Test the names and degrees of relationships to the proband."""
+        expected = {
+            'proband': ('self', 0),
+            'father': ('parent', 1),
+            'g_mother_1': ('grandparent', 2),
+            'gg_father': ('great-grandparent', 3),
+            'sister': ('sibling', 1),
+            'half_brother': ('half-sibling', 2),
+            'aunt': ('avuncular', 2),
+            'cousin': ('first cousin', 3),
+            'father_2': ('first cousin once removed', 4),
+            'second_cousin': ('second cousin', 5),
+            'stranger': ('unrelated', None),
+        }
+        for individual_id, (name, degree) in expected.items():
+            relationship = self.family.relationship('proband', individual_id)
+            assert (relationship.name, relationship.degree) == (name, degree)
+    
+    def test_relationship_direction(self):
+        """Test that the relationship is of the second individual."""
+        assert self.family.relationship('father', 'proband').name == 'child'
+        assert self.family.relationship('aunt', 'proband').name == (
+            'niece/nephew')
+        assert self.family.relationship('father_2', 'proband').name == (
+            'first cousin once removed')
+    
+    def test_relatives(self):
+        """Test relatives up to a degree."""
+        assert set(self.family.relatives('proband', degree=1)) == set(
+            ['father', 'mother', 'sister'])
+        assert set(self.family.relatives('proband')) == set(
+            ['father', 'mother', 'sister', 'half_brother', 'aunt', 
+             'g_father_1', 'g_mother_1'])
+        assert 'second_cousin' in self.family.relatives('proband', degree=5)
+    
+    def test_annotations(self):
+        """Test that family_check sets grandparents and cousins."""
+        proband = self.family.individuals['proband']
+        assert set(proband.grandparents) == set(['g_father_1', 'g_mother_1'])
+        assert proband.first_cousins == set(['cousin'])
+        assert proband.second_cousins == set(['second_cousin'])
+        assert self.family.individuals['cousin'].first_cousins == set(
+            ['proband', 'sister', 'half_brother'])
+    
+    def test_relationships(self):
+        """Test that all relationships at once agree with single queries."""
+        relationships = self.family.graph.relationships('proband')
+        assert 'stranger' not in relationships
+        for individual_id in self.family.individuals:
+            relationship = self.family.relationship('proband', individual_id)
+            if relationship.name in ('self', 'unrelated'):
+                assert individual_id not in relationships
+            else:
+                assert relationships[individual_id] == relationship
+
+
+def random_family(rng, size):
+    """Return a family where parents are drawn from earlier members."""
+    family = Family(family_id='random')
+    males, females = [], []
+    for position in range(size):
+        father = mother = '0'
+        if males and females and rng.random() < 0.8:
+            father = rng.choice(males[-8:])
+            mother = rng.choice(females[-8:])
+        sex = rng.choice(['1', '2'])
+        individual_id = 'ind_{0}'.format(position)
+        (males if sex == '1' else females).append(individual_id)
+        family.add_individual(Individual(
+            ind=individual_id, family='random', father=father, 
+            mother=mother, sex=sex))
+    return family
+
+
+def test_annotations_agree_with_graph():
+    """Test that family_check finds the cousins that the graph finds."""
+    rng = random.Random(1)
+    for _ in range(20):
+        family = random_family(rng, 40)
+        family.family_check()
+        graph = family.graph
+        for individual_id, individual in family.individuals.items():
+            assert set(individual.grandparents) == graph.get_grandparents(
+                individual_id)
+            relationships = graph.relationships(individual_id, 6)
+            for meioses, cousins in ((2, individual.first_cousins), 
+                                     (3, individual.second_cousins)):
+                assert cousins == set(
+                    relative_id for relative_id, relationship in 
+                    relationships.items() if relationship.meioses_1 == 
+                    relationship.meioses_2 == meioses)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+import pytest
+
+from ped_parser import Individual, Family
+from ped_parser.ids import IdRegistry, registry
+from ped_parser.exceptions import PedigreeError
+
+
+def test_registry_indexes():
+    """Test that ids get dense indexes in the order they are seen."""
+    ids = IdRegistry()
+    assert ids.intern('0') == 0
+    assert ids.intern('proband') == 1
+    assert ids.intern('father') == 2
+    assert ids.intern('proband') == 1
+    assert ids[2] == 'father'
+    assert ids.index('father') == 2
+    assert len(ids) == 3
+    assert 'mother' not in ids
+    with pytest.raises(KeyError):
+        ids.index('mother')
+
+
+def test_release_ids():
+    """Test that ids without references are removed and their index reused."""
+    ids = IdRegistry()
+    proband = ids.intern('proband')
+    father = ids.intern('father')
+    assert ids.intern('proband') == proband
+    ids.release(proband)
+    assert 'proband' in ids
+    ids.release(proband, father, 0)
+    assert 'proband' not in ids and ids[proband] is None
+    assert len(ids) == 1
+    assert ids.intern('mother') in (proband, father)
+    assert ids.intern('0') == 0
+
+
+def test_individual_ids():
+    """Test that the ids of an individual are registry indexes."""
+    proband = Individual('ids_proband', family='ids_1', mother='ids_mother',
+                         father='0', sex='1', phenotype='2')
+    assert proband._index == registry.index('ids_proband')
+    assert proband._father == 0
+    assert proband.mother == 'ids_mother'
+    assert proband.has_parents and not proband.has_both_parents
+
+    proband.father = 'ids_father'
+    assert proband._father == registry.index('ids_father')
+    assert proband.to_json()['father'] == 'ids_father'
+    
+    # The ids are released with the individual
+    proband.mother = '0'
+    assert 'ids_mother' not in registry
+    del proband
+    assert 'ids_proband' not in registry and 'ids_father' not in registry
+
+
+def test_pickle_ids_as_strings():
+    """Test that individuals are pickled with their ids as strings."""
+    proband = Individual('ids_pickled', family='ids_2', mother='0',
+                         father='ids_pickled_father', sex='2', phenotype='1')
+    proband.siblings.add('ids_sibling')
+    data = pickle.dumps(proband, pickle.HIGHEST_PROTOCOL)
+    assert b'ids_pickled_father' in data
+
+    copy = pickle.loads(data)
+    assert copy.father == 'ids_pickled_father'
+    assert copy._father == proband._father
+    assert copy.siblings == set(['ids_sibling'])
+    assert copy.healthy and copy.sex == 2
+
+
+def test_family_check_with_indexes():
+    """Test family_check and the relation checks on registry indexes."""
+    family = Family('ids_3')
+    for ind, father, mother, sex in [('ids_child_1', 'ids_dad', 'ids_mom', 1),
+                                     ('ids_child_2', 'ids_dad', '0', 2),
+                                     ('ids_dad', '0', '0', 1),
+                                     ('ids_mom', '0', '0', 2)]:
+        family.add_individual(Individual(ind, 'ids_3', mother, father, sex))
+    family.family_check()
+    assert family.trios == [set(['ids_child_1', 'ids_dad', 'ids_mom'])]
+    assert family.duos == [set(['ids_child_2', 'ids_dad'])]
+    assert family.individuals['ids_child_1'].siblings == set(['ids_child_2'])
+    assert family.check_siblings('ids_child_1', 'ids_child_2')
+    assert not family.check_siblings('ids_dad', 'ids_mom')
+    fathers_children, _ = family.get_children()
+    assert fathers_children == {'ids_dad': ['ids_child_1', 'ids_child_2']}
+
+    # Unknown parents are reported by id and not added to the registry
+    with pytest.raises(PedigreeError):
+        family.check_parent('ids_stranger', father=True)
+    assert 'ids_stranger' not in registry
+    family.individuals['ids_child_2'].mother = 'ids_dad'
+    with pytest.raises(PedigreeError) as excinfo:
+        family.family_check()
+    assert excinfo.value.individual_id == 'ids_dad'
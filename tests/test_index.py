@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+
+import pytest
+
+from ped_parser import FamilyParser, index
+from ped_parser.exceptions import PedigreeError
+from ped_parser.index import build_index, index_path
+
+
+def test_build_index():
+    """Test the byte offsets of the families."""
+    path = 'examples/multi_family.ped'
+    index = build_index(path)
+    
+    with open(path, 'rb') as handle:
+        content = handle.read()
+    offset, length, header = index['families']['2'][0]
+    assert content[offset:offset + length].startswith(b'2\tproband_2')
+    assert offset + length == len(content)
+    assert header == -1
+
+
+def test_load_family(tmpdir):
+    """Test parsing one family with the index."""
+    path = str(tmpdir.join('multi_family.ped'))
+    shutil.copy('examples/multi_family.ped', path)
+    
+    family = FamilyParser.load_family(path, '1')
+    assert os.path.exists(index_path(path))
+    assert set(family.individuals) == set(
+        ['proband', 'mother', 'father', 'daughter'])
+    assert len(family.trios) == 2
+    
+    family = FamilyParser.load_family(path, '2')
+    assert set(family.individuals) == set(['proband_2', 'mother_2', 'father_2'])
+    
+    with pytest.raises(PedigreeError):
+        FamilyParser.load_family(path, '3')
+
+
+def test_load_family_alternative(tmpdir):
+    """Test a family that is split over two headers."""
+    family_file = tmpdir.join('family.ped')
+    family_file.write(
+        '#FamilyID\tSampleID\tFather\tMother\tSex\tPhenotype\tKit\n'
+        '1\tproband\tfather\tmother\t1\t2\tkit_1\n'
+        '2\tproband_2\t0\t0\t1\t2\tkit_1\n'
+        '#FamilyID\tSampleID\tFather\tMother\tSex\tPhenotype\tOther_kit\n'
+        '1\tmother\t0\t0\t2\t1\tkit_2\n'
+        '1\tfather\t0\t0\t1\t1\tkit_2\n'
+    )
+    path = str(family_file)
+    
+    family = FamilyParser.load_family(path, '1', family_type='alt')
+    assert family.individuals['proband'].extra_info == {'Kit': 'kit_1'}
+    assert family.individuals['mother'].extra_info == {'Other_kit': 'kit_2'}
+    
+    # The index is rebuilt when the file changes
+    family_file.write('3\tproband_3\t0\t0\t1\t2\tkit_3\n', mode='a')
+    os.utime(path, (0, 0))
+    family = FamilyParser.load_family(path, '3', family_type='alt')
+    assert list(family.individuals) == ['proband_3']
+
+
+def test_loaded_index_is_reused(tmpdir, monkeypatch):
+    """Test that the index is only read again when the file changes."""
+    path = str(tmpdir.join('multi_family.ped'))
+    shutil.copy('examples/multi_family.ped', path)
+    FamilyParser.load_family(path, '1')
+    
+    loads = []
+    load_index = index.load_index
+    def count_loads(*args):
+        loads.append(args)
+        return load_index(*args)
+    monkeypatch.setattr(index, 'load_index', count_loads)
+    
+    for family_id in ['1', '2', '1']:
+        FamilyParser.load_family(path, family_id)
+    assert loads == []
+    
+    os.utime(path, (0, 0))
+    family = FamilyParser.load_family(path, '2')
+    assert len(loads) == 1
+    assert set(family.individuals) == set(['proband_2', 'mother_2', 'father_2'])
+    
+    index.clear_loaded()
+    FamilyParser.load_family(path, '2')
+    assert len(loads) == 2
+
+
+def test_load_family_encoding(tmpdir):
+    """Test that family ids are decoded with the encoding of the file."""
+    family_file = tmpdir.join('latin_1.ped')
+    family_file.write_binary(
+        u'Göteborg\tproband\t0\t0\t1\t2\n'
+        u'Malmö\tproband_2\t0\t0\t2\t2\n'.encode('latin-1'))
+    path = str(family_file)
+    
+    family = FamilyParser.load_family(path, u'Malmö', encoding='latin-1')
+    assert list(family.individuals) == ['proband_2']
+    assert index.get_index(path, encoding='latin-1')['encoding'] == 'latin-1'
+    # The index of another encoding is built again
+    with pytest.raises(UnicodeDecodeError):
+        FamilyParser.load_family(path, u'Malmö')
+    family = FamilyParser.load_family(path, u'Göteborg', encoding='latin-1')
+    assert list(family.individuals) == ['proband']
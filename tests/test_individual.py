@@ -69,6 +69,15 @@ class TestIndividual(object):
         assert not self.random_individual.has_parents
         assert self.random_individual.sex == 0
     
+    def test_lazy_containers(self):
+        """Test that the relationship containers are allocated on access."""
+        individual_object = individual.Individual(ind='5')
+        assert not hasattr(individual_object, '__dict__')
+        assert individual_object._siblings is None
+        individual_object.siblings.add('6')
+        assert individual_object.siblings == set(['6'])
+        assert individual_object.extra_info == {}
+    
 
 
 def main():
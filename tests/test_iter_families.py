@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from ped_parser import FamilyParser, iter_families
+from ped_parser.exceptions import PedigreeError
+
+
+def test_iter_families():
+    """Test streaming the families of a multi family file."""
+    with open('examples/multi_family.ped', 'r') as handle:
+        families = list(iter_families(handle))
+
+    assert [family.family_id for family in families] == ['1', '2']
+    assert set(families[0].individuals) == set(
+        ['proband', 'mother', 'father', 'daughter'])
+    assert len(families[0].trios) == 2
+    assert families[0].individuals['proband'].siblings == set(['daughter'])
+    assert families[1].trios == [set(['proband_2', 'mother_2', 'father_2'])]
+
+
+def test_iter_families_alternative():
+    """Test that models of inheritance are kept per family."""
+    family_lines = [
+        '#FamilyID\tSampleID\tFather\tMother\tSex\tPhenotype\tInheritanceModel\n',
+        '1\tproband\t0\t0\t1\t2\tAR\n',
+        '2\tproband_2\t0\t0\t1\t2\tAD\n',
+    ]
+    families = list(iter_families(family_lines, family_type='alt'))
+
+    assert families[0].models_of_inheritance == set(['AR_hom'])
+    assert families[1].models_of_inheritance == set(['AD_dn'])
+
+
+def test_iter_families_not_grouped():
+    """Test that a family that is split in the input raises."""
+    family_lines = [
+        '1\tproband\t0\t0\t1\t2\n',
+        '2\tproband_2\t0\t0\t1\t2\n',
+        '1\tmother\t0\t0\t2\t1\n',
+    ]
+    families = iter_families(family_lines)
+
+    assert next(families).family_id == '1'
+    with pytest.raises(PedigreeError):
+        list(families)
+
+
+def test_iter_families_metrics():
+    """Test that streamed families are counted in the metrics."""
+    family_parser = FamilyParser(metrics=True)
+    with open('examples/multi_family.ped', 'r') as handle:
+        families = list(family_parser.iter_families(handle))
+
+    counters = family_parser.metrics.counters
+    assert counters['families'] == len(families) == 2
+    assert counters['individuals'] == 7
+    assert counters['trios'] == 3
+    assert family_parser.metrics.phases['family_check']['calls'] == 2
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from ped_parser import Family, Individual
+from ped_parser.exceptions import PedigreeError
+from ped_parser.kinship import (KinshipMatrix, family_kinship, 
+                                inbreeding_coefficients, topological_order)
+
+
+def get_family(members):
+    """Return a family from (ind, father, mother, sex) tuples."""
+    family = Family(family_id='1')
+    for ind, father, mother, sex in members:
+        family.add_individual(Individual(
+            ind=ind, family='1', father=father, mother=mother, sex=sex))
+    return family
+
+
+class TestKinship(object):
+    """Test kinship on a family where first cousins have a child."""
+    
+    def setup_class(self):
+        """Setup a consanguineous family and an unrelated individual."""
+        self.family = get_family([
+            ('child', 'cousin_1', 'cousin_2', '1'),
+            ('cousin_1', 'uncle', 'in_law_1', '1'),
+            ('cousin_2', 'in_law_2', 'aunt', '2'),
+            ('uncle', 'grandfather', 'grandmother', '1'),
+            ('aunt', 'grandfather', 'grandmother', '2'),
+            ('grandfather', '0', '0', '1'),
+            ('grandmother', '0', '0', '2'),
+            ('in_law_1', '0', '0', '2'),
+            ('in_law_2', '0', '0', '1'),
+            ('unrelated', '0', '0', '1'),
+        ])
+        self.kinship = KinshipMatrix({'1': self.family})
+    
+    def test_topological_order(self):
+        """Test that parents are before their children."""
+        order = topological_order(self.family)
+        for individual_id in order:
+            individual = self.family.individuals[individual_id]
+            for parent_id in (individual.father, individual.mother):
+                if parent_id != '0':
+                    assert order.index(parent_id) < order.index(individual_id)
+    
+    def test_coefficients(self):
+        """Test some known kinship coefficients."""
+        assert self.kinship.kinship('1', 'uncle', 'grandfather') == 0.25
+        assert self.kinship.kinship('1', 'uncle', 'aunt') == 0.25
+        assert self.kinship.kinship('1', 'cousin_1', 'cousin_2') == 1 / 16.0
+        assert self.kinship.kinship('1', 'child', 'unrelated') == 0.0
+        assert self.kinship.kinship('1', 'uncle', 'uncle') == 0.5
+    
+    def test_inbreeding(self):
+        """Test that the child of first cousins has inbreeding 1/16."""
+        coefficients = inbreeding_coefficients(self.family)
+        assert coefficients['child'] == 1 / 16.0
+        assert coefficients['cousin_1'] == 0.0
+        assert self.kinship.kinship('1', 'child', 'child') == 0.5 + 1 / 32.0
+    
+    def test_blocks(self):
+        """Test that unconnected individuals are in their own block."""
+        assert len(self.kinship.blocks) == 2
+        individual_ids, matrix = self.kinship.family_matrix('1')
+        order, full_matrix = family_kinship(self.family)
+        for i, individual_1_id in enumerate(individual_ids):
+            for j, individual_2_id in enumerate(individual_ids):
+                assert matrix[i, j] == full_matrix[
+                    order.index(individual_1_id), order.index(individual_2_id)]
+
+
+def test_own_ancestor():
+    """Test that a loop in the pedigree raises."""
+    family = get_family([
+        ('a', 'b', '0', '1'),
+        ('b', 'a', '0', '1'),
+    ])
+    with pytest.raises(PedigreeError):
+        topological_order(family)
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+import gc
+import os
+import shutil
+
+import pytest
+
+import ped_parser
+from ped_parser.memo import PedigreeCache, estimate_size
+from ped_parser.ids import registry
+from ped_parser.exceptions import WrongLineFormat
+
+PED_PATH = 'examples/multi_family.ped'
+
+TRIO_TEXT = (
+    '1\tproband\tfather\tmother\t1\t2\n'
+    '1\tmother\t0\t0\t2\t1\n'
+    '1\tfather\t0\t0\t1\t1\n'
+)
+
+
+def test_load_path(tmpdir):
+    """Test that a file is parsed once for the same content and options."""
+    cache = PedigreeCache()
+    path = str(tmpdir.join('cohort.ped'))
+    shutil.copy(PED_PATH, path)
+    
+    family_parser = cache.load(path)
+    assert cache.load(path) is family_parser
+    # The same content at another path is the same pedigree
+    assert cache.load(PED_PATH) is family_parser
+    assert cache.load(path, family_type='alt') is not family_parser
+    info = cache.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (2, 2, 2)
+    
+    with open(path, 'a') as handle:
+        handle.write('3\tnew_sample\t0\t0\t1\t2\n')
+    os.utime(path, (0, 0))
+    assert 'new_sample' in cache.load(path).individuals
+
+
+def test_load_text_is_read_only():
+    """Test loading text and that the shared mappings can not be changed."""
+    cache = PedigreeCache()
+    family_parser = cache.load(TRIO_TEXT)
+    assert cache.load(TRIO_TEXT.encode('utf-8')) is family_parser
+    assert len(family_parser.families['1'].trios) == 1
+    with pytest.raises(TypeError):
+        family_parser.families['2'] = None
+    with pytest.raises(TypeError):
+        del family_parser.individuals['proband']
+    assert list(family_parser.to_ped())[1].startswith('1\tproband')
+
+
+def test_nested_objects_are_read_only():
+    """Test that families, individuals and their containers are frozen."""
+    cache = PedigreeCache()
+    family_parser = cache.load(PED_PATH)
+    family = family_parser.families['1']
+    proband = family.individuals['proband']
+    with pytest.raises(TypeError):
+        family.individuals['stranger'] = None
+    with pytest.raises(AttributeError):
+        family.family_id = '3'
+    with pytest.raises(AttributeError):
+        family.models_of_inheritance.add('AR_hom')
+    with pytest.raises(AttributeError):
+        family.trios.append(set())
+    with pytest.raises(AttributeError):
+        proband.phenotype = 1
+    with pytest.raises(AttributeError):
+        proband.siblings.add('stranger')
+    with pytest.raises(TypeError):
+        proband.extra_info['Proband'] = 'Y'
+    with pytest.raises(AttributeError):
+        family_parser.families = {}
+
+    # Read access still works, and later loads see the same values
+    assert proband.siblings == set(['daughter'])
+    assert family.relationship('proband', 'father').name == 'parent'
+    assert isinstance(proband, ped_parser.Individual)
+    again = cache.load(PED_PATH).families['1']
+    assert set(again.individuals) == set(['proband', 'mother', 'father',
+                                          'daughter'])
+    assert again.individuals['proband'].phenotype == 2
+
+
+def test_eviction():
+    """Test that the least recently used pedigrees are evicted."""
+    cache = PedigreeCache(maxsize=2)
+    texts = [TRIO_TEXT.replace('proband', 'proband_{0}'.format(number))
+             for number in range(3)]
+    first = cache.load(texts[0])
+    cache.load(texts[1])
+    cache.load(texts[0])
+    cache.load(texts[2])
+    assert cache.cache_info().evictions == 1
+    assert cache.load(texts[0]) is first
+    assert cache.cache_info().misses == 3
+    
+    single = PedigreeCache()
+    single.load(texts[1])
+    size = single.cache_info().memory
+    assert size > 0
+    cache.configure(maxsize=None, max_memory=size)
+    assert len(cache) == 1
+    assert cache.cache_info().memory <= size
+
+
+def test_evicted_ids_are_released():
+    """Test that the ids of evicted pedigrees leave the id registry."""
+    gc.collect()
+    size = len(registry)
+    cache = PedigreeCache(maxsize=2)
+    for number in range(200):
+        cache.load(TRIO_TEXT.replace('proband', 'released_{0}'.format(number)))
+    assert len(registry) <= size + 4
+    cache.cache_clear()
+    gc.collect()
+    assert len(registry) == size
+    assert 'released_199' not in registry
+    
+    family_parser = ped_parser.FamilyParser(TRIO_TEXT.splitlines(True))
+    size = estimate_size(family_parser)
+    assert size > sum(registry.estimate_size(individual_id) for 
+                      individual_id in family_parser.individuals)
+
+
+def test_errors_are_not_cached():
+    """Test that pedigrees that fail to parse are not cached."""
+    cache = PedigreeCache()
+    with pytest.raises(WrongLineFormat):
+        cache.load('1\tproband\tfather\n')
+    assert len(cache) == 0
+
+
+def test_module_load():
+    """Test the module level cache."""
+    ped_parser.cache_clear()
+    family_parser = ped_parser.load(TRIO_TEXT)
+    assert ped_parser.load(TRIO_TEXT) is family_parser
+    assert ped_parser.cache_info().hits == 1
+    ped_parser.cache_clear()
+    assert ped_parser.cache_info().currsize == 0
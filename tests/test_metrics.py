@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import json
+
+from ped_parser import FamilyParser
+
+
+def test_parser_metrics():
+    """Test the counters and phases recorded when parsing."""
+    family_lines = [
+        '#FamilyID\tSampleID\tFather\tMother\tSex\tPhenotype\n',
+        '1\tproband\tfather\tmother\t1\t2\n',
+        '\n',
+        '1\tmother\t0\t0\t2\t1\n',
+        '1\tfather\t0\t0\t1\t1\n',
+        '2\tchild\tfather_2\t0\t2\t2\n',
+        '2\tfather_2\t0\t0\t1\t1\n',
+    ]
+    family_parser = FamilyParser(family_lines, metrics=True)
+    list(family_parser.to_ped())
+    metrics = family_parser.metrics.to_dict()
+    
+    assert metrics['counters'] == {
+        'lines': 7,
+        'comment_lines': 1,
+        'blank_lines': 1,
+        'individuals': 5,
+        'families': 2,
+        'trios': 1,
+        'duos': 1,
+    }
+    assert metrics['phases']['get_individual']['calls'] == 5
+    for name in ('parse', 'tokenize', 'family_check', 'serialize'):
+        assert metrics['phases'][name]['calls'] == 1
+        assert metrics['phases'][name]['wall'] >= 0
+    assert json.loads(family_parser.metrics.to_json()) == metrics
+
+
+def test_no_metrics():
+    """Test that metrics are off by default."""
+    family_parser = FamilyParser(['1\tproband\t0\t0\t1\t2\n'])
+    assert family_parser.metrics is None
+    assert family_parser.to_dict()['1'][0]['id'] == 'proband'
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+import pytest
+
+from ped_parser import FamilyParser, Family, Individual
+from ped_parser.models import (ModelTable, model_table, AR_HOM, AR_HOM_DN,
+                               AR_COMP, AD_DN, X, NA)
+
+FAMILY_LINES = [
+    '#FamilyID\tSampleID\tFather\tMother\tSex\tPhenotype\tInheritanceModel\n',
+    '1\tproband\t0\t0\t1\t2\tAR_compound;X_dn\n',
+    '2\tproband_2\t0\t0\t1\t2\tAD\n',
+    '3\tproband_3\t0\t0\t1\t2\tAR_comp;typo\n',
+    '3\tsister_3\t0\t0\t2\t2\tAR\n',
+]
+
+
+def test_parse_aliases():
+    """Test that all accepted names map to the bit of their model."""
+    assert model_table.parse('AR;AR_hom') == AR_HOM
+    assert model_table.parse('AR_dn;AR_hom_denovo') == AR_HOM_DN
+    assert model_table.parse('AR_compound') == AR_COMP
+    assert model_table.parse('AD_denovo') == AD_DN
+    assert model_table.parse('X_dn') == X
+    assert model_table.parse('.') == NA
+    assert model_table.parse('AR_comp;X') == AR_COMP | X
+    assert model_table.to_names(AR_COMP | X) == ['AR_comp', 'X']
+
+
+def test_extend_table():
+    """Test adding names and models to a table."""
+    table = ModelTable()
+    table.add_alias('ARC', 'AR_comp')
+    assert table.parse('ARC') == AR_COMP
+    flag = table.add_model('MT', aliases=['mito'])
+    assert flag == 1 << 6
+    assert table.parse('mito;AD') == flag | AD_DN
+    with pytest.raises(KeyError):
+        table.add_alias('ARX', 'unknown')
+
+
+def test_family_and_individual_models():
+    """Test that models are stored as flags per family and individual."""
+    family_parser = FamilyParser(FAMILY_LINES, family_type='alt')
+    families = family_parser.families
+    assert families['1'].models == AR_COMP | X
+    assert families['1'].models_of_inheritance == set(['AR_comp', 'X'])
+    # Names that are not accepted are ignored
+    assert families['3'].models == AR_COMP | AR_HOM
+    assert family_parser.individuals['sister_3'].models == AR_HOM
+    assert family_parser.individuals['proband_3'].models_of_inheritance == \
+        set(['AR_comp'])
+    assert family_parser.get_models('AR;typo') == set(['AR_hom'])
+
+
+def test_families_with_models():
+    """Test filtering families on their models."""
+    family_parser = FamilyParser(FAMILY_LINES, family_type='alt')
+    assert [family.family_id for family in
+            family_parser.families_with_models(AR_COMP | X)] == ['1']
+    assert [family.family_id for family in family_parser.families_with_models(
+        ['AR_comp'])] == ['1', '3']
+    assert [family.family_id for family in family_parser.families_with_models(
+        AR_HOM | AD_DN, match_all=False)] == ['2', '3']
+    assert family_parser.families['3'].has_models(['AR_hom', 'AR_comp'])
+    with pytest.raises(KeyError):
+        family_parser.families_with_models(['unknown'])
+
+
+def test_model_set_view():
+    """Test that models_of_inheritance changes the flags of the family."""
+    family = Family('models_1', models_of_inheritance=set(['AR']))
+    assert family.models == AR_HOM
+    family.models_of_inheritance.update(['X_dn'], AD_DN)
+    family.models_of_inheritance.discard('AR_hom')
+    assert family.models == X | AD_DN
+    assert 'X' in family.models_of_inheritance
+    assert len(family.models_of_inheritance) == 2
+    assert sorted(family.models_of_inheritance) == ['AD_dn', 'X']
+    family.models_of_inheritance = 'AR_comp'
+    assert family.models == AR_COMP
+
+
+def test_unknown_names_are_ignored():
+    """Test that unknown names never add models to the table."""
+    models = len(model_table)
+    family = Family('models_3', models_of_inheritance=['AR_compund', 'AD'])
+    family.models_of_inheritance.add('X_typo')
+    family.models_of_inheritance.update(['AR_typo'])
+    assert family.models == AD_DN
+    assert len(model_table) == models
+    assert 'AR_compund' not in model_table.aliases
+
+
+def test_model_set_aliases():
+    """Test that any accepted name can be used with a ModelSet."""
+    family = Family('models_4', models_of_inheritance='AR_comp')
+    assert 'AR_compound' in family.models_of_inheritance
+    assert 'AR_comp' in family.models_of_inheritance
+    assert 'AR' not in family.models_of_inheritance
+    family.models_of_inheritance.discard('AR_compound')
+    assert family.models == 0
+
+
+def test_pickle_models_as_names():
+    """Test that families and individuals pickle their models as names."""
+    flag = model_table.add_model('test_pickle_model')
+    family = Family('models_2', models_of_inheritance=flag | X)
+    individual = Individual('models_ind', 'models_2', genetic_models='AR')
+    assert b'test_pickle_model' in pickle.dumps(family)
+
+    copy = pickle.loads(pickle.dumps(family))
+    assert copy.models_of_inheritance == set(['X', 'test_pickle_model'])
+    assert pickle.loads(pickle.dumps(individual)).models == AR_HOM
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+import pytest
+
+from ped_parser import FamilyParser, parallel
+from ped_parser.exceptions import PedigreeError
+
+
+def test_parallel_family_check():
+    """Test that checking families in a process pool gives the same result."""
+    with open('examples/multi_family.ped', 'r') as handle:
+        family_lines = handle.readlines()
+    serial = FamilyParser(family_lines)
+    parallel_parser = FamilyParser(family_lines, workers=2)
+
+    assert list(parallel_parser.families) == list(serial.families)
+    for family_id in serial.families:
+        family = parallel_parser.families[family_id]
+        assert family.trios == serial.families[family_id].trios
+        assert family.duos == serial.families[family_id].duos
+        assert (family.affected_individuals == 
+                serial.families[family_id].affected_individuals)
+        for individual_id, individual in family.individuals.items():
+            assert individual is parallel_parser.individuals[individual_id]
+            assert (individual.siblings == 
+                    serial.families[family_id].individuals[individual_id].siblings)
+
+
+def test_parallel_family_check_error():
+    """Test that the error of the first family in order is raised."""
+    family_lines = [
+        '1\tproband\tfather\t0\t1\t2\n',
+        '2\tproband_2\t0\tmother_2\t1\t2\n',
+        '2\tmother_2\t0\t0\t1\t1\n',
+    ]
+    with pytest.raises(PedigreeError) as excinfo:
+        FamilyParser(family_lines, workers=2)
+    
+    assert excinfo.value.family_id == '1'
+    assert excinfo.value.individual_id == 'father'
+
+
+
+def test_check_and_merge_family():
+    """Test merging the results of a check of a copy into the original."""
+    with open('examples/multi_family.ped', 'r') as handle:
+        family_parser = FamilyParser()
+        for ind_object, models in family_parser.iter_individuals(handle):
+            family_parser.add_individual(ind_object, models)
+    family = family_parser.families['1']
+    # A worker checks a pickled copy of the family
+    result = parallel.check_family(pickle.loads(pickle.dumps(family)))
+    assert family.trios == []
+    
+    parallel.merge_family(family, result)
+    assert len(family.trios) == 2
+    assert family.individuals['proband'].siblings == set(['daughter'])
+
+
+def test_pack_family():
+    """Test that packed families are checked like the original."""
+    with open('examples/multi_family.ped', 'r') as handle:
+        families = FamilyParser(handle).families
+    packed = pickle.loads(pickle.dumps(parallel.pack_family(families['1'])))
+    assert packed[0] == '1'
+    assert packed[1][0] == ('proband', 'father', 'mother', 1, 2)
+    
+    results, error = parallel.check_packed_families([packed])
+    assert error is None
+    family = parallel.unpack_family(packed)
+    parallel.merge_family(family, results[0])
+    assert family.trios == families['1'].trios
+    assert family.affected_individuals == families['1'].affected_individuals
+
+def test_parse_file_in_chunks(tmpdir):
+    """Test that families are stitched together over chunk boundaries."""
+    family_lines = [
+        '#FamilyID\tSampleID\tFather\tMother\tSex\tPhenotype\tCapture_kit\n']
+    for family_id in range(20):
+        family_lines.extend([
+            '{0}\tproband_{0}\tfather_{0}\tmother_{0}\t1\t2\tkit\n'.format(family_id),
+            '{0}\tmother_{0}\t0\t0\t2\t1\tkit\n'.format(family_id),
+            '{0}\tfather_{0}\t0\t0\t1\t1\tkit\n'.format(family_id),
+        ])
+    # A new header in the middle of the file
+    family_lines.append(
+        '#FamilyID\tSampleID\tFather\tMother\tSex\tPhenotype\tOther_kit\n')
+    family_lines.append('20\tproband_20\t0\t0\t1\t2\tkit\n')
+    family_lines.append('20\tmother_20\t0\t0\t2\t1\tkit\n')
+    family_file = tmpdir.join('families.ped')
+    family_file.write(''.join(family_lines))
+    
+    individuals = list(parallel.parse_file(str(family_file), 'alt', 
+                                           workers=2, chunk_size=50))
+    serial = list(FamilyParser(family_type='alt').iter_individuals(family_lines))
+    
+    assert len(parallel.chunk_ranges(str(family_file), 50)) > 10
+    assert [ind.individual_id for ind, _ in individuals] == [
+        ind.individual_id for ind, _ in serial]
+    assert [ind.extra_info for ind, _ in individuals] == [
+        ind.extra_info for ind, _ in serial]
+    
+    with open(str(family_file), 'r') as handle:
+        family_parser = FamilyParser(handle, family_type='alt', workers=2)
+    assert len(family_parser.families) == 21
+    assert len(family_parser.families['3'].trios) == 1
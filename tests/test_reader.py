@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+from ped_parser import FamilyParser, PedigreeTable
+from ped_parser.reader import MmapReader, split_lines
+
+
+def test_split_lines():
+    """Test splitting lines of family info."""
+    family_lines = ['#Header\tline\n', '\n', '  \n', '1\tproband\t0\t0\t1\t2\r\n']
+    
+    assert list(split_lines(family_lines)) == [
+        (True, ['Header', 'line']),
+        (False, ['1', 'proband', '0', '0', '1', '2'])
+    ]
+    assert list(split_lines(family_lines, comments=False)) == [
+        (False, ['1', 'proband', '0', '0', '1', '2'])
+    ]
+
+
+def test_mmap_reader():
+    """Test that the mmap reader gives the same result as a file handle."""
+    path = 'examples/multi_family.ped'
+    
+    with open(path, 'r') as handle:
+        family_parser = FamilyParser(handle)
+    mmap_parser = FamilyParser(MmapReader(path))
+    
+    assert list(mmap_parser.individuals) == list(family_parser.individuals)
+    assert mmap_parser.families['1'].trios == family_parser.families['1'].trios
+    
+    with open(path, 'r') as handle:
+        assert list(MmapReader(path)) == handle.readlines()
+    assert len(PedigreeTable.from_lines(MmapReader(path))) == 7
+
+
+def test_mmap_reader_alternative(tmpdir):
+    """Test the mmap reader with a alternative file and windows newlines."""
+    family_file = tmpdir.join('family.ped')
+    family_file.write_binary(
+        b'#FamilyID\tSampleID\tFather\tMother\tSex\tPhenotype\tCapture_kit\r\n'
+        b'1\tproband\t0\t0\t1\t2\tkit\r\n'
+    )
+    family_parser = FamilyParser(MmapReader(str(family_file)), family_type='alt')
+    
+    assert family_parser.individuals['proband'].extra_info == {'Capture_kit': 'kit'}
+
+
+def test_mmap_reader_empty_file(tmpdir):
+    """Test the mmap reader with an empty file."""
+    family_file = tmpdir.join('family.ped')
+    family_file.write('')
+    
+    assert list(MmapReader(str(family_file)).split_lines()) == []
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+import json
+import shutil
+import socket
+import threading
+
+import pytest
+
+from http.client import HTTPConnection
+
+from ped_parser.server import PedigreeIndex, make_server
+from ped_parser.exceptions import NotIndexedError
+
+PED_PATH = 'examples/multi_family.ped'
+
+
+@pytest.fixture
+def ped_path(tmpdir):
+    path = str(tmpdir.join('cohort.ped'))
+    shutil.copy(PED_PATH, path)
+    return path
+
+
+@pytest.fixture
+def running_server(ped_path):
+    """Serve an index on a free port in a thread."""
+    server = make_server(PedigreeIndex([ped_path]), port=0)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get_json(connection, method, path, body=None):
+    connection.request(method, path, body)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read().decode('utf-8'))
+
+
+def test_lookups(ped_path):
+    """Test the sample, family and affected lookups."""
+    index = PedigreeIndex([ped_path])
+    sample = index.sample('proband')
+    assert sample['family'] == '1'
+    assert (sample['father'], sample['mother']) == ('father', 'mother')
+    assert sample['affected'] is True
+    
+    family = index.family('1')
+    assert family['members'] == ['proband', 'mother', 'father', 'daughter']
+    assert {'child': 'proband', 'father': 'father', 
+            'mother': 'mother'} in family['trios']
+    assert index.affected('1') == ['daughter', 'proband']
+    assert sorted(index.affected()) == ['daughter', 'proband', 'proband_2']
+    
+    with pytest.raises(NotIndexedError):
+        index.sample('unknown')
+    assert index.batch([{'op': 'family', 'id': '2'}, 
+                        {'op': 'sample', 'id': 'unknown'}]) == [
+        index.family('2'), {'error': 'Sample unknown is not in the index'}]
+
+
+def test_reload_if_changed(ped_path):
+    """Test that the index is replaced when a file changes."""
+    index = PedigreeIndex([ped_path])
+    assert index.reload_if_changed() is False
+    
+    with open(ped_path, 'a') as handle:
+        handle.write('3\tnew_sample\t0\t0\t1\t2\n')
+    assert index.reload_if_changed() is True
+    assert index.sample('new_sample')['family'] == '3'
+    
+    # A broken file keeps the old index
+    with open(ped_path, 'a') as handle:
+        handle.write('4\tbroken\n')
+    assert index.reload_if_changed() is False
+    assert index.sample('new_sample')['family'] == '3'
+
+
+def test_http(running_server):
+    """Test lookups over one keep alive connection."""
+    connection = HTTPConnection(*running_server.server_address[:2])
+    status, answer = get_json(connection, 'GET', '/samples/proband_2')
+    assert status == 200
+    assert answer['family'] == '2'
+    
+    status, answer = get_json(connection, 'GET', '/affected?family=1')
+    assert answer == ['daughter', 'proband']
+    
+    status, answer = get_json(connection, 'GET', '/families/unknown')
+    assert status == 404
+    
+    lookups = [{'op': 'sample', 'id': 'mother'}, {'op': 'family', 'id': '2'}]
+    status, answer = get_json(connection, 'POST', '/batch', 
+                              json.dumps(lookups))
+    assert status == 200
+    assert [item.get('sample', item.get('family')) for item in answer] == [
+        'mother', '2']
+    
+    status, answer = get_json(connection, 'POST', '/batch', 'not json')
+    assert status == 400
+    connection.close()
+
+
+def test_unix_socket(ped_path, tmpdir):
+    """Test a lookup over a Unix socket."""
+    socket_path = str(tmpdir.join('pedigrees.sock'))
+    server = make_server(PedigreeIndex([ped_path]), socket_path=socket_path)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(socket_path)
+        client.sendall(b'GET /health HTTP/1.1\r\nHost: localhost\r\n'
+                       b'Connection: close\r\n\r\n')
+        response = b''
+        while True:
+            data = client.recv(4096)
+            if not data:
+                break
+            response += data
+        client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+    headers, body = response.split(b'\r\n\r\n', 1)
+    assert headers.startswith(b'HTTP/1.1 200')
+    assert json.loads(body.decode('utf-8'))['samples'] == 7
+
+
+def test_socket_path_is_not_a_socket(ped_path, tmpdir):
+    """Test that a file at the socket path is not removed."""
+    socket_path = tmpdir.join('pedigrees.sock')
+    socket_path.write('data')
+    with pytest.raises(FileExistsError):
+        make_server(PedigreeIndex([ped_path]), socket_path=str(socket_path))
+    assert socket_path.read() == 'data'
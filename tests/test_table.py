@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from ped_parser import FamilyParser, PedigreeTable
+from ped_parser.exceptions import PedigreeError
+
+
+def test_table_from_lines():
+    """Test building a table from a ped file."""
+    with open('examples/multi_family.ped', 'r') as handle:
+        table = PedigreeTable.from_lines(handle)
+
+    assert len(table) == 7
+    assert table.family_ids == ['1', '2']
+    assert table.sex.dtype == np.int8
+    assert table.father.dtype == np.int32
+    assert list(table.affected_counts()) == [2, 1]
+    assert [table.sample_ids[row] for row in table.founders()] == [
+        'mother', 'father', 'mother_2', 'father_2']
+    
+    trios = [tuple(table.sample_ids[row] for row in trio) 
+             for trio in table.trios()]
+    assert trios == [('proband', 'father', 'mother'),
+                     ('daughter', 'father', 'mother'),
+                     ('proband_2', 'father_2', 'mother_2')]
+    assert len(table.duos()) == 0
+
+
+def test_table_round_trip():
+    """Test converting to and from FamilyParser.families."""
+    with open('examples/multi_family.ped', 'r') as handle:
+        family_parser = FamilyParser(handle)
+    
+    families = PedigreeTable.from_families(family_parser.families).to_families()
+    
+    assert set(families) == set(family_parser.families)
+    for family_id in families:
+        family = families[family_id]
+        original = family_parser.families[family_id]
+        assert set(family.individuals) == set(original.individuals)
+        assert family.trios == original.trios
+        assert family.affected_individuals == original.affected_individuals
+
+
+def test_table_wrong_parents():
+    """Test that missing parents and parents with wrong sex raises."""
+    with pytest.raises(PedigreeError):
+        PedigreeTable.from_lines(['1\tproband\tfather\t0\t1\t2\n'])
+    with pytest.raises(PedigreeError):
+        PedigreeTable.from_lines(['1\tproband\t0\tmother\t1\t2\n',
+                                  '1\tmother\t0\t0\t1\t1\n'])
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+import io
+import gzip
+import json
+
+import pytest
+
+from ped_parser import FamilyParser
+from ped_parser.writer import (BufferedWriter, write_ndjson, get_encoder, 
+                               orjson)
+
+FAMILY_LINES = [
+    '#FamilyID\tSampleID\tFather\tMother\tSex\tPhenotype\n',
+    '1\tproband\tfather\tmother\t1\t2\n',
+    '1\tmother\t0\t0\t2\t1\n',
+    '1\tfather\t0\t0\t1\t1\n',
+    '2\tchild\t0\t0\t2\t2\n',
+]
+
+BACKENDS = ['json']
+if orjson is not None:
+    BACKENDS.append('orjson')
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_write_ndjson(backend):
+    """Test that each family is written as one json line."""
+    family_parser = FamilyParser(FAMILY_LINES)
+    outfile = io.StringIO()
+    # A small buffer makes the writer flush several times
+    lines = write_ndjson(family_parser.families.values(), outfile, 
+                         backend=backend, buffer_size=10)
+    assert lines == 2
+    families = [json.loads(line) for line in 
+                outfile.getvalue().splitlines()]
+    assert families == list(family_parser.to_json())
+
+
+def test_write_ndjson_per_individual():
+    """Test writing one individual per line."""
+    family_parser = FamilyParser(FAMILY_LINES)
+    outfile = io.StringIO()
+    assert family_parser.to_ndjson(outfile, per_individual=True) == 4
+    individuals = [json.loads(line) for line in 
+                   outfile.getvalue().splitlines()]
+    assert set(individual['id'] for individual in individuals) == set(
+        family_parser.individuals)
+
+
+def test_unknown_backend():
+    """Test that an unknown backend raises ValueError."""
+    with pytest.raises(ValueError):
+        get_encoder('yaml')
+
+
+@pytest.mark.parametrize('threaded', [False, True])
+def test_buffered_writer(threaded):
+    """Test that all rows are written and counted."""
+    outfile = io.StringIO()
+    rows = ['row_{0}'.format(number) for number in range(1000)]
+    with BufferedWriter(outfile, buffer_size=100, threaded=threaded) as writer:
+        writer.write_rows(rows)
+    assert outfile.getvalue().splitlines() == rows
+    assert writer.rows_written == 1000
+    assert writer.bytes_written == len(outfile.getvalue().encode('utf-8'))
+
+
+def test_buffered_writer_gzip(tmpdir):
+    """Test writing to a gzip file and to a binary stream."""
+    path = str(tmpdir.join('family.ped.gz'))
+    with BufferedWriter(path, threaded=True) as writer:
+        writer.write_row('1\tproband\t0\t0\t1\t2')
+    with gzip.open(path, 'rt') as handle:
+        assert handle.read() == '1\tproband\t0\t0\t1\t2\n'
+    
+    outfile = io.BytesIO()
+    with BufferedWriter(outfile) as writer:
+        writer.write_row(u'1\tproband_\xe5\t0\t0\t1\t2')
+    assert outfile.getvalue() == u'1\tproband_\xe5\t0\t0\t1\t2\n'.encode('utf-8')
+    assert writer.stats() == {'rows_written': 1, 
+                              'bytes_written': len(outfile.getvalue())}
+
+
+def test_family_to_ped(tmpdir):
+    """Test that Family.to_ped writes the header and all individuals."""
+    family_parser = FamilyParser(FAMILY_LINES)
+    path = str(tmpdir.join('family.ped'))
+    family_parser.families['1'].to_ped(path)
+    with open(path) as handle:
+        lines = handle.read().splitlines()
+    assert lines[0].startswith('#FamilyID')
+    assert len(lines) == 4
+
+
+ALT_LINES = [
+    '#FamilyID\tSampleID\tFather\tMother\tSex\tPhenotype\tCapture_kit\t'
+    'Proband\tInheritanceModel\n',
+    '1\tproband\tfather\tmother\t1\t2\tkit\tYes\tAR_hom\n',
+    '1\tmother\t0\t0\t2\t1\tkit\tNo\tAR_hom\n',
+    '1\tfather\t0\t0\t1\t1\tkit\tNo\tAR_hom\n',
+]
+
+
+def test_parser_extra_columns():
+    """Test that the extra columns are recorded in order when parsing."""
+    family_parser = FamilyParser(ALT_LINES, family_type='alt')
+    assert family_parser.extra_columns == ['Capture_kit', 'Proband', 
+                                           'InheritanceModel']
+    assert FamilyParser(FAMILY_LINES).extra_columns == []
+
+
+def test_to_ped_extra_columns():
+    """Test that only the known extra columns are exported to ped."""
+    family_parser = FamilyParser(ALT_LINES, family_type='alt')
+    lines = list(family_parser.to_ped())
+    assert lines[0] == '#FamilyID\tIndividualID\tPaternalID\tMaternalID\t'\
+                       'Sex\tPhenotype\tProband\tInheritanceModel'
+    assert lines[1] == '1\tproband\tfather\tmother\t1\t2\tYes\tAR_hom'
+    assert len(lines) == 4
+
+
+def test_to_ped_extra_info_set_after_parsing():
+    """Test that extra columns added after parsing are exported."""
+    family_parser = FamilyParser(open('examples/multi_family.ped', 'r'))
+    family_parser.individuals['proband'].extra_info['Proband'] = 'Y'
+    lines = list(family_parser.to_ped())
+    assert lines[0].endswith('\tPhenotype\tProband')
+    proband_line = [line for line in lines 
+                    if line.split('\t')[1] == 'proband'][0]
+    assert proband_line.endswith('\tY')
+    assert all(line.endswith('\t.') for line in lines[1:] 
+               if line != proband_line)
+
+
+def test_family_to_ped_extra_columns():
+    """Test that Family.to_ped finds the extra columns of its members."""
+    family_parser = FamilyParser(ALT_LINES, family_type='alt')
+    outfile = io.StringIO()
+    family_parser.families['1'].to_ped(outfile)
+    assert outfile.getvalue().splitlines() == list(family_parser.to_ped())